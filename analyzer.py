@@ -0,0 +1,387 @@
+# Coverage and consistency analysis of a rule base over the input space
+import argparse
+import collections
+import itertools
+import json
+import sys
+
+import numpy as np
+
+from engine import (
+    CRITERIA_ORDER,
+    TNORMS,
+    CompiledRuleBase,
+    MembershipFunctions,
+    decide,
+    lattice_values,
+    load_config,
+)
+from evaluator import FuzzyConfig
+
+# Range of every criteria value (a percentage)
+DOMAIN = (0.0, 100.0)
+
+
+class AxisCell:
+    """Interval of one criteria on which the set of positive levels is constant"""
+
+    def __init__(self, low, high, low_closed, high_closed, active):
+        self.low = low
+        self.high = high
+        self.low_closed = low_closed
+        self.high_closed = high_closed
+        self.active = active  # 0-based levels with membership > 0
+
+    def __contains__(self, value):
+        above = value >= self.low if self.low_closed else value > self.low
+        below = value <= self.high if self.high_closed else value < self.high
+        return above and below
+
+    @property
+    def length(self):
+        return self.high - self.low
+
+    def __str__(self):
+        if self.low == self.high:
+            return f"[{self.low:g}]"
+        return (
+            f"{'[' if self.low_closed else '('}{self.low:g}, "
+            f"{self.high:g}{']' if self.high_closed else ')'}"
+        )
+
+
+def axis_cells(shapes, domain=DOMAIN):
+    """Split a criteria's domain at its breakpoints into AxisCells
+
+    Between two breakpoints every membership function is linear, so its sign
+    on an open interval is that of the midpoint; breakpoints themselves are
+    evaluated exactly. Neighbouring pieces with the same positive levels are
+    merged.
+    """
+    low, high = domain
+    points = sorted({p for shape in shapes for p in shape if low < p < high})
+    edges = [low] + points + [high]
+    pieces = []  # (low, high, low closed, high closed, sample)
+    for idx, edge in enumerate(edges):
+        pieces.append((edge, edge, True, True, edge))
+        if idx + 1 < len(edges):
+            pieces.append(
+                (edge, edges[idx + 1], False, False, (edge + edges[idx + 1]) / 2)
+            )
+    cells = []
+    for piece_low, piece_high, low_closed, high_closed, sample in pieces:
+        active = tuple(
+            position
+            for position, shape in enumerate(shapes)
+            if MembershipFunctions.degree(sample, shape, position, len(shapes)) > 0
+        )
+        if cells and cells[-1].active == active:
+            cells[-1].high = piece_high
+            cells[-1].high_closed = high_closed
+        else:
+            cells.append(
+                AxisCell(piece_low, piece_high, low_closed, high_closed, active)
+            )
+    return cells
+
+
+def degree_bounds(cell, shapes):
+    """(low, high) membership of every level over the closure of a cell
+
+    Membership functions are piecewise linear, so their extremes lie on the
+    cell's ends or on a breakpoint inside it.
+    """
+    points = [cell.low, cell.high] + [
+        p for shape in shapes for p in shape if cell.low < p < cell.high
+    ]
+    values = np.array(
+        [
+            MembershipFunctions.degree(np.array(points), shape, position, len(shapes))
+            for position, shape in enumerate(shapes)
+        ]
+    )
+    return values.min(axis=1), values.max(axis=1)
+
+
+def weighted_average_bounds(low, high, weights, consequents):
+    """Bounds of sum(a w c) / sum(a w) for independent a in [low, high]
+
+    The extremes are reached with every alpha at one of its bounds, switching
+    at some consequent value, so all switch points are tried (an outer bound
+    since the alphas of one cell share their memberships).
+    """
+    splits = np.unique(consequents)
+    z_low = np.full(low.shape[0], np.inf)
+    z_high = np.full(low.shape[0], -np.inf)
+    for split in splits:
+        for side, take_high in ((-1, consequents <= split), (1, consequents >= split)):
+            alpha = np.where(take_high, high, low) * weights
+            numerator = alpha @ consequents
+            denominator = alpha.sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                z = numerator / denominator
+            valid = denominator > 0
+            if side < 0:
+                z_low = np.where(valid, np.minimum(z_low, z), z_low)
+            else:
+                z_high = np.where(valid, np.maximum(z_high, z), z_high)
+    return z_low, z_high
+
+
+class CoverageAnalyzer:
+    """Exact zero-firing and dominance analysis of a config over [0, 100]^5
+
+    Every criteria axis is split into cells on which the set of positive
+    membership levels is constant; a rule fires somewhere in a product of
+    cells exactly when it fires everywhere in it. Zero-firing regions are
+    therefore exact, while z bounds per cell come from interval arithmetic
+    on the membership ranges. Contested cells are those where acceptance and
+    rejection rules both fire with overlapping strengths and the z bounds
+    straddle the decision threshold.
+    """
+
+    def __init__(self, config=FuzzyConfig):
+        self.config = config
+        self.membership = MembershipFunctions.from_config(config)
+        self.rule_base = CompiledRuleBase.from_config(config)
+        self.rule_base.validate(self.membership)
+        self.labels = config.LEVEL_LABELS
+        self.axes = [
+            axis_cells(self.membership.breakpoints[criteria])
+            for criteria in CRITERIA_ORDER
+        ]
+
+    def _cells(self):
+        """Index (C, 5) of every product cell with per-rule firing and alpha bounds"""
+        shape = tuple(len(cells) for cells in self.axes)
+        index = np.indices(shape).reshape(len(shape), -1).T
+        levels = self.rule_base.levels
+        kernel = TNORMS[self.rule_base.tnorm]
+        fires = np.ones((len(index), len(levels)), dtype=bool)
+        alpha_low = alpha_high = None
+        for idx, criteria in enumerate(CRITERIA_ORDER):
+            shapes = self.membership.breakpoints[criteria]
+            active = np.array(
+                [
+                    [level in cell.active for level in range(len(shapes))]
+                    for cell in self.axes[idx]
+                ]
+            )
+            bounds = [degree_bounds(cell, shapes) for cell in self.axes[idx]]
+            low = np.array([b[0] for b in bounds])[index[:, idx]][:, levels[:, idx]]
+            high = np.array([b[1] for b in bounds])[index[:, idx]][:, levels[:, idx]]
+            fires &= active[index[:, idx]][:, levels[:, idx]]
+            if alpha_low is None:
+                alpha_low, alpha_high = low, high
+            else:
+                alpha_low = kernel(alpha_low, low)
+                alpha_high = kernel(alpha_high, high)
+        return (
+            index,
+            fires,
+            np.where(fires, alpha_low, 0.0),
+            np.where(fires, alpha_high, 0.0),
+        )
+
+    def _region(self, cell_index):
+        return {
+            criteria: {
+                "interval": str(self.axes[idx][cell]),
+                "levels": [
+                    self.labels[criteria][level]
+                    for level in self.axes[idx][cell].active
+                ],
+            }
+            for idx, (criteria, cell) in enumerate(zip(CRITERIA_ORDER, cell_index))
+        }
+
+    def _lattice_weights(self):
+        """Per axis cell: slider lattice points and 1-5 component profiles inside"""
+        points, profiles = [], []
+        for criteria, cells in zip(CRITERIA_ORDER, self.axes):
+            n = len(self.config.CRITERIA_DATA[criteria]["components"])
+            ways = np.array([1])
+            for _ in range(n):
+                ways = np.convolve(ways, np.ones(5, dtype=np.int64))
+            values = lattice_values(n).tolist()
+            points.append([sum(v in cell for v in values) for cell in cells])
+            profiles.append(
+                [
+                    int(sum(w for v, w in zip(values, ways.tolist()) if v in cell))
+                    for cell in cells
+                ]
+            )
+        return points, profiles
+
+    def static_checks(self):
+        """Level combinations in neither rule list, duplicated and conflicting rules"""
+        rules = [tuple(rule) for rule in self.rule_base.rules.tolist()]
+        consequents = self.rule_base.consequents.tolist()
+        seen = collections.defaultdict(list)
+        for rule_id, rule in enumerate(rules):
+            seen[rule].append(rule_id)
+        duplicates = [
+            {"rule": list(rule), "rule_ids": ids}
+            for rule, ids in seen.items()
+            if len(ids) > 1 and len({consequents[i] for i in ids}) == 1
+        ]
+        conflicts = [
+            {
+                "rule": list(rule),
+                "rule_ids": ids,
+                "consequents": [consequents[i] for i in ids],
+            }
+            for rule, ids in seen.items()
+            if len({consequents[i] for i in ids}) > 1
+        ]
+        uncovered = [
+            {
+                "rule": list(combination),
+                "labels": {
+                    criteria: self.labels[criteria][level - 1]
+                    for criteria, level in zip(CRITERIA_ORDER, combination)
+                },
+            }
+            for combination in itertools.product(
+                *(range(1, n + 1) for n in self.membership.n_levels)
+            )
+            if combination not in seen
+        ]
+        return uncovered, duplicates, conflicts
+
+    def report(self):
+        """Machine-readable coverage report; "passed" is False on any gap"""
+        index, fires, alpha_low, alpha_high = self._cells()
+        weights = self.rule_base.weights
+        consequents = self.rule_base.consequents
+        if self.rule_base.aggregation == "weighted_sum":
+            terms = np.stack(
+                [alpha_low * weights * consequents, alpha_high * weights * consequents]
+            )
+            z_low, z_high = terms.min(axis=0).sum(axis=1), terms.max(axis=0).sum(axis=1)
+        else:
+            z_low, z_high = weighted_average_bounds(
+                alpha_low, alpha_high, weights, consequents
+            )
+        zero = ~fires.any(axis=1)
+        z_low[zero] = z_high[zero] = 0.0
+
+        threshold = self.rule_base.threshold
+        accepting = consequents > threshold
+        accept_high = np.where(accepting, alpha_high, 0.0).max(axis=1)
+        reject_high = np.where(~accepting, alpha_high, 0.0).max(axis=1)
+        accept_low = np.where(accepting & fires, alpha_low, np.inf).min(axis=1)
+        reject_low = np.where(~accepting & fires, alpha_low, np.inf).min(axis=1)
+        contested = (
+            (fires & accepting).any(axis=1)
+            & (fires & ~accepting).any(axis=1)
+            & (accept_high > reject_low)
+            & (reject_high > accept_low)
+            & (decide(z_low, threshold) != decide(z_high, threshold))
+        )
+
+        lengths = [np.array([cell.length for cell in cells]) for cells in self.axes]
+        points, profiles = self._lattice_weights()
+        span = DOMAIN[1] - DOMAIN[0]
+
+        def measure(mask):
+            volume = np.ones(mask.sum())
+            n_points = np.ones(mask.sum(), dtype=np.int64)
+            n_profiles = np.ones(mask.sum(), dtype=np.int64)
+            for idx in range(len(CRITERIA_ORDER)):
+                cells = index[mask, idx]
+                volume *= lengths[idx][cells] / span
+                n_points *= np.array(points[idx])[cells]
+                n_profiles *= np.array(profiles[idx])[cells]
+            return {
+                "cells": int(mask.sum()),
+                "volume_fraction": float(volume.sum()),
+                "lattice_points": int(n_points.sum()),
+                "component_profiles": int(n_profiles.sum()),
+            }
+
+        zero_firing = measure(zero)
+        zero_firing["regions"] = [self._region(cell) for cell in index[zero].tolist()]
+        contested_report = measure(contested)
+        contested_report["regions"] = [
+            dict(
+                self._region(cell),
+                z_bounds=[float(z_low[row]), float(z_high[row])],
+                rule_ids=np.flatnonzero(fires[row]).tolist(),
+            )
+            for row, cell in zip(np.flatnonzero(contested), index[contested].tolist())
+        ]
+        uncovered, duplicates, conflicts = self.static_checks()
+        return {
+            "config": self.config.__name__,
+            "domain": list(DOMAIN),
+            "axes": {
+                criteria: [
+                    {
+                        "interval": str(cell),
+                        "levels": [self.labels[criteria][lvl] for lvl in cell.active],
+                    }
+                    for cell in cells
+                ]
+                for criteria, cells in zip(CRITERIA_ORDER, self.axes)
+            },
+            "cells": len(index),
+            "lattice_points": int(np.prod([sum(p) for p in points])),
+            "component_profiles": int(np.prod([sum(p) for p in profiles])),
+            "zero_firing": zero_firing,
+            "contested": contested_report,
+            "uncovered_combinations": uncovered,
+            "duplicate_rules": duplicates,
+            "conflicting_rules": conflicts,
+            "passed": not zero_firing["cells"] and not conflicts,
+        }
+
+
+def format_report(report):
+    zero, contested = report["zero_firing"], report["contested"]
+    lines = [
+        f"Config                 : {report['config']}",
+        f"Cells analysed         : {report['cells']:,}",
+        f"Zero-firing cells      : {zero['cells']:,} "
+        f"({zero['volume_fraction']:.2%} of the input space, "
+        f"{zero['lattice_points']:,}/{report['lattice_points']:,} slider points, "
+        f"{zero['component_profiles']:,}/{report['component_profiles']:,} "
+        "component profiles)",
+        f"Contested cells        : {contested['cells']:,} "
+        f"({contested['volume_fraction']:.2%} of the input space)",
+        f"Uncovered combinations : {len(report['uncovered_combinations'])}",
+        f"Duplicate rules        : {len(report['duplicate_rules'])}",
+        f"Conflicting rules      : {len(report['conflicting_rules'])}",
+    ]
+    for region in zero["regions"][:10]:
+        lines.append(
+            "  no rule fires: "
+            + ", ".join(
+                f"{criteria} {entry['interval']}" for criteria, entry in region.items()
+            )
+        )
+    if len(zero["regions"]) > 10:
+        lines.append(f"  ... {len(zero['regions']) - 10} more")
+    lines.append("PASSED" if report["passed"] else "FAILED")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check a rule base for zero-firing and contested input regions"
+    )
+    parser.add_argument("--config", help="config JSON (default: FuzzyConfig)")
+    parser.add_argument("--json", help="write the full report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config) if args.config else FuzzyConfig
+    report = CoverageAnalyzer(config).report()
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(report, handle, indent=2)
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
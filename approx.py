@@ -0,0 +1,224 @@
+# Approximate z from an interpolated grid with a per-cell error bound
+import numpy as np
+
+from analyzer import (
+    DOMAIN,
+    AxisCell,
+    CoverageAnalyzer,
+    degree_bounds,
+    weighted_average_bounds,
+)
+from engine import CRITERIA_ORDER, TNORMS, Scorer, as_criteria_matrix, decide
+from evaluator import FuzzyConfig
+
+
+def _window(table, reduce):
+    """Reduce every 2 x ... x 2 block of corners of a 5-D grid table"""
+    for axis in range(table.ndim):
+        lower = [slice(None)] * table.ndim
+        upper = [slice(None)] * table.ndim
+        lower[axis] = slice(None, -1)
+        upper[axis] = slice(1, None)
+        table = reduce(table[tuple(lower)], table[tuple(upper)])
+    return table
+
+
+class ApproximateScorer:
+    """Multilinear interpolation of z on a grid, exact where it matters
+
+    z is tabulated on a regular grid of `step` over the domain (a step of 5
+    puts every FuzzyConfig breakpoint on the grid) and read back by
+    multilinear interpolation of the 32 corners of an input's grid cell.
+    Every cell carries a rigorous bound on |z - interpolated z|: the true z
+    lies within interval-arithmetic bounds over the cell (including z = 0
+    where no rule may fire) and the interpolant within its corner values.
+    Inputs are evaluated exactly instead when their cell's bound exceeds
+    `tolerance`, when the bound leaves the decision undetermined, or when
+    they lie outside the domain; decisions are therefore always exact and
+    z is off by at most max_error. The tables hold (100 / step + 1) ** 5
+    values, about 58 MB for the default step of 5.
+    """
+
+    def __init__(
+        self,
+        config=FuzzyConfig,
+        step=5.0,
+        tolerance=0.01,
+        chunk_size=65536,
+        z_table=None,
+        bound=None,
+    ):
+        self.analyzer = CoverageAnalyzer(config)
+        self.rule_base = self.analyzer.rule_base
+        self.membership = self.analyzer.membership
+        self.step = float(step)
+        self.tolerance = float(tolerance)
+        self.low, high = DOMAIN
+        self.n_cells = int(round((high - self.low) / self.step))
+        if not np.isclose(self.low + self.n_cells * self.step, high):
+            raise ValueError(f"step {step} does not divide the domain {DOMAIN}")
+        self.points = self.low + self.step * np.arange(self.n_cells + 1)
+        shape = (len(self.points),) * len(CRITERIA_ORDER)
+        if z_table is None:
+            grid = np.stack(
+                [
+                    axis.ravel()
+                    for axis in np.meshgrid(*[self.points] * 5, indexing="ij")
+                ],
+                axis=1,
+            )
+            z_table = np.empty(len(grid))
+            Scorer(self.rule_base, self.membership, batch_size=4096).score_into(
+                grid, z_table
+            )
+            self.z_table = z_table.reshape(shape)
+            self.bound = self._bounds(chunk_size)
+        else:
+            # Precomputed tables (e.g. shared read-only) skip the build
+            if z_table.shape != shape or bound.shape != (self.n_cells,) * 5:
+                raise ValueError(f"Precomputed tables do not match step {step}")
+            self.z_table, self.bound = z_table, bound
+        self.cell_strides = np.array(
+            [len(self.points) ** (4 - axis) for axis in range(5)], dtype=np.intp
+        )
+        # Flat offsets of the 32 corners, ordered so that reshaping to
+        # (N, 2, 2, 2, 2, 2) puts axis i's corner pair on dimension i + 1
+        self.corner_offsets = (
+            np.indices((2,) * 5).reshape(5, -1).T @ self.cell_strides
+        ).astype(np.intp)
+        within = self.bound <= self.tolerance
+        self.max_error = float(self.bound[within].max()) if within.any() else 0.0
+        self.exact_cells = float(1.0 - within.mean())
+        self.scored = self.escalated = 0
+
+    def _bounds(self, chunk_size):
+        """Per-cell bound on the interpolation error"""
+        n_axes = len(CRITERIA_ORDER)
+        levels = self.rule_base.levels
+        kernel = TNORMS[self.rule_base.tnorm]
+        low_tables, high_tables, classes, overlaps = [], [], [], []
+        for idx, criteria in enumerate(CRITERIA_ORDER):
+            shapes = self.membership.breakpoints[criteria]
+            bounds = np.array(
+                [
+                    np.concatenate(
+                        degree_bounds(AxisCell(a, b, True, True, None), shapes)
+                    )
+                    for a, b in zip(self.points, self.points[1:])
+                ]
+            )
+            # Grid intervals with equal membership ranges share their z bounds
+            bounds, inverse = np.unique(bounds, axis=0, return_inverse=True)
+            low_tables.append(bounds[:, : len(shapes)][:, levels[:, idx]])
+            high_tables.append(bounds[:, len(shapes) :][:, levels[:, idx]])
+            classes.append(inverse.ravel())
+            # Exact-analysis cells meeting each closed grid interval
+            overlaps.append(
+                [
+                    [
+                        position
+                        for position, cell in enumerate(self.analyzer.axes[idx])
+                        if cell.low <= b
+                        and cell.high >= a
+                        and (cell.high > a or cell.high_closed)
+                        and (cell.low < b or cell.low_closed)
+                    ]
+                    for a, b in zip(self.points, self.points[1:])
+                ]
+            )
+
+        # Interval z bounds per combination of membership-range classes
+        class_shape = tuple(len(table) for table in low_tables)
+        n_classes = int(np.prod(class_shape))
+        z_low, z_high = np.empty(n_classes), np.empty(n_classes)
+        weights = self.rule_base.weights
+        consequents = self.rule_base.consequents
+        for start in range(0, n_classes, chunk_size):
+            rows = slice(start, min(start + chunk_size, n_classes))
+            position = np.unravel_index(np.arange(n_classes)[rows], class_shape)
+            alpha_low = low_tables[0][position[0]]
+            alpha_high = high_tables[0][position[0]]
+            for idx in range(1, n_axes):
+                alpha_low = kernel(alpha_low, low_tables[idx][position[idx]])
+                alpha_high = kernel(alpha_high, high_tables[idx][position[idx]])
+            if self.rule_base.aggregation == "weighted_sum":
+                terms = np.stack(
+                    [
+                        alpha_low * weights * consequents,
+                        alpha_high * weights * consequents,
+                    ]
+                )
+                z_low[rows] = terms.min(axis=0).sum(axis=1)
+                z_high[rows] = terms.max(axis=0).sum(axis=1)
+            else:
+                z_low[rows], z_high[rows] = weighted_average_bounds(
+                    alpha_low, alpha_high, weights, consequents
+                )
+        expand = np.ix_(*classes)
+        z_low = z_low.reshape(class_shape)[expand]
+        z_high = z_high.reshape(class_shape)[expand]
+
+        # No rule fires somewhere in a grid cell iff a zero-firing analysis
+        # cell meets it: an "any" over a box, taken one axis at a time
+        index, fires, _, _ = self.analyzer._cells()
+        zero = ~fires.any(axis=1).reshape([len(cells) for cells in self.analyzer.axes])
+        for axis, overlap in enumerate(overlaps):
+            zero = np.stack(
+                [np.take(zero, cells, axis=axis).any(axis=axis) for cells in overlap],
+                axis=axis,
+            )
+        # Where no rule may fire the engine returns z = 0
+        z_low = np.where(zero, np.minimum(z_low, 0.0), z_low)
+        z_high = np.where(zero, np.maximum(z_high, 0.0), z_high)
+        return np.maximum(
+            z_high - _window(self.z_table, np.minimum),
+            _window(self.z_table, np.maximum) - z_low,
+        )
+
+    def interpolate(self, matrix):
+        """Interpolated z, error bound and in-domain mask of a criteria matrix"""
+        matrix = as_criteria_matrix(matrix)
+        scaled = (matrix - self.low) / self.step
+        inside = ((scaled >= 0) & (scaled <= self.n_cells)).all(axis=1)
+        scaled = np.where(inside[:, None], scaled, 0.0)
+        index = np.minimum(scaled.astype(np.intp), self.n_cells - 1)
+        fraction = scaled - index
+        corners = np.take(
+            self.z_table, (index @ self.cell_strides)[:, None] + self.corner_offsets
+        ).reshape((-1,) + (2,) * 5)
+        for axis in range(4, -1, -1):
+            t = fraction[:, axis].reshape((-1,) + (1,) * axis)
+            lower, upper = corners[..., 0], corners[..., 1]
+            corners = lower + t * (upper - lower)
+        bound = self.bound.ravel()[np.ravel_multi_index(index.T, self.bound.shape)]
+        return corners, bound, inside
+
+    def score(self, matrix):
+        """Returns (z, accepted, exact) where exact marks exactly evaluated rows"""
+        matrix = as_criteria_matrix(matrix)
+        z, bound, inside = self.interpolate(matrix)
+        threshold = self.rule_base.threshold
+        exact = (
+            ~inside
+            | (bound > self.tolerance)
+            | (decide(z - bound, threshold) != decide(z + bound, threshold))
+        )
+        accepted = decide(z, threshold)
+        if exact.any():
+            z[exact], accepted[exact], _ = self.rule_base.evaluate(
+                matrix[exact], self.membership
+            )
+        self.scored += len(matrix)
+        self.escalated += int(exact.sum())
+        return z, accepted, exact
+
+    def stats(self):
+        return {
+            "step": self.step,
+            "tolerance": self.tolerance,
+            "max_error": self.max_error,
+            "exact_cells": self.exact_cells,
+            "table_bytes": self.z_table.nbytes + self.bound.nbytes,
+            "scored": self.scored,
+            "escalated": self.escalated,
+        }
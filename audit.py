@@ -0,0 +1,305 @@
+# Asynchronous audit trail of fuzzy decisions
+import atexit
+import collections
+import gzip
+import itertools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from engine import CRITERIA_ORDER, compact_traces
+
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+# Rows formatted between two GIL hand-backs of the writer thread
+CHUNK_RECORDS = 512
+_DECISIONS = {None: "", True: ',"decision":"DITERIMA"', False: ',"decision":"DITOLAK"'}
+
+
+class AuditSink:
+    """Append fired rules and alphas of every decision to rotating gzip files
+
+    observe() runs in the scoring path and only snapshots the batch onto a
+    bounded in-memory queue; a background thread wakes every `interval`
+    seconds (or once the queue is half full), extracts the compact traces
+    (fired rule ids + alphas), formats the JSON lines and writes them in one
+    burst. When the queue is full the sink either blocks the caller (policy
+    "block") or drops the batch (policy "drop"); both are counted in
+    metrics(). Every record holds:
+
+        {"ts", "model", "inputs": {criteria: value}, "z", "decision",
+         "fired": [[rule id, alpha], ...]}
+
+    where rule ids index ACCEPTANCE_RULES + REJECTION_RULES of the model.
+    A new file is started once max_bytes of uncompressed JSON is reached.
+    """
+
+    def __init__(
+        self,
+        directory,
+        max_bytes=64 * 1024 * 1024,
+        max_queue=1024,
+        policy="block",
+        prefix="audit",
+        interval=0.05,
+    ):
+        if policy not in ("block", "drop"):
+            raise ValueError(f"Unknown backpressure policy {policy!r}")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_queue = max_queue
+        self.policy = policy
+        self.prefix = prefix
+        self.interval = interval
+        os.makedirs(directory, exist_ok=True)
+        self._pending = collections.deque()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._submitted = 0
+        self._written = 0
+        self._metrics = {
+            "submitted_batches": 0,
+            "submitted_records": 0,
+            "dropped_batches": 0,
+            "dropped_records": 0,
+            "blocked_seconds": 0.0,
+            "max_queue_depth": 0,
+            "written_records": 0,
+            "written_bytes": 0,
+            "files": 0,
+            "write_errors": 0,
+        }
+        self._file = None
+        self._raw = None
+        self._file_bytes = 0
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="audit-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def observe(self, model, matrix, z, accepted, alpha):
+        """Queue a snapshot of a scored batch"""
+        # Callers reuse their arrays after observe() returns, so only the
+        # copies happen here; compaction and formatting run in the writer
+        item = (
+            time.time(),
+            model,
+            matrix.copy(),
+            z.copy(),
+            None if accepted is None else accepted.copy(),
+            alpha.copy(),
+        )
+        n_records = len(z)
+        with self._lock:
+            # Checked under the lock: the writer's final drain takes the lock
+            # after close() sets _closed, so no batch is queued behind it
+            if self._closed:
+                raise RuntimeError("AuditSink is closed")
+            if len(self._pending) >= self.max_queue:
+                if self.policy == "drop":
+                    self._metrics["dropped_batches"] += 1
+                    self._metrics["dropped_records"] += n_records
+                    return
+                start = time.perf_counter()
+                self._wake.set()
+                self._drained.wait_for(
+                    lambda: len(self._pending) < self.max_queue or self._closed
+                )
+                self._metrics["blocked_seconds"] += time.perf_counter() - start
+                if self._closed:
+                    raise RuntimeError("AuditSink is closed")
+            self._pending.append(item)
+            self._submitted += 1
+            depth = len(self._pending)
+            self._metrics["submitted_batches"] += 1
+            self._metrics["submitted_records"] += n_records
+            if depth > self._metrics["max_queue_depth"]:
+                self._metrics["max_queue_depth"] = depth
+        if depth * 2 >= self.max_queue:
+            self._wake.set()
+
+    def metrics(self):
+        """Backpressure and throughput counters"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["queue_depth"] = len(self._pending)
+        return metrics
+
+    def flush(self):
+        """Block until everything queued so far is written to disk"""
+        with self._lock:
+            target = self._submitted
+            self._wake.set()
+            self._drained.wait_for(lambda: self._written >= target)
+
+    def close(self):
+        """Drain the queue, close the current file and stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._drained.notify_all()
+        self._wake.set()
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            with self._lock:
+                # Nothing is queued once _closed is seen here
+                stopping = self._closed
+                items = list(self._pending)
+                self._pending.clear()
+                self._drained.notify_all()
+            if items:
+                try:
+                    self._write(items)
+                    # One sync flush per burst: a crash loses at most the
+                    # last interval
+                    self._file.flush()
+                except Exception:
+                    with self._lock:
+                        self._metrics["write_errors"] += 1
+            with self._lock:
+                self._written += len(items)
+                self._drained.notify_all()
+            if stopping:
+                self._close_file()
+                return
+
+    def _write(self, items):
+        """Compact, format and write a burst of queued batches"""
+        for model, group in _chunks(items):
+            sizes = [len(item[3]) for item in group]
+            timestamps = np.repeat([item[0] for item in group], sizes).tolist()
+            matrix = np.concatenate([item[2] for item in group])
+            z = np.concatenate([item[3] for item in group])
+            decisions = []
+            for item, size in zip(group, sizes):
+                decisions += [None] * size if item[4] is None else item[4].tolist()
+            offsets, rule_ids, alphas = compact_traces(
+                np.concatenate([item[5] for item in group])
+            )
+            if (
+                np.isfinite(matrix).all()
+                and np.isfinite(z).all()
+                and np.isfinite(alphas).all()
+            ):
+                lines = _format_lines(
+                    model, timestamps, matrix, z, decisions, offsets, rule_ids, alphas
+                )
+            else:
+                # json writes non-finite floats as NaN/Infinity, which
+                # json.loads (and so read_audit_log) reads back
+                lines = _encode_lines(
+                    model, timestamps, matrix, z, decisions, offsets, rule_ids, alphas
+                )
+            payload = ("\n".join(lines) + "\n").encode()
+            if self._file is None or self._file_bytes + len(payload) > self.max_bytes:
+                self._rotate()
+            self._file.write(payload)
+            self._file_bytes += len(payload)
+            with self._lock:
+                self._metrics["written_records"] += len(lines)
+                self._metrics["written_bytes"] += len(payload)
+            # Hand the GIL back between chunks instead of holding it for a
+            # full switch interval while scoring threads are waiting
+            time.sleep(0)
+
+    def _rotate(self):
+        self._close_file()
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        for sequence in range(10000):
+            path = os.path.join(
+                self.directory, f"{self.prefix}-{stamp}-{sequence:04d}.jsonl.gz"
+            )
+            try:
+                # Exclusive create: an existing audit file is never reopened
+                raw = open(path, "xb")
+            except FileExistsError:
+                continue
+            self._file = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+            self._raw = raw
+            self._file_bytes = 0
+            with self._lock:
+                self._metrics["files"] += 1
+            return
+        raise RuntimeError(f"No free audit file name for {stamp}")
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+            self._raw.close()
+            self._file = None
+
+
+def _chunks(items, max_records=CHUNK_RECORDS):
+    """Consecutive batches of one model, about max_records rows per chunk"""
+    for model, group in itertools.groupby(items, key=lambda item: item[1]):
+        chunk, n_records = [], 0
+        for item in group:
+            chunk.append(item)
+            n_records += len(item[3])
+            if n_records >= max_records:
+                yield model, chunk
+                chunk, n_records = [], 0
+        if chunk:
+            yield model, chunk
+
+
+def _format_lines(model, timestamps, matrix, z, decisions, offsets, rule_ids, alphas):
+    """JSON lines of finite values, formatted directly (floats via repr)"""
+    pairs = list(map("[%d,%r]".__mod__, zip(rule_ids.tolist(), alphas.tolist())))
+    offsets = offsets.tolist()
+    inputs = ",".join('"%s":%%r' % criteria for criteria in CRITERIA_ORDER)
+    template = '{"ts":%%r,"model":%s,"inputs":{%s},"z":%%r%%s,"fired":[%%s]}' % (
+        json.dumps(model),
+        inputs,
+    )
+    return [
+        template % (timestamp, *row, score, _DECISIONS[decision], ",".join(pairs[i:j]))
+        for timestamp, row, score, decision, i, j in zip(
+            timestamps, matrix.tolist(), z.tolist(), decisions, offsets, offsets[1:]
+        )
+    ]
+
+
+def _encode_lines(model, timestamps, matrix, z, decisions, offsets, rule_ids, alphas):
+    """JSON lines through json.JSONEncoder, for batches with non-finite values"""
+    rule_ids = rule_ids.tolist()
+    alphas = alphas.tolist()
+    offsets = offsets.tolist()
+    lines = []
+    for row, (timestamp, inputs, score, decision) in enumerate(
+        zip(timestamps, matrix.tolist(), z.tolist(), decisions)
+    ):
+        record = {
+            "ts": timestamp,
+            "model": model,
+            "inputs": dict(zip(CRITERIA_ORDER, inputs)),
+            "z": score,
+        }
+        if decision is not None:
+            record["decision"] = "DITERIMA" if decision else "DITOLAK"
+        record["fired"] = [
+            [rule_ids[i], alphas[i]] for i in range(offsets[row], offsets[row + 1])
+        ]
+        lines.append(_ENCODER.encode(record))
+    return lines
+
+
+def read_audit_log(path):
+    """Yield the records of one audit file"""
+    with gzip.open(path, "rt") as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
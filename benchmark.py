@@ -0,0 +1,348 @@
+# Benchmarks for the scoring engine
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import shared
+from approx import ApproximateScorer
+from audit import AuditSink
+from engine import (
+    AGGREGATIONS,
+    CRITERIA_ORDER,
+    TNORMS,
+    ComponentAggregator,
+    CompiledRuleBase,
+    DecisionLattice,
+    MembershipFunctions,
+    ModelRegistry,
+    Scorer,
+    pack_components,
+)
+from evaluator import FuzzyEvaluator
+from latency import latency_percentiles
+
+
+def random_criteria(n_rows, seed=0):
+    """Criteria matrix on the slider lattice, like create_input_form produces"""
+    rng = np.random.default_rng(seed)
+    counts = np.array([3, 3, 2, 3, 3])
+    sums = np.stack(
+        [rng.integers(1, 6, size=(n_rows, n)).sum(axis=1) for n in counts], axis=1
+    )
+    return (sums / counts / 5) * 100
+
+
+class GcWatch:
+    """Count garbage collections per generation while active"""
+
+    def __init__(self):
+        self.collections = [0, 0, 0]
+
+    def _callback(self, phase, info):
+        if phase == "start":
+            self.collections[info["generation"]] += 1
+
+    def __enter__(self):
+        gc.collect()
+        gc.callbacks.append(self._callback)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self._callback)
+
+
+def bench_gc(args):
+    """Steady-state GC activity of Scorer.score_into versus FuzzyEvaluator"""
+    matrix = random_criteria(args.rows)
+    scorer = Scorer(batch_size=args.rows)
+
+    def scorer_worker():
+        z_out = np.empty(args.rows)
+        accepted_out = np.empty(args.rows, dtype=bool)
+        scorer.score_into(matrix, z_out, accepted_out)  # warm up thread scratch
+        for _ in range(args.iterations):
+            scorer.score_into(matrix, z_out, accepted_out)
+
+    def evaluator_worker():
+        rows = [dict(zip(CRITERIA_ORDER, row)) for row in matrix.tolist()]
+        for _ in range(max(1, args.iterations // args.rows)):
+            for inputs in rows:
+                FuzzyEvaluator.evaluate_credit(inputs)
+
+    for label, worker, scored in (
+        ("Scorer.score_into", scorer_worker, args.iterations * args.rows),
+        (
+            "FuzzyEvaluator",
+            evaluator_worker,
+            max(1, args.iterations // args.rows) * args.rows,
+        ),
+    ):
+        threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+        with GcWatch() as watch:
+            before = gc.get_count()
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            after = gc.get_count()
+        rate = scored * args.threads / elapsed
+        print(
+            f"{label:<20} {rate:>12,.0f} rows/s  "
+            f"collections gen0/1/2 = {watch.collections}  "
+            f"gc count {before} -> {after}"
+        )
+
+
+def bench_operators(args):
+    """Scorer throughput for every t-norm / aggregation combination"""
+    matrix = random_criteria(args.rows)
+    z_out = np.empty(args.rows)
+    accepted_out = np.empty(args.rows, dtype=bool)
+    rules = CompiledRuleBase.from_config().rules
+    rng = np.random.default_rng(1)
+    for tnorm in TNORMS:
+        for aggregation in AGGREGATIONS:
+            rule_base = CompiledRuleBase(
+                rules,
+                rng.random(len(rules)),
+                weights=rng.random(len(rules)),
+                tnorm=tnorm,
+                aggregation=aggregation,
+            )
+            scorer = Scorer(rule_base)
+            scorer.score_into(matrix, z_out, accepted_out)
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                scorer.score_into(matrix, z_out, accepted_out)
+            rate = args.rows * args.repeat / (time.perf_counter() - start)
+            print(f"{tnorm:<8} {aggregation:<17} {rate:>12,.0f} rows/s")
+
+
+def bench_audit(args):
+    """Per-request scoring latency with and without the audit sink"""
+    matrix = random_criteria(args.rows * args.requests)
+    with tempfile.TemporaryDirectory() as directory:
+        for label, observers in (("no audit", []), ("audit", None)):
+            sink = None
+            if observers is None:
+                sink = AuditSink(directory, policy=args.policy)
+                observers = [sink]
+            registry = ModelRegistry(observers=observers)
+            registry.register(CompiledRuleBase.from_config())
+            registry.score(matrix[: args.rows])
+            samples = []
+            for start in range(0, len(matrix), args.rows):
+                begin = time.perf_counter()
+                registry.score(matrix[start : start + args.rows])
+                samples.append(time.perf_counter() - begin)
+            percentiles = latency_percentiles(samples)
+            print(
+                f"{label:<9} "
+                + "  ".join(f"p{p}={v:8.1f}us" for p, v in percentiles.items())
+            )
+            if sink is not None:
+                sink.close()
+                print(f"          sink metrics: {sink.metrics()}")
+
+
+def bench_lattice(args):
+    """Packed-code lattice lookup versus aggregation + vectorized evaluation"""
+    rng = np.random.default_rng(0)
+    components = rng.integers(1, 6, size=(args.rows, 14), dtype=np.uint8)
+    codes = pack_components(components)
+    start = time.perf_counter()
+    lattice = DecisionLattice()
+    print(f"lattice build        {time.perf_counter() - start:8.3f} s")
+    rule_base = CompiledRuleBase.from_config()
+    aggregator = ComponentAggregator()
+    for label, run in (
+        (
+            "aggregate+evaluate",
+            lambda: rule_base.evaluate(aggregator.aggregate(components)),
+        ),
+        ("lattice components", lambda: lattice.score_components(components)),
+        ("lattice codes", lambda: lattice.score_codes(codes)),
+    ):
+        start = time.perf_counter()
+        run()
+        rate = args.rows / (time.perf_counter() - start)
+        print(f"{label:<20} {rate:>12,.0f} rows/s")
+    named = {
+        component: score
+        for (_, component), score in zip(aggregator.components, components[0].tolist())
+    }
+    print(
+        f"storage: {components.nbytes / args.rows:.0f} B/applicant as uint8, "
+        f"{codes.nbytes / args.rows:.0f} B as packed code, "
+        f"{len(json.dumps(named))} B as JSON object"
+    )
+
+
+def bench_membership(args):
+    """Lattice table lookup versus analytical fuzzification"""
+    matrix = random_criteria(args.rows)
+    lookup = MembershipFunctions.from_config()
+    analytical = MembershipFunctions(lookup.breakpoints)
+    registries = {}
+    for label, membership in (("lookup", lookup), ("analytical", analytical)):
+        start = time.perf_counter()
+        membership.fuzzify(matrix)
+        rate = args.rows / (time.perf_counter() - start)
+        print(f"fuzzify   {label:<11} {rate:>12,.0f} rows/s")
+        registries[label] = ModelRegistry(membership)
+        registries[label].register(CompiledRuleBase.from_config())
+    rows = [dict(zip(CRITERIA_ORDER, row)) for row in matrix[: args.single].tolist()]
+    for label, registry in registries.items():
+        start = time.perf_counter()
+        for inputs in rows:
+            registry.score_one(inputs)
+        latency = (time.perf_counter() - start) / len(rows) * 1e6
+        print(f"score_one {label:<11} {latency:>12.1f} us/applicant")
+
+
+def bench_approx(args):
+    """Interpolated fast mode versus the exact batch path"""
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    approximate = ApproximateScorer(step=args.step, tolerance=args.tolerance)
+    print(f"table build          {time.perf_counter() - start:8.3f} s")
+    rule_base = CompiledRuleBase.from_config()
+    for label, matrix in (
+        ("continuous", rng.random((args.rows, len(CRITERIA_ORDER))) * 100),
+        ("slider lattice", random_criteria(args.rows)),
+    ):
+        start = time.perf_counter()
+        z, accepted, exact = approximate.score(matrix)
+        fast = args.rows / (time.perf_counter() - start)
+        start = time.perf_counter()
+        z_exact, accepted_exact, _ = rule_base.evaluate(matrix)
+        slow = args.rows / (time.perf_counter() - start)
+        print(
+            f"{label:<15} approx {fast:>12,.0f} rows/s  exact {slow:>12,.0f} rows/s  "
+            f"escalated {exact.mean():.2%}  max |dz| {np.abs(z - z_exact).max():.2e}  "
+            f"decision mismatches {int((accepted != accepted_exact).sum())}"
+        )
+    # Reference check against the original evaluator on a sample
+    sample = matrix[: args.reference]
+    z, _, _ = approximate.score(sample)
+    worst = 0.0
+    for row, value in zip(sample.tolist(), z.tolist()):
+        results = FuzzyEvaluator.evaluate_credit(dict(zip(CRITERIA_ORDER, row)))
+        worst = max(worst, abs(value - FuzzyEvaluator.defuzzify(results)))
+    print(f"max |dz| vs FuzzyEvaluator on {len(sample):,} rows: {worst:.2e}")
+    print(f"scorer stats: {approximate.stats()}")
+
+
+def _memory_kb():
+    """Resident and private (not shared with other processes) memory in KiB"""
+    sizes = {"Rss": 0, "Private": 0}
+    with open("/proc/self/smaps_rollup") as handle:
+        for line in handle:
+            key, _, value = line.partition(":")
+            if key == "Rss":
+                sizes["Rss"] += int(value.split()[0])
+            elif key in ("Private_Clean", "Private_Dirty"):
+                sizes["Private"] += int(value.split()[0])
+    return sizes
+
+
+def _shared_worker(mode, path, step):
+    start = time.perf_counter()
+    if mode == "shared":
+        model = shared.attach(path, approximate_step=step)
+        lattice, approximate = model.lattice, model.approximate
+    else:
+        lattice = DecisionLattice()
+        approximate = ApproximateScorer(step=step)
+    ready = time.perf_counter() - start
+    # Touch every table page, as steady-state scoring eventually does
+    float(lattice.z.sum() + approximate.z_table.sum() + approximate.bound.sum())
+    return ready, _memory_kb()
+
+
+def bench_shared(args):
+    """Per-worker warm-up time and memory, local tables versus a shared model"""
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        path = os.path.join(directory, "bench.model")
+        start = time.perf_counter()
+        shared.publish(path, approximate_step=args.step)
+        print(
+            f"publish {time.perf_counter() - start:.2f} s, "
+            f"{os.path.getsize(path) / 2**20:.1f} MiB at {path}"
+        )
+        for mode in ("local", "shared"):
+            with context.Pool(args.workers) as pool:
+                results = pool.starmap(
+                    _shared_worker, [(mode, path, args.step)] * args.workers
+                )
+            ready = [seconds for seconds, _ in results]
+            rss = sum(memory["Rss"] for _, memory in results) / 1024
+            private = sum(memory["Private"] for _, memory in results) / 1024
+            print(
+                f"{mode:<7} {args.workers} workers  warm-up max {max(ready):6.3f} s  "
+                f"RSS {rss / args.workers:7.1f} MiB/worker  "
+                f"private {private / args.workers:7.1f} MiB/worker"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the scoring engine")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gc_parser = commands.add_parser("gc", help=bench_gc.__doc__)
+    gc_parser.add_argument("--rows", type=int, default=64)
+    gc_parser.add_argument("--iterations", type=int, default=20000)
+    gc_parser.add_argument("--threads", type=int, default=4)
+    gc_parser.set_defaults(func=bench_gc)
+
+    operators_parser = commands.add_parser("operators", help=bench_operators.__doc__)
+    operators_parser.add_argument("--rows", type=int, default=100_000)
+    operators_parser.add_argument("--repeat", type=int, default=5)
+    operators_parser.set_defaults(func=bench_operators)
+
+    audit_parser = commands.add_parser("audit", help=bench_audit.__doc__)
+    audit_parser.add_argument("--rows", type=int, default=1)
+    audit_parser.add_argument("--requests", type=int, default=20000)
+    audit_parser.add_argument("--policy", choices=("block", "drop"), default="block")
+    audit_parser.set_defaults(func=bench_audit)
+
+    lattice_parser = commands.add_parser("lattice", help=bench_lattice.__doc__)
+    lattice_parser.add_argument("--rows", type=int, default=1_000_000)
+    lattice_parser.set_defaults(func=bench_lattice)
+
+    membership_parser = commands.add_parser("membership", help=bench_membership.__doc__)
+    membership_parser.add_argument("--rows", type=int, default=1_000_000)
+    membership_parser.add_argument("--single", type=int, default=20_000)
+    membership_parser.set_defaults(func=bench_membership)
+
+    approx_parser = commands.add_parser("approx", help=bench_approx.__doc__)
+    approx_parser.add_argument("--rows", type=int, default=1_000_000)
+    approx_parser.add_argument("--step", type=float, default=5.0)
+    approx_parser.add_argument("--tolerance", type=float, default=0.01)
+    approx_parser.add_argument("--reference", type=int, default=5_000)
+    approx_parser.set_defaults(func=bench_approx)
+
+    shared_parser = commands.add_parser("shared", help=bench_shared.__doc__)
+    shared_parser.add_argument("--workers", type=int, default=4)
+    shared_parser.add_argument("--step", type=float, default=5.0)
+    shared_parser.add_argument(
+        "--directory", default="/dev/shm" if os.path.isdir("/dev/shm") else None
+    )
+    shared_parser.set_defaults(func=bench_shared)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
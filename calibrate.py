@@ -0,0 +1,530 @@
+# Calibrate membership breakpoints and the decision cut-off on labeled history
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from analyzer import DOMAIN
+from engine import (
+    CRITERIA_ORDER,
+    MAX_LEVELS,
+    TNORMS,
+    CompiledRuleBase,
+    MembershipFunctions,
+    config_from_dict,
+    config_to_dict,
+    decide,
+    dump_config,
+    load_config,
+)
+from evaluator import FuzzyConfig
+from replay import check_models, decode_records, iter_blocks
+
+METRICS = ("auc", "loss")
+
+# decide() compares z rounded to 2 decimals, so these are all distinct cut-offs
+CUTOFFS = np.arange(101) / 100
+
+_calibration = None
+
+
+def parse_labeled_block(kind, header, lines, label, model=None):
+    """(N, 5) criteria matrix, 0/1 labels (1 = defaulted) and model names of a block"""
+    if kind == "csv":
+        if label not in header:
+            raise ValueError(f"missing label column {label!r}")
+        columns = [header.index(c) for c in CRITERIA_ORDER] + [header.index(label)]
+        data = np.loadtxt(
+            io.StringIO("".join(lines)), delimiter=",", ndmin=2, usecols=columns
+        )
+        matrix, labels, models = data[:, :-1], data[:, -1], set()
+    else:
+        records, models = decode_records(lines, model)
+        matrix = np.array(
+            [[record["inputs"][c] for c in CRITERIA_ORDER] for record in records],
+            dtype=np.float64,
+        ).reshape(-1, len(CRITERIA_ORDER))
+        labels = np.array([float(record[label]) for record in records])
+    if not np.isfinite(matrix).all():
+        raise ValueError("criteria values must be finite")
+    if not np.isin(labels, (0.0, 1.0)).all():
+        raise ValueError(f"label {label!r} must be 0 (repaid) or 1 (defaulted)")
+    return matrix, labels.astype(np.int64), models
+
+
+def collapse(cells, counts):
+    """Merge identical criteria rows, summing their (repaid, defaulted) counts"""
+    cells, inverse = np.unique(cells, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    merged = np.stack(
+        [
+            np.bincount(inverse, counts[:, column], minlength=len(cells))
+            for column in range(2)
+        ],
+        axis=1,
+    )
+    return cells, merged.astype(np.int64)
+
+
+def load_history(
+    paths, label="default", block_size=50_000, holdout=0.0, seed=0, model=None
+):
+    """Stream labeled files into collapsed (cells, counts) training and holdout sets
+
+    Slider inputs take at most 257,049 distinct criteria vectors, so millions
+    of records collapse to a small table that is merged block by block.
+    Records are assigned to the holdout set at random with probability
+    `holdout`; the holdout set is None when it is 0. Audit logs of several
+    models hold one record per applicant and model, so `model` must then
+    name the one whose records are counted.
+    """
+    rng = np.random.default_rng(seed)
+    empty = (np.empty((0, len(CRITERIA_ORDER))), np.empty((0, 2), dtype=np.int64))
+    sets = {"train": empty, "holdout": empty}
+    seen = set()
+    for kind, header, lines, _ in iter_blocks(paths, block_size, model):
+        matrix, labels, models = parse_labeled_block(kind, header, lines, label, model)
+        seen |= models
+        check_models(seen, model)
+        counts = np.stack([1 - labels, labels], axis=1)
+        held = rng.random(len(matrix)) < holdout
+        for name, rows in (("train", ~held), ("holdout", held)):
+            if rows.any():
+                cells, total = sets[name]
+                sets[name] = collapse(
+                    np.concatenate([cells, matrix[rows]]),
+                    np.concatenate([total, counts[rows]]),
+                )
+    if not sets["train"][1].sum():
+        raise ValueError("no training records")
+    return sets["train"], (sets["holdout"] if holdout > 0 else None)
+
+
+def auc(z, repaid, defaulted):
+    """Probability that a repaid record scores above a defaulted one, ties count half"""
+    _, inverse = np.unique(z, return_inverse=True)
+    inverse = inverse.ravel()
+    good = np.bincount(inverse, repaid)
+    bad = np.bincount(inverse, defaulted)
+    pairs = good.sum() * bad.sum()
+    if not pairs:
+        return 0.5
+    return float((good * (np.cumsum(bad) - 0.5 * bad)).sum() / pairs)
+
+
+def best_cutoff(z, repaid, defaulted, cost_bad, cost_good, prefer=0.5):
+    """(expected loss per record, cut-off) minimising the loss over CUTOFFS
+
+    Accepting a defaulter costs cost_bad and rejecting a good payer cost_good.
+    Among equally good cut-offs the one nearest `prefer` is returned.
+    """
+    # z > k / 100 after rounding to 2 decimals is rint(100 z) > k
+    rounded = np.clip(np.rint(z * 100), 0, len(CUTOFFS)).astype(np.intp)
+    good = np.cumsum(np.bincount(rounded, repaid, minlength=len(CUTOFFS) + 1))
+    bad = np.cumsum(np.bincount(rounded, defaulted, minlength=len(CUTOFFS) + 1))
+    loss = cost_bad * (bad[-1] - bad[:-1]) + cost_good * good[:-1]
+    loss /= good[-1] + bad[-1]
+    ties = np.flatnonzero(loss <= loss.min() + 1e-12)
+    best = ties[np.argmin(np.abs(CUTOFFS[ties] - prefer))]
+    return float(loss[best]), float(CUTOFFS[best])
+
+
+class Calibration:
+    """Candidate breakpoints scored on collapsed history with the vectorized engine
+
+    Every criteria column is reduced to its distinct values (at most 13 for
+    slider inputs). Under a candidate, values with the same membership
+    degrees in every level form a class, and cells sharing the classes of
+    all five criteria share z; the rule strengths are therefore evaluated
+    once per class combination, applying the t-norm criteria by criteria
+    like rule_strengths, and the counts are summed per combination. The
+    rules, operators and weights of `config` stay fixed; only breakpoints
+    and the cut-off move.
+    """
+
+    def __init__(
+        self,
+        cells,
+        counts,
+        config=FuzzyConfig,
+        metric="auc",
+        cost_bad=5.0,
+        cost_good=1.0,
+    ):
+        if metric not in METRICS:
+            raise ValueError(f"unknown metric {metric!r}, expected {list(METRICS)}")
+        membership = MembershipFunctions.from_config(config)
+        self.rule_base = CompiledRuleBase.from_config(config)
+        self.rule_base.validate(membership)
+        self.breakpoints = membership.breakpoints
+        self.metric = metric
+        self.cost_bad = float(cost_bad)
+        self.cost_good = float(cost_good)
+        self.repaid = counts[:, 0].astype(np.float64)
+        self.defaulted = counts[:, 1].astype(np.float64)
+        self.values, codes = [], []
+        for idx in range(len(CRITERIA_ORDER)):
+            values, inverse = np.unique(cells[:, idx], return_inverse=True)
+            self.values.append(values)
+            codes.append(inverse.ravel())
+        self.codes = np.stack(codes)  # (5, N), one row per criteria
+
+    def _classes(self, breakpoints):
+        """Class of every distinct value and per-rule degrees of every class"""
+        classes, degrees = [], []
+        for idx, criteria in enumerate(CRITERIA_ORDER):
+            shapes = breakpoints[criteria]
+            table = np.zeros((len(self.values[idx]), MAX_LEVELS))
+            for position, shape in enumerate(shapes):
+                table[:, position] = MembershipFunctions.degree(
+                    self.values[idx], shape, position, len(shapes)
+                )
+            table, inverse = np.unique(table, axis=0, return_inverse=True)
+            classes.append(inverse.ravel())
+            degrees.append(table[:, self.rule_base.levels[:, idx]])
+        return classes, degrees
+
+    def groups(self, breakpoints):
+        """(z, repaid, defaulted) over groups of cells that share z
+
+        The groups are class combinations, or the cells themselves when
+        there are more combinations than cells.
+        """
+        classes, degrees = self._classes(breakpoints)
+        kernel = TNORMS[self.rule_base.tnorm]
+        sizes = [len(degree) for degree in degrees]
+        if np.prod(sizes, dtype=np.float64) > self.codes.shape[1]:
+            alpha = degrees[0][classes[0][self.codes[0]]]
+            for idx in range(1, len(CRITERIA_ORDER)):
+                kernel(alpha, degrees[idx][classes[idx][self.codes[idx]]], out=alpha)
+            return self.rule_base.defuzzify(alpha), self.repaid, self.defaulted
+        alpha = degrees[0]
+        group = classes[0][self.codes[0]]
+        for idx in range(1, len(CRITERIA_ORDER)):
+            alpha = kernel(alpha[:, None, :], degrees[idx][None, :, :])
+            alpha = alpha.reshape(-1, len(self.rule_base.rules))
+            group = group * sizes[idx] + classes[idx][self.codes[idx]]
+        return (
+            self.rule_base.defuzzify(alpha),
+            np.bincount(group, self.repaid, minlength=len(alpha)),
+            np.bincount(group, self.defaulted, minlength=len(alpha)),
+        )
+
+    def evaluate(self, breakpoints, cutoff=None):
+        """Metrics of one candidate; the cut-off is optimised unless given"""
+        z, repaid, defaulted = self.groups(breakpoints)
+        if cutoff is None:
+            _, cutoff = best_cutoff(
+                z,
+                repaid,
+                defaulted,
+                self.cost_bad,
+                self.cost_good,
+                self.rule_base.threshold,
+            )
+        accepted = decide(z, cutoff)
+        records = repaid.sum() + defaulted.sum()
+        bad = defaulted[accepted].sum()
+        loss = (
+            self.cost_bad * bad + self.cost_good * repaid[~accepted].sum()
+        ) / records
+        area = auc(z, repaid, defaulted)
+        approved = repaid[accepted].sum() + bad
+        return {
+            "score": area if self.metric == "auc" else -loss,
+            "auc": area,
+            "expected_loss": float(loss),
+            "cutoff": float(cutoff),
+            "acceptance_rate": float(approved / records),
+            "bad_rate": float(bad / approved) if approved else 0.0,
+        }
+
+
+def _key(breakpoints):
+    return tuple(breakpoints[criteria] for criteria in CRITERIA_ORDER)
+
+
+def valid_breakpoints(breakpoints, domain=DOMAIN):
+    """Well-formed shapes inside the domain whose levels keep their order"""
+    try:
+        MembershipFunctions(breakpoints)
+    except ValueError:
+        return False
+    for shapes in breakpoints.values():
+        if any(not domain[0] <= point <= domain[1] for s in shapes for point in s):
+            return False
+        for lower, upper in zip(shapes, shapes[1:]):
+            if lower[0] > upper[0] or lower[-1] > upper[-1]:
+                return False
+    return True
+
+
+def neighbours(breakpoints, rng, count, step=5.0):
+    """Up to `count` distinct valid candidates moving one or two breakpoints
+
+    Every move is one or two multiples of `step`, so breakpoints stay on the
+    grid they start on.
+    """
+    points = [
+        (criteria, position, point)
+        for criteria in CRITERIA_ORDER
+        for position, shape in enumerate(breakpoints[criteria])
+        for point in range(len(shape))
+    ]
+    candidates = {}
+    for _ in range(20 * count):
+        if len(candidates) >= count:
+            break
+        candidate = {c: [list(shape) for shape in breakpoints[c]] for c in breakpoints}
+        for move in rng.choice(len(points), size=rng.integers(1, 3), replace=False):
+            criteria, position, point = points[move]
+            candidate[criteria][position][point] += step * rng.choice((-2, -1, 1, 2))
+        candidate = {
+            c: tuple(tuple(float(point) for point in shape) for shape in shapes)
+            for c, shapes in candidate.items()
+        }
+        if valid_breakpoints(candidate):
+            candidates.setdefault(_key(candidate), candidate)
+    return list(candidates.values())
+
+
+def _init_worker(cells, counts, config_data, metric, cost_bad, cost_good):
+    global _calibration
+    _calibration = Calibration(
+        cells,
+        counts,
+        config_from_dict(config_data, "BaseConfig"),
+        metric,
+        cost_bad,
+        cost_good,
+    )
+
+
+def _evaluate_worker(breakpoints):
+    return _calibration.evaluate(breakpoints)
+
+
+def calibrate(
+    history,
+    config=FuzzyConfig,
+    metric="auc",
+    cost_bad=5.0,
+    cost_good=1.0,
+    rounds=50,
+    population=256,
+    step=5.0,
+    patience=5,
+    workers=None,
+    seed=0,
+):
+    """Local search over breakpoints from those of `config`
+
+    Each round scores `population` neighbours of the best candidate so far
+    across `workers` processes and moves to the best one if it improves the
+    metric; the search stops after `rounds` rounds or `patience` rounds
+    without improvement. For every candidate the cut-off minimising expected
+    loss is chosen exactly, which with metric "auc" only sets the cut-off.
+    """
+    workers = workers or os.cpu_count() or 1
+    cells, counts = history
+    calibration = Calibration(cells, counts, config, metric, cost_bad, cost_good)
+    breakpoints = calibration.breakpoints
+    best = calibration.evaluate(breakpoints)
+    seen = {_key(breakpoints)}
+    rng = np.random.default_rng(seed)
+    evaluated, completed, stalled = 1, 0, 0
+    start = time.perf_counter()
+    pool = None
+    if workers > 1:
+        initargs = (cells, counts, config_to_dict(config), metric, cost_bad, cost_good)
+        pool = multiprocessing.Pool(workers, _init_worker, initargs)
+    try:
+        for _ in range(rounds):
+            candidates = [
+                candidate
+                for candidate in neighbours(breakpoints, rng, population, step)
+                if _key(candidate) not in seen
+            ]
+            if not candidates:
+                break
+            seen.update(map(_key, candidates))
+            if pool is None:
+                results = [calibration.evaluate(candidate) for candidate in candidates]
+            else:
+                chunk = max(1, len(candidates) // (4 * workers))
+                results = pool.map(_evaluate_worker, candidates, chunk)
+            evaluated += len(candidates)
+            completed += 1
+            top = max(range(len(results)), key=lambda idx: results[idx]["score"])
+            if results[top]["score"] > best["score"] + 1e-12:
+                breakpoints, best, stalled = candidates[top], results[top], 0
+            else:
+                stalled += 1
+                if stalled >= patience:
+                    break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    seconds = time.perf_counter() - start
+    return {
+        "breakpoints": breakpoints,
+        "cutoff": best["cutoff"],
+        "search": {
+            "rounds": completed,
+            "evaluated": evaluated,
+            "seconds": seconds,
+            "per_second": evaluated / seconds if seconds else 0.0,
+            "workers": workers,
+        },
+    }
+
+
+def calibrated_config(config, breakpoints, cutoff, name="CalibratedConfig"):
+    """`config` with the calibrated breakpoints and DECISION_THRESHOLD"""
+    data = config_to_dict(config)
+    data["MEMBERSHIP_BREAKPOINTS"] = {
+        c: [list(shape) for shape in breakpoints[c]] for c in CRITERIA_ORDER
+    }
+    data["DECISION_THRESHOLD"] = cutoff
+    return config_from_dict(data, name)
+
+
+def calibration_report(
+    train,
+    holdout,
+    result,
+    config=FuzzyConfig,
+    metric="auc",
+    cost_bad=5.0,
+    cost_good=1.0,
+):
+    """Baseline vs calibrated metrics on the training and holdout sets"""
+    report = {
+        "metric": metric,
+        "costs": {"bad_accepted": cost_bad, "good_rejected": cost_good},
+        "records": {},
+        "cells": {},
+        "baseline": {},
+        "calibrated": {},
+        "breakpoints": {
+            c: [list(shape) for shape in result["breakpoints"][c]]
+            for c in CRITERIA_ORDER
+        },
+        "cutoff": result["cutoff"],
+        "search": result["search"],
+    }
+    for name, history in (("train", train), ("holdout", holdout)):
+        if history is None:
+            continue
+        calibration = Calibration(*history, config, metric, cost_bad, cost_good)
+        report["records"][name] = int(history[1].sum())
+        report["cells"][name] = len(history[0])
+        report["baseline"][name] = calibration.evaluate(
+            calibration.breakpoints, calibration.rule_base.threshold
+        )
+        report["calibrated"][name] = calibration.evaluate(
+            result["breakpoints"], result["cutoff"]
+        )
+    return report
+
+
+def format_report(report):
+    search = report["search"]
+    lines = [
+        f"Metric: {report['metric']}  (loss: defaulter accepted "
+        f"{report['costs']['bad_accepted']:g}, good payer rejected "
+        f"{report['costs']['good_rejected']:g})",
+        f"Search: {search['evaluated']:,} candidates in {search['seconds']:.1f} s "
+        f"({search['per_second']:,.0f}/s, {search['workers']} workers, "
+        f"{search['rounds']} rounds)",
+        "",
+        f"{'':<22}{'AUC':>8}{'loss':>9}{'cut-off':>9}{'accept':>9}{'bad rate':>10}",
+    ]
+    for name in report["records"]:
+        lines.append(
+            f"{name} ({report['records'][name]:,} records, "
+            f"{report['cells'][name]:,} cells)"
+        )
+        for side in ("baseline", "calibrated"):
+            entry = report[side][name]
+            lines.append(
+                f"  {side:<20}{entry['auc']:>8.4f}{entry['expected_loss']:>9.4f}"
+                f"{entry['cutoff']:>9.2f}{entry['acceptance_rate']:>9.1%}"
+                f"{entry['bad_rate']:>10.1%}"
+            )
+    lines += ["", "Breakpoints:"]
+    for criteria, shapes in report["breakpoints"].items():
+        lines.append(
+            f"  {criteria:<11}"
+            + "  ".join("(" + ", ".join(f"{p:g}" for p in s) + ")" for s in shapes)
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fit membership breakpoints and the cut-off on labeled history"
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="labeled .csv[.gz] or .jsonl[.gz] files"
+    )
+    parser.add_argument(
+        "--label", default="default", help="0/1 column or field, 1 = defaulted"
+    )
+    parser.add_argument(
+        "--model",
+        help="model whose audit records are used, needed when the logs hold several",
+    )
+    parser.add_argument("--metric", choices=METRICS, default="auc")
+    parser.add_argument("--cost-bad", type=float, default=5.0)
+    parser.add_argument("--cost-good", type=float, default=1.0)
+    parser.add_argument("--config", help="starting config JSON (default: FuzzyConfig)")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--population", type=int, default=256)
+    parser.add_argument("--step", type=float, default=5.0)
+    parser.add_argument("--patience", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--block-size", type=int, default=50_000)
+    parser.add_argument("--out", help="write the calibrated config JSON here")
+    parser.add_argument("--json", help="also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config) if args.config else FuzzyConfig
+    train, holdout = load_history(
+        args.inputs, args.label, args.block_size, args.holdout, args.seed, args.model
+    )
+    costs = (args.cost_bad, args.cost_good)
+    result = calibrate(
+        train,
+        config,
+        args.metric,
+        *costs,
+        rounds=args.rounds,
+        population=args.population,
+        step=args.step,
+        patience=args.patience,
+        workers=args.workers,
+        seed=args.seed,
+    )
+    report = calibration_report(train, holdout, result, config, args.metric, *costs)
+    print(format_report(report))
+    if args.out:
+        dump_config(
+            calibrated_config(config, result["breakpoints"], result["cutoff"]),
+            args.out,
+        )
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,21 @@
 # Import required libraries
+import hashlib
+import io
+import math
+
+import numpy as np
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
+
+from engine import (
+    CRITERIA_ORDER,
+    ComponentAggregator,
+    CompiledRuleBase,
+    ModelRegistry,
+    check_criteria_values,
+)
+from evaluator import FuzzyConfig, FuzzyEvaluator
+from explain import Explainer
 
 # Configure page settings
 st.set_page_config(
@@ -28,266 +42,8 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-
-# Configuration for fuzzy rules
-class FuzzyConfig:
-    # Define acceptance rules
-    ACCEPTANCE_RULES = [
-        (3, 3, 3, 2, 3),
-        (3, 3, 3, 2, 2),
-        (3, 3, 2, 2, 3),
-        (3, 2, 3, 2, 3),
-        (3, 3, 2, 2, 2),
-        (3, 2, 3, 2, 2),
-        (3, 2, 2, 2, 3),
-        (2, 3, 3, 2, 3),
-        (2, 2, 2, 2, 2),
-        (2, 2, 2, 2, 3),
-        (2, 2, 3, 2, 2),
-        (2, 3, 2, 2, 2),
-        (3, 2, 2, 2, 2),
-        (2, 2, 3, 2, 3),
-        (2, 3, 2, 2, 3),
-        (3, 2, 2, 2, 3),
-        (2, 3, 3, 2, 2),
-        (3, 2, 3, 2, 2),
-        (3, 3, 2, 2, 2),
-    ]
-
-    # Define rejection rules
-    REJECTION_RULES = [
-        (1, 1, 1, 1, 1),
-        (1, 1, 1, 1, 2),
-        (1, 1, 2, 1, 1),
-        (1, 2, 1, 1, 1),
-        (2, 1, 1, 1, 1),
-        (1, 1, 2, 2, 1),
-        (1, 2, 1, 2, 1),
-        (2, 1, 1, 2, 1),
-        (2, 2, 1, 1, 1),
-        (2, 1, 2, 1, 1),
-        (1, 2, 2, 1, 1),
-        (2, 1, 1, 1, 2),
-        (1, 2, 1, 1, 2),
-        (1, 1, 2, 1, 2),
-        (2, 2, 1, 1, 2),
-        (2, 1, 2, 1, 2),
-        (1, 2, 2, 1, 2),
-        (1, 1, 1, 2, 1),
-        (1, 1, 2, 2, 2),
-        (2, 1, 1, 2, 2),
-        (1, 2, 1, 2, 2),
-        (2, 2, 1, 2, 1),
-        (2, 1, 2, 2, 1),
-        (1, 2, 2, 2, 1),
-        (2, 2, 1, 2, 2),
-        (2, 1, 2, 2, 2),
-        (1, 2, 2, 2, 2),
-        (1, 1, 1, 2, 2),
-        (1, 1, 1, 1, 3),
-    ]
-
-    # Criteria data structure
-    CRITERIA_DATA = {
-        "Character": {
-            "title": "Character",
-            "description": "Penilaian karakter dan kepribadian nasabah",
-            "components": {
-                "Itikad": "Penilaian itikad dan tanggung jawab (1: Sangat Buruk - 5: Sangat Baik)",
-                "Gaya Hidup": "Penilaian pola hidup (1: Sangat Boros - 5: Sangat Hemat)",
-                "Komitmen": "Penilaian komitmen pembayaran (1: Tidak Ada - 5: Sangat Tinggi)",
-            },
-        },
-        "Capital": {
-            "title": "Capital",
-            "description": "Penilaian modal dan aset nasabah",
-            "components": {
-                "Penghasilan Tetap": "Penghasilan bulanan (1: <2jt, 2: 2-3.5jt, 3: 3.5-5jt, 4: 5-7.5jt, 5: >7.5jt)",
-                "Penghasilan Sampingan": "Penghasilan tambahan (1: Tidak ada, 2: <1jt, 3: 1-2jt, 4: 2-3jt, 5: >3jt)",
-                "Tabungan": "Jumlah tabungan (1: <3jt, 2: 3-5jt, 3: 5-20jt, 4: 20-50jt, 5: >50jt)",
-            },
-        },
-        "Capacity": {
-            "title": "Capacity",
-            "description": "Penilaian kemampuan membayar",
-            "components": {
-                "Rasio Angsuran": "Rasio angsuran/pendapatan (1: >70%, 2: 51-70%, 3: 31-50%, 4: 20-30%, 5: <20%)",
-                "Dana Cadangan": "Dana cadangan (1: Tidak ada, 2: 1-2x, 3: 2-4x, 4: 4-6x, 5: >6x angsuran)",
-            },
-        },
-        "Collateral": {
-            "title": "Collateral",
-            "description": "Penilaian jaminan yang diberikan",
-            "components": {
-                "Skor Kredit": "Riwayat kredit (1: Macet - 5: Sangat lancar)",
-                "Jaminan": "Nilai jaminan (1: Tidak ada - 5: Fisik premium)",
-                "Dokumen": "Kelengkapan dokumen (1: Tidak ada - 5: Sangat lengkap)",
-            },
-        },
-        "Condition": {
-            "title": "Condition",
-            "description": "Penilaian kondisi ekonomi",
-            "components": {
-                "Stabilitas Usaha": "Stabilitas usaha (1: Tidak stabil - 5: Sangat stabil)",
-                "Prospek Industri": "Prospek industri (1: Menurun - 5: Berkembang pesat)",
-                "Faktor Eksternal": "Pengaruh eksternal (1: Sangat negatif - 5: Sangat positif)",
-            },
-        },
-    }
-
-
-class FuzzyEvaluator:
-    @staticmethod
-    def calculate_membership_strength(value, level, criteria):
-        """Calculate membership strength based on specific fuzzy rules for each criteria"""
-        if criteria == "Character":
-            if level == 1:  # Buruk
-                if value <= 25:
-                    return 1.0
-                elif 25 <= value <= 40:
-                    return (40 - value) / 15
-                elif value >= 40:
-                    return 0.0
-            elif level == 2:  # Sedang
-                if value <= 35 or value >= 75:
-                    return 0.0
-                elif 35 <= value <= 55:
-                    return (value - 35) / 20
-                elif 55 <= value <= 75:
-                    return (75 - value) / 20
-            else:  # level 3: Baik
-                if value <= 70:
-                    return 0.0
-                elif 70 <= value <= 85:
-                    return (value - 70) / 15
-                elif value >= 85:
-                    return 1.0
-
-        elif criteria == "Capital":
-            if level == 1:  # Rendah
-                if value <= 25:
-                    return 1.0
-                elif 25 <= value <= 40:
-                    return (40 - value) / 15
-                elif value >= 40:
-                    return 0.0
-            elif level == 2:  # Sedang
-                if value <= 35 or value >= 75:
-                    return 0.0
-                elif 35 <= value <= 55:
-                    return (value - 35) / 20
-                elif 55 <= value <= 75:
-                    return (75 - value) / 20
-            else:  # level 3: Tinggi
-                if value <= 70:
-                    return 0.0
-                elif 70 <= value <= 85:
-                    return (value - 70) / 15
-                elif value >= 85:
-                    return 1.0
-
-        elif criteria == "Capacity":
-            if level == 1:  # TidakMampu
-                if value <= 25:
-                    return 1.0
-                elif 25 <= value <= 40:
-                    return (40 - value) / 15
-                elif value >= 40:
-                    return 0.0
-            elif level == 2:  # CukupMampu
-                if value <= 35 or value >= 75:
-                    return 0.0
-                elif 35 <= value <= 55:
-                    return (value - 35) / 20
-                elif 55 <= value <= 75:
-                    return (75 - value) / 20
-            else:  # level 3: Mampu
-                if value <= 70:
-                    return 0.0
-                elif 70 <= value <= 85:
-                    return (value - 70) / 15
-                elif value >= 85:
-                    return 1.0
-
-        elif criteria == "Collateral":
-            if level == 1:  # TidakAman
-                if value <= 45:
-                    return 1.0
-                elif 45 <= value <= 55:
-                    return (55 - value) / 10
-                elif value >= 55:
-                    return 0.0
-            else:  # level 2: Aman
-                if value <= 45:
-                    return 0.0
-                elif 45 <= value <= 55:
-                    return (value - 45) / 10
-                elif value >= 55:
-                    return 1.0
-
-        else:  # Condition
-            if level == 1:  # TidakStabil
-                if value <= 25:
-                    return 1.0
-                elif 25 <= value <= 40:
-                    return (40 - value) / 15
-                elif value >= 40:
-                    return 0.0
-            elif level == 2:  # CukupStabil
-                if value <= 35 or value >= 75:
-                    return 0.0
-                elif 35 <= value <= 55:
-                    return (value - 35) / 20
-                elif 55 <= value <= 75:
-                    return (75 - value) / 20
-            else:  # level 3: Stabil
-                if value <= 70:
-                    return 0.0
-                elif 70 <= value <= 85:
-                    return (value - 70) / 15
-                elif value >= 85:
-                    return 1.0
-
-    @staticmethod
-    def evaluate_credit(inputs):
-        """Evaluate credit worthiness based on fuzzy inputs"""
-        criteria_order = ["Character", "Capital", "Capacity", "Collateral", "Condition"]
-
-        # Initialize results containers
-        results = {
-            "accept": {"predicates": [], "rules": []},
-            "reject": {"predicates": [], "rules": []},
-        }
-
-        # Evaluate acceptance rules
-        for rule in FuzzyConfig.ACCEPTANCE_RULES:
-            FuzzyEvaluator._evaluate_rule(
-                rule, criteria_order, inputs, results["accept"]
-            )
-
-        # Evaluate rejection rules
-        for rule in FuzzyConfig.REJECTION_RULES:
-            FuzzyEvaluator._evaluate_rule(
-                rule, criteria_order, inputs, results["reject"]
-            )
-
-        return results
-
-    @staticmethod
-    def _evaluate_rule(rule, criteria_order, inputs, result_container):
-        """Helper method to evaluate a single rule"""
-        strengths = []
-        for level, criteria in zip(rule, criteria_order):
-            strength = FuzzyEvaluator.calculate_membership_strength(
-                inputs[criteria], level, criteria
-            )
-            if strength <= 0:
-                return
-            strengths.append(strength)
-
-        alpha = min(strengths)
-        result_container["predicates"].append(alpha)
-        result_container["rules"].append((rule, strengths))
+# Shared 5C aggregation of the 14 slider components
+AGGREGATOR = ComponentAggregator.from_config(FuzzyConfig)
 
 
 class CreditEvaluationUI:
@@ -332,9 +88,8 @@ class CreditEvaluationUI:
         )
         character_values.append(komitmen)
 
-        # New calculation for Character
-        char_avg = sum(character_values) / len(character_values)
-        inputs["Character"] = (char_avg / 5) * 100
+        # Aggregate Character components
+        inputs["Character"] = AGGREGATOR.criteria_value("Character", character_values)
         st.sidebar.markdown(f"**Nilai Character: {inputs['Character']:.1f}**")
         st.sidebar.markdown("---")
 
@@ -373,9 +128,8 @@ class CreditEvaluationUI:
         )
         capital_values.append(tabungan)
 
-        # New calculation for Capital
-        cap_avg = sum(capital_values) / len(capital_values)
-        inputs["Capital"] = (cap_avg / 5) * 100
+        # Aggregate Capital components
+        inputs["Capital"] = AGGREGATOR.criteria_value("Capital", capital_values)
         st.sidebar.markdown(f"**Nilai Capital: {inputs['Capital']:.1f}**")
         st.sidebar.markdown("---")
 
@@ -404,9 +158,8 @@ class CreditEvaluationUI:
         )
         capacity_values.append(dana_cadangan)
 
-        # New calculation for Capacity
-        capa_avg = sum(capacity_values) / len(capacity_values)
-        inputs["Capacity"] = (capa_avg / 5) * 100
+        # Aggregate Capacity components
+        inputs["Capacity"] = AGGREGATOR.criteria_value("Capacity", capacity_values)
         st.sidebar.markdown(f"**Nilai Capacity: {inputs['Capacity']:.1f}**")
         st.sidebar.markdown("---")
 
@@ -445,9 +198,10 @@ class CreditEvaluationUI:
         )
         collateral_values.append(dokumen)
 
-        # New calculation for Collateral
-        coll_avg = sum(collateral_values) / len(collateral_values)
-        inputs["Collateral"] = (coll_avg / 5) * 100
+        # Aggregate Collateral components
+        inputs["Collateral"] = AGGREGATOR.criteria_value(
+            "Collateral", collateral_values
+        )
         st.sidebar.markdown(f"**Nilai Collateral: {inputs['Collateral']:.1f}**")
         st.sidebar.markdown("---")
 
@@ -486,9 +240,8 @@ class CreditEvaluationUI:
         )
         condition_values.append(faktor_eksternal)
 
-        # New calculation for Condition
-        cond_avg = sum(condition_values) / len(condition_values)
-        inputs["Condition"] = (cond_avg / 5) * 100
+        # Aggregate Condition components
+        inputs["Condition"] = AGGREGATOR.criteria_value("Condition", condition_values)
         st.sidebar.markdown(f"**Nilai Condition: {inputs['Condition']:.1f}**")
         st.sidebar.markdown("---")
 
@@ -819,6 +572,12 @@ class CreditEvaluationUI:
                 r"\mu_{Condition_{Stabil}}(" + f"{inputs['Condition']:.1f}" + r") = 1"
             )
 
+    @staticmethod
+    @st.cache_resource
+    def _explainer():
+        """Explanation generator shared by all sessions"""
+        return Explainer(FuzzyConfig)
+
     @staticmethod
     def display_results(inputs, evaluation_results):
         """Display evaluation results with detailed calculation"""
@@ -833,186 +592,161 @@ class CreditEvaluationUI:
         reject_predicates = evaluation_results["reject"]["predicates"]
 
         if accept_predicates or reject_predicates:
-            if evaluation_results["accept"]["rules"]:
-                st.markdown("#### Rules Penerimaan yang Terpicu:")
-                for i, (rule, strengths) in enumerate(
-                    evaluation_results["accept"]["rules"], 1
-                ):
-                    alpha = min(strengths)
-                    st.markdown(f"**Rule {i}:**")
-                    st.write("IF:")
-                    criteria_order = [
-                        "Character",
-                        "Capital",
-                        "Capacity",
-                        "Collateral",
-                        "Condition",
-                    ]
-                    levels = {1: "Buruk", 2: "Sedang", 3: "Baik"}
-                    for idx, (level, criteria) in enumerate(zip(rule, criteria_order)):
-                        if criteria == "Collateral":
-                            level_text = "TidakAman" if level == 1 else "Aman"
-                        else:
-                            if criteria == "Capital":
-                                levels = {1: "Rendah", 2: "Sedang", 3: "Tinggi"}
-                            elif criteria == "Capacity":
-                                levels = {1: "TidakMampu", 2: "CukupMampu", 3: "Mampu"}
-                            elif criteria == "Condition":
-                                levels = {
-                                    1: "TidakStabil",
-                                    2: "CukupStabil",
-                                    3: "Stabil",
-                                }
-                            level_text = levels[level]
-                        st.write(
-                            f"- {criteria} is {level_text} (μ = {strengths[idx]:.2f})"
-                        )
-                    st.write("THEN: Keputusan = Diterima")
-                    st.write(
-                        f"α-predikat = min({', '.join([f'{s:.2f}' for s in strengths])}) = {alpha:.2f}"
-                    )
-                    st.markdown("---")
-
-            if evaluation_results["reject"]["rules"]:
-                st.markdown("#### Rules Penolakan yang Terpicu:")
-                for i, (rule, strengths) in enumerate(
-                    evaluation_results["reject"]["rules"], 1
+            # Rule explanations are built from the trace of this evaluation,
+            # so they show the same alphas as the defuzzification below
+            fired = [
+                (rule_id, alpha)
+                for kind in ("accept", "reject")
+                for rule_id, alpha in zip(
+                    evaluation_results[kind]["ids"],
+                    evaluation_results[kind]["predicates"],
+                )
+            ]
+            explanation = CreditEvaluationUI._explainer().explain(fired, inputs)
+            for kind, title in (
+                ("accept", "#### Rules Penerimaan yang Terpicu:"),
+                ("reject", "#### Rules Penolakan yang Terpicu:"),
+            ):
+                rules = [r for r in explanation["rules"] if r["kind"] == kind]
+                if not rules:
+                    continue
+                st.markdown(title)
+                for i, (rule, (_, strengths)) in enumerate(
+                    zip(rules, evaluation_results[kind]["rules"]), 1
                 ):
-                    alpha = min(strengths)
                     st.markdown(f"**Rule {i}:**")
                     st.write("IF:")
-                    criteria_order = [
-                        "Character",
-                        "Capital",
-                        "Capacity",
-                        "Collateral",
-                        "Condition",
-                    ]
-                    levels = {1: "Buruk", 2: "Sedang", 3: "Baik"}
-                    for idx, (level, criteria) in enumerate(zip(rule, criteria_order)):
-                        if criteria == "Collateral":
-                            level_text = "TidakAman" if level == 1 else "Aman"
-                        else:
-                            if criteria == "Capital":
-                                levels = {1: "Rendah", 2: "Sedang", 3: "Tinggi"}
-                            elif criteria == "Capacity":
-                                levels = {1: "TidakMampu", 2: "CukupMampu", 3: "Mampu"}
-                            elif criteria == "Condition":
-                                levels = {
-                                    1: "TidakStabil",
-                                    2: "CukupStabil",
-                                    3: "Stabil",
-                                }
-                            level_text = levels[level]
+                    for condition, mu in zip(rule["conditions"], strengths):
                         st.write(
-                            f"- {criteria} is {level_text} (μ = {strengths[idx]:.2f})"
+                            f"- {condition['criteria']} is {condition['label']} "
+                            f"(μ = {mu:.2f})"
                         )
-                    st.write("THEN: Keputusan = Ditolak")
-                    st.write(
-                        f"α-predikat = min({', '.join([f'{s:.2f}' for s in strengths])}) = {alpha:.2f}"
-                    )
+                    st.write(f"THEN: Keputusan = {rule['then']}")
+                    if FuzzyConfig.TNORM == "product":
+                        conjunction = " × ".join(f"{s:.2f}" for s in strengths)
+                    else:
+                        values = ", ".join(f"{s:.2f}" for s in strengths)
+                        conjunction = f"min({values})"
+                    st.write(f"α-predikat = {conjunction} = {rule['alpha']:.2f}")
                     st.markdown("---")
 
-            # Calculate weighted average
-            accept_weight = sum(accept_predicates)
-            reject_weight = sum(reject_predicates)
-            total_weight = accept_weight + reject_weight
-            numerator = accept_weight * 1  # z=1 for acceptance rules
-            z = round(numerator / total_weight if total_weight > 0 else 0, 2)
-            decision = "DITERIMA" if z > 0.5 else "DITOLAK"
+            # Calculate the configured defuzzification
+            threshold = FuzzyConfig.DECISION_THRESHOLD
+            weighted_sum = FuzzyConfig.AGGREGATION == "weighted_sum"
+            terms = [
+                (alpha, weight, consequent)
+                for kind in ("accept", "reject")
+                for alpha, weight, consequent in zip(
+                    evaluation_results[kind]["predicates"],
+                    evaluation_results[kind]["weights"],
+                    evaluation_results[kind]["consequents"],
+                )
+            ]
+            weighted = any(weight != 1 for _, weight, _ in terms)
+            numerator = sum(alpha * weight * c for alpha, weight, c in terms)
+            total_weight = sum(alpha * weight for alpha, weight, _ in terms)
+            z_value = FuzzyEvaluator.defuzzify(evaluation_results)
+            z = round(z_value, 2)
+            decision = "DITERIMA" if z > threshold else "DITOLAK"
+
+            def factor(weight, consequent, times=" × "):
+                if weighted:
+                    return f"{weight:g}{times}{consequent:g}"
+                return f"{consequent:g}"
+
+            def product(value):
+                return "0" if value == 0 else f"{value:.2f}"
 
             # Display defuzzification calculation
             st.markdown("### Proses Defuzzifikasi")
-            st.markdown("Menggunakan metode weighted average dengan rumus:")
-            st.latex(r"z = \frac{\sum \alpha_i * z_i}{\sum \alpha_i}")
+            if weighted_sum:
+                st.markdown("Menggunakan metode weighted sum dengan rumus:")
+                st.latex(
+                    r"z = \sum \alpha_i * w_i * z_i"
+                    if weighted
+                    else r"z = \sum \alpha_i * z_i"
+                )
+            else:
+                st.markdown("Menggunakan metode weighted average dengan rumus:")
+                st.latex(
+                    r"z = \frac{\sum \alpha_i * w_i * z_i}{\sum \alpha_i * w_i}"
+                    if weighted
+                    else r"z = \frac{\sum \alpha_i * z_i}{\sum \alpha_i}"
+                )
 
             st.markdown("#### Kalkulasi Terperinci:")
             st.write("**Komponen Weighted Sum:**")
-            st.write("Rules Penerimaan (z = 1):")
-
-            numerator_terms = []
-            denominator_terms = []
-
-            if accept_predicates:
-                for i, alpha in enumerate(accept_predicates, 1):
-                    st.write(f"α{i} × 1 = {alpha:.2f}")
-                    numerator_terms.append(f"{alpha:.2f}")
-                    denominator_terms.append(f"{alpha:.2f}")
-                st.write(f"∑(αi × 1) = {accept_weight:.2f}")
-            else:
-                st.write("Tidak ada rules penerimaan yang terpicu")
-
-            st.write("\nRules Penolakan (z = 0):")
-            if reject_predicates:
-                for i, alpha in enumerate(reject_predicates, 1):
-                    st.write(f"α{i} × 0 = 0")
-                    denominator_terms.append(f"{alpha:.2f}")
-                st.write(f"∑(αi × 0) = 0")
-            else:
-                st.write("Tidak ada rules penolakan yang terpicu")
+            for kind, title, default, empty in (
+                ("accept", "Rules Penerimaan", 1, "penerimaan"),
+                ("reject", "\nRules Penolakan", 0, "penolakan"),
+            ):
+                container = evaluation_results[kind]
+                consequents = set(container["consequents"]) or {default}
+                label = f"{consequents.pop():g}" if len(consequents) == 1 else "zi"
+                st.write(f"{title} (z = {label}):")
+                if not container["predicates"]:
+                    st.write(f"Tidak ada rules {empty} yang terpicu")
+                    continue
+                subtotal = 0.0
+                for i, (alpha, weight, consequent) in enumerate(
+                    zip(
+                        container["predicates"],
+                        container["weights"],
+                        container["consequents"],
+                    ),
+                    1,
+                ):
+                    value = alpha * weight * consequent
+                    subtotal += value
+                    st.write(f"α{i} × {factor(weight, consequent)} = {product(value)}")
+                sum_factor = f"wi × {label}" if weighted else label
+                st.write(f"∑(αi × {sum_factor}) = {product(subtotal)}")
 
-            st.write(f"\nTotal α-predikat (∑αi) = {total_weight:.2f}")
+            total_label = "∑αi × wi" if weighted else "∑αi"
+            st.write(f"\nTotal α-predikat ({total_label}) = {total_weight:.2f}")
 
             # Display final calculation with step-by-step process
             st.markdown("#### Kalkulasi Final:")
-            if accept_predicates:
-                if len(accept_predicates) > 1:
-                    # Multiple acceptance rules
-                    # First show the complete formula with all multiplications
-                    numerator_terms = [
-                        f"({alpha:.2f} \\times 1)" for alpha in accept_predicates
-                    ]
-                    denominator_terms = [
-                        f"{alpha:.2f}"
-                        for alpha in accept_predicates + reject_predicates
-                    ]
-
-                    # Show step 1: Complete formula with multiplications
-                    numerator_step1 = " + ".join(numerator_terms)
-                    denominator_step1 = " + ".join(denominator_terms)
-
-                    # Show step 2: Resolved multiplications
-                    numerator_step2 = " + ".join(
-                        [f"{alpha:.2f}" for alpha in accept_predicates]
-                    )
-
-                    # Show step 3: Final summed values and result
-                    st.latex(
-                        f"z = \\frac{{{numerator_step1}}}{{{denominator_step1}}} = "
-                        f"\\frac{{{numerator_step2}}}{{{denominator_step1}}} = "
-                        f"\\frac{{{accept_weight:.2f}}}{{{total_weight:.2f}}} = "
-                        f"{(accept_weight/total_weight):.2f}"
-                    )
-                else:
-                    # Single acceptance rule
-                    st.latex(
-                        f"z = \\frac{{({accept_predicates[0]:.2f} \\times 1)}}{{{total_weight:.2f}}} = "
-                        f"\\frac{{{accept_predicates[0]:.2f}}}{{{total_weight:.2f}}} = "
-                        f"{(accept_weight/total_weight):.2f}"
-                    )
-            elif reject_predicates:
-                # Only rejection rules
-                numerator_terms = [
-                    f"({alpha:.2f} \\times 0)" for alpha in reject_predicates
+            products = [term for term in terms if term[0] * term[1] * term[2] != 0]
+            latex_times = r" \times "
+            numerator_step1 = " + ".join(
+                f"({alpha:.2f}{latex_times}{factor(weight, c, latex_times)})"
+                for alpha, weight, c in products or terms
+            )
+            denominator_step1 = " + ".join(
+                f"{alpha * weight:.2f}" for alpha, weight, _ in terms
+            )
+            numerator_step2 = " + ".join(
+                f"{alpha * weight * c:.2f}" for alpha, weight, c in products
+            )
+            if weighted_sum:
+                steps = [numerator_step1]
+                if len(products) > 1:
+                    steps.append(numerator_step2)
+            elif len(products) > 1:
+                steps = [
+                    f"\\frac{{{numerator_step1}}}{{{denominator_step1}}}",
+                    f"\\frac{{{numerator_step2}}}{{{denominator_step1}}}",
+                    f"\\frac{{{numerator:.2f}}}{{{total_weight:.2f}}}",
+                ]
+            elif products:
+                steps = [
+                    f"\\frac{{{numerator_step1}}}{{{total_weight:.2f}}}",
+                    f"\\frac{{{numerator_step2}}}{{{total_weight:.2f}}}",
                 ]
-                denominator_terms = [f"{alpha:.2f}" for alpha in reject_predicates]
-
-                numerator_step1 = " + ".join(numerator_terms)
-                denominator_step1 = " + ".join(denominator_terms)
-
-                st.latex(
-                    f"z = \\frac{{{numerator_step1}}}{{{denominator_step1}}} = "
-                    f"\\frac{{0}}{{{total_weight:.2f}}} = 0.00"
-                )
             else:
-                st.latex(r"z = \frac{0}{0} = 0")
+                steps = [
+                    f"\\frac{{{numerator_step1}}}{{{denominator_step1}}}",
+                    f"\\frac{{0}}{{{total_weight:.2f}}}",
+                ]
+            st.latex("z = " + " = ".join(steps + [f"{z_value:.2f}"]))
 
             # Display interpretation
             st.markdown("#### Interpretasi:")
-            st.write('- Jika nilai z > 0.5 maka keputusan "Diterima"')
-            st.write('- Jika nilai z ≤ 0.5 maka keputusan "Ditolak"')
+            st.write(f'- Jika nilai z > {threshold:g} maka keputusan "Diterima"')
+            st.write(f'- Jika nilai z ≤ {threshold:g} maka keputusan "Ditolak"')
             st.write(
-                f"Karena hasil defuzzifikasi menghasilkan z = {z:.2f} {'>' if z > 0.5 else '≤'} 0.5,"
+                f"Karena hasil defuzzifikasi menghasilkan z = {z:.2f} {'>' if z > threshold else '≤'} {threshold:g},"
             )
             st.write(f'maka pengajuan kredit "{decision}".')
 
@@ -1049,14 +783,41 @@ class CreditEvaluationUI:
     @staticmethod
     def _display_visualization(inputs):
         """Create and display radar chart visualization"""
-        categories = list(inputs.keys())
-        values = list(inputs.values())
+        categories = tuple(inputs.keys())
+        values = tuple(round(value, 4) for value in inputs.values())
+
+        mode = st.radio(
+            "Mode grafik",
+            ["Ringan (SVG)", "Interaktif (Plotly)"],
+            horizontal=True,
+            key="chart_mode",
+        )
+        if mode == "Ringan (SVG)":
+            st.markdown(
+                CreditEvaluationUI._radar_svg(categories, values),
+                unsafe_allow_html=True,
+            )
+        else:
+            st.plotly_chart(
+                CreditEvaluationUI._radar_figure(categories, values),
+                use_container_width=True,
+            )
+
+    @staticmethod
+    @st.cache_data(max_entries=512, show_spinner=False)
+    def _radar_figure(categories, values):
+        """Plotly radar chart spec, cached per input tuple"""
+        # Imported here so Plotly is only loaded when the interactive chart is used
+        import plotly.graph_objects as go
 
         fig = go.Figure()
 
         fig.add_trace(
             go.Scatterpolar(
-                r=values, theta=categories, fill="toself", name="Nilai Evaluasi"
+                r=list(values),
+                theta=list(categories),
+                fill="toself",
+                name="Nilai Evaluasi",
             )
         )
 
@@ -1064,7 +825,208 @@ class CreditEvaluationUI:
             polar=dict(radialaxis=dict(visible=True, range=[0, 100])), showlegend=True
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        return fig.to_dict()
+
+    @staticmethod
+    @st.cache_data(max_entries=512, show_spinner=False)
+    def _radar_svg(categories, values, size=360):
+        """Pre-rendered SVG radar chart (a few KB, no JavaScript), cached per input tuple"""
+        center = size / 2
+        radius = size / 2 - 60
+
+        def point(idx, value):
+            angle = math.pi / 2 - 2 * math.pi * idx / len(categories)
+            scale = radius * value / 100
+            return center + scale * math.cos(angle), center - scale * math.sin(angle)
+
+        def polygon(points, style):
+            coords = " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+            return f'<polygon points="{coords}" {style}/>'
+
+        parts = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+            f'viewBox="0 0 {size} {size}" font-family="sans-serif" font-size="12">'
+        ]
+        for ring in (20, 40, 60, 80, 100):
+            ring_points = [point(i, ring) for i in range(len(categories))]
+            parts.append(polygon(ring_points, 'fill="none" stroke="#ddd"'))
+        for idx, label in enumerate(categories):
+            x, y = point(idx, 100)
+            lx, ly = point(idx, 118)
+            parts.append(
+                f'<line x1="{center}" y1="{center}" x2="{x:.1f}" y2="{y:.1f}" stroke="#ddd"/>'
+            )
+            parts.append(
+                f'<text x="{lx:.1f}" y="{ly:.1f}" text-anchor="middle" '
+                f'dominant-baseline="middle">{label} ({values[idx]:.0f})</text>'
+            )
+        value_points = [point(i, value) for i, value in enumerate(values)]
+        parts.append(
+            polygon(
+                value_points,
+                'fill="#636efa" fill-opacity="0.4" stroke="#636efa" stroke-width="2"',
+            )
+        )
+        parts.append("</svg>")
+        return "".join(parts)
+
+
+class PortfolioUI:
+    PAGE_SIZES = [50, 100, 500]
+    Z_BINS = 20
+
+    @staticmethod
+    @st.cache_resource
+    def _registry():
+        """Vectorized engine shared by all sessions"""
+        registry = ModelRegistry()
+        registry.register(CompiledRuleBase.from_config(FuzzyConfig))
+        return registry
+
+    @staticmethod
+    @st.cache_data(max_entries=8, show_spinner="Menilai portofolio...")
+    def _score_file(file_hash, _data):
+        """Parse and score an uploaded CSV, cached on the file hash"""
+        frame = pd.read_csv(io.BytesIO(_data))
+        components = [component for _, component in AGGREGATOR.components]
+        if set(components) <= set(frame.columns):
+            criteria = AGGREGATOR.aggregate(frame[components].to_numpy())
+        elif set(CRITERIA_ORDER) <= set(frame.columns):
+            criteria = check_criteria_values(
+                frame[list(CRITERIA_ORDER)].to_numpy(dtype=np.float64)
+            )
+        else:
+            raise ValueError(
+                "File harus memiliki kolom 14 komponen ("
+                + ", ".join(components)
+                + ") atau kolom 5C ("
+                + ", ".join(CRITERIA_ORDER)
+                + ")"
+            )
+
+        result = PortfolioUI._registry().score(criteria, with_alpha=True)["default"]
+        scored = frame.copy()
+        for idx, name in enumerate(CRITERIA_ORDER):
+            scored[name] = criteria[:, idx]
+        scored["z"] = result["z"]
+        scored["Keputusan"] = np.where(result["accepted"], "DITERIMA", "DITOLAK")
+
+        counts, edges = np.histogram(
+            result["z"], bins=PortfolioUI.Z_BINS, range=(0.0, 1.0)
+        )
+        z_distribution = pd.DataFrame(
+            {"Jumlah": counts}, index=[f"{low:.2f}" for low in edges[:-1]]
+        )
+
+        alpha = result["alpha"]
+        fired = np.count_nonzero(alpha > 0, axis=0)
+        mean_alpha = np.divide(
+            alpha.sum(axis=0), fired, out=np.zeros(len(fired)), where=fired > 0
+        )
+        rules = []
+        for idx, rule in enumerate(
+            FuzzyConfig.ACCEPTANCE_RULES + FuzzyConfig.REJECTION_RULES
+        ):
+            conditions = ", ".join(
+                f"{criteria} {FuzzyConfig.LEVEL_LABELS[criteria][level - 1]}"
+                for level, criteria in zip(rule, CRITERIA_ORDER)
+            )
+            rules.append(
+                {
+                    "Rule": conditions,
+                    "Keputusan": (
+                        "Diterima"
+                        if idx < len(FuzzyConfig.ACCEPTANCE_RULES)
+                        else "Ditolak"
+                    ),
+                    "Terpicu": int(fired[idx]),
+                    "Persentase": fired[idx] / max(len(scored), 1) * 100,
+                    "Rata-rata α": mean_alpha[idx],
+                }
+            )
+        rule_summary = pd.DataFrame(rules).sort_values("Terpicu", ascending=False)
+        return scored, z_distribution, rule_summary
+
+    @staticmethod
+    @st.cache_data(max_entries=8, show_spinner=False)
+    def _export_csv(file_hash, _scored):
+        return _scored.to_csv(index=False).encode()
+
+    @staticmethod
+    def display_portfolio():
+        """Upload a file of applicants and show the portfolio dashboard"""
+        st.sidebar.title("Portofolio Nasabah")
+        uploaded = st.sidebar.file_uploader(
+            "Unggah file nasabah (CSV)",
+            type=["csv"],
+            help="Kolom: 14 komponen (skala 1-5) atau nilai 5C (0-100)",
+            key="portfolio_file",
+        )
+        if uploaded is None:
+            st.info(
+                "Unggah file CSV berisi data nasabah untuk mulai menilai portofolio."
+            )
+            return
+
+        data = uploaded.getvalue()
+        file_hash = hashlib.sha256(data).hexdigest()
+        try:
+            scored, z_distribution, rule_summary = PortfolioUI._score_file(
+                file_hash, data
+            )
+        except Exception as e:
+            st.error(f"Terjadi kesalahan dalam membaca file: {str(e)}")
+            return
+
+        total = len(scored)
+        accepted = int((scored["Keputusan"] == "DITERIMA").sum())
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Jumlah Nasabah", f"{total:,}")
+        with col2:
+            st.metric("Diterima", f"{accepted:,}", f"{accepted / max(total, 1):.1%}")
+        with col3:
+            st.metric("Ditolak", f"{total - accepted:,}")
+
+        st.markdown("### Distribusi Nilai Defuzzifikasi (z)")
+        st.bar_chart(z_distribution)
+
+        st.markdown("### Ringkasan Rules yang Terpicu")
+        st.dataframe(
+            rule_summary,
+            hide_index=True,
+            column_config={
+                "Persentase": st.column_config.NumberColumn(format="%.1f%%"),
+                "Rata-rata α": st.column_config.NumberColumn(format="%.2f"),
+            },
+        )
+
+        # Only one page of rows is sent to the browser
+        st.markdown("### Hasil per Nasabah")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            shown = st.selectbox(
+                "Tampilkan", ["Semua", "DITERIMA", "DITOLAK"], key="portfolio_filter"
+            )
+        rows = scored if shown == "Semua" else scored[scored["Keputusan"] == shown]
+        with col2:
+            page_size = st.selectbox(
+                "Baris per halaman", PortfolioUI.PAGE_SIZES, key="portfolio_page_size"
+            )
+        pages = max(1, math.ceil(len(rows) / page_size))
+        with col3:
+            page = st.number_input(
+                f"Halaman (dari {pages})", 1, pages, 1, key="portfolio_page"
+            )
+        start = (page - 1) * page_size
+        st.dataframe(rows.iloc[start : start + page_size])
+
+        st.download_button(
+            "Unduh hasil (CSV)",
+            PortfolioUI._export_csv(file_hash, scored),
+            file_name="hasil_portofolio.csv",
+            mime="text/csv",
+        )
 
 
 def main():
@@ -1077,11 +1039,23 @@ def main():
         """
     )
 
+    mode = st.sidebar.radio(
+        "Mode", ["Nasabah Tunggal", "Portofolio"], horizontal=True, key="app_mode"
+    )
+    if mode == "Portofolio":
+        PortfolioUI.display_portfolio()
+        return
+
     # Create input form
     inputs = CreditEvaluationUI.create_input_form()
 
-    # Add evaluation button with unique key
+    # Add evaluation button with unique key. The evaluated inputs are kept in
+    # the session so that widgets inside the results (e.g. the chart mode)
+    # can rerun the script without hiding the results.
     if st.sidebar.button("Evaluasi Kelayakan", type="primary", key="evaluate_button"):
+        st.session_state["evaluated_inputs"] = dict(inputs)
+
+    if st.session_state.get("evaluated_inputs") == inputs:
         try:
             # Perform evaluation
             evaluation_results = FuzzyEvaluator.evaluate_credit(inputs)
@@ -0,0 +1,445 @@
+# Streaming drift monitor of criteria, z and rule firing per time window
+import argparse
+import collections
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+from audit import read_audit_log
+from engine import CRITERIA_ORDER, load_config
+from evaluator import FuzzyConfig
+
+# Fixed histogram bins: 5 points per criteria bin, 0.05 per z bin
+CRITERIA_EDGES = np.linspace(0.0, 100.0, 21)
+Z_EDGES = np.linspace(0.0, 1.0, 21)
+
+# Usual PSI reading: below 0.1 stable, 0.1-0.25 moderate, above 0.25 major
+PSI_WARNING = 0.1
+PSI_ALERT = 0.25
+# Absolute change in the share of applicants firing a rule that flags it
+RULE_SHIFT = 0.05
+STATUS_CODES = {"stable": 0, "warning": 1, "alert": 2}
+
+
+def _bins(values, edges):
+    """Bin index of every value, out-of-range values in the outer bins"""
+    return np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+
+
+class Histograms:
+    """Fixed-size counts of criteria values, z, decisions and fired rules"""
+
+    def __init__(self, n_rules):
+        self.records = 0
+        self.decided = 0
+        self.accepted = 0
+        self.criteria = np.zeros(
+            (len(CRITERIA_ORDER), len(CRITERIA_EDGES) - 1), dtype=np.int64
+        )
+        self.z = np.zeros(len(Z_EDGES) - 1, dtype=np.int64)
+        self.fired = np.zeros(n_rules, dtype=np.int64)
+        self._offsets = np.arange(len(CRITERIA_ORDER)) * self.criteria.shape[1]
+
+    def add(self, matrix, z, accepted, alpha):
+        bins = _bins(matrix, CRITERIA_EDGES) + self._offsets
+        self.criteria += np.bincount(
+            bins.ravel(), minlength=self.criteria.size
+        ).reshape(self.criteria.shape)
+        self.z += np.bincount(_bins(z, Z_EDGES), minlength=len(self.z))
+        self.fired += np.count_nonzero(alpha, axis=0)
+        self.records += len(z)
+        if accepted is not None:
+            self.decided += len(accepted)
+            self.accepted += int(np.count_nonzero(accepted))
+
+    def to_dict(self):
+        return {
+            "records": self.records,
+            "decided": self.decided,
+            "accepted": self.accepted,
+            "criteria": dict(zip(CRITERIA_ORDER, self.criteria.tolist())),
+            "z": self.z.tolist(),
+            "fired": self.fired.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histograms = cls(len(data["fired"]))
+        histograms.records = data["records"]
+        histograms.decided = data["decided"]
+        histograms.accepted = data["accepted"]
+        histograms.criteria[:] = [data["criteria"][c] for c in CRITERIA_ORDER]
+        histograms.z[:] = data["z"]
+        histograms.fired[:] = data["fired"]
+        return histograms
+
+
+def load_baseline(path):
+    """Baseline histograms written by `drift.py --save-baseline`"""
+    with open(path) as handle:
+        return Histograms.from_dict(json.load(handle))
+
+
+def _shares(counts, epsilon=1e-4):
+    shares = counts / max(counts.sum(), 1)
+    return np.maximum(shares, epsilon)
+
+
+def psi(expected, actual):
+    """Population stability index of two histograms on the same bins"""
+    p, q = _shares(expected), _shares(actual)
+    return float(((q - p) * np.log(q / p)).sum())
+
+
+def ks(expected, actual):
+    """Kolmogorov-Smirnov distance of two histograms, measured at the bin edges"""
+    p = np.cumsum(expected) / max(expected.sum(), 1)
+    q = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.abs(p - q).max())
+
+
+def drift(baseline, window):
+    """Drift of a window against the baseline, None if either is empty"""
+    if baseline is None or window is None or not baseline.records or not window.records:
+        return None
+    pairs = {
+        c: (baseline.criteria[i], window.criteria[i])
+        for i, c in enumerate(CRITERIA_ORDER)
+    }
+    pairs["z"] = (baseline.z, window.z)
+    shift = window.fired / window.records - baseline.fired / baseline.records
+    report = {
+        "records": window.records,
+        "psi": {name: psi(*pair) for name, pair in pairs.items()},
+        "ks": {name: ks(*pair) for name, pair in pairs.items()},
+        "accept_rate": window.accepted / window.decided if window.decided else None,
+        "baseline_accept_rate": (
+            baseline.accepted / baseline.decided if baseline.decided else None
+        ),
+        "rule_rate_shift": float(np.abs(shift).max()) if len(shift) else 0.0,
+        "shifted_rules": {
+            int(rule): float(shift[rule])
+            for rule in np.flatnonzero(np.abs(shift) > RULE_SHIFT)
+        },
+    }
+    worst = max(report["psi"].values())
+    if worst > PSI_ALERT:
+        report["status"] = "alert"
+    elif worst > PSI_WARNING or report["shifted_rules"]:
+        report["status"] = "warning"
+    else:
+        report["status"] = "stable"
+    return report
+
+
+class DriftMonitor:
+    """Observer tracking drift of inputs, z and rule firing per time window
+
+    Attach it like an AuditSink, e.g. ModelRegistry(observers=[monitor]).
+    observe() only adds the batch to fixed-size histograms of the current
+    window, so memory stays bounded however many applicants are scored: the
+    baseline, the current window and the last `history` closed windows.
+    Windows are aligned on multiples of `window` seconds and never reopen:
+    rows stamped before the current window count in it. Drift against the
+    baseline is PSI and KS per criteria and for z, plus the change in each
+    rule's fire rate; without a baseline the first closed window becomes it.
+    Windows with fewer than `min_records` applicants report no drift. Only
+    batches of `model` are counted.
+
+    Small batches (single applicants from score_one) are copied into a
+    buffer of `buffer_size` rows and binned together when it fills up or the
+    metrics are read, which keeps the per-applicant cost to a few row copies.
+    """
+
+    def __init__(
+        self,
+        model="default",
+        window=3600.0,
+        history=24,
+        baseline=None,
+        min_records=500,
+        buffer_size=256,
+        clock=time.time,
+    ):
+        self.model = model
+        self.window = float(window)
+        self.min_records = min_records
+        self.buffer_size = buffer_size
+        self.clock = clock
+        self.baseline = baseline
+        self._closed = collections.deque(maxlen=history)  # (start, Histograms)
+        self._current = None
+        self._index = None
+        self._newest = -sys.maxsize  # highest window index seen, never rolls back
+        self._n_closed = 0
+        self._buffer = None  # (matrix, z, accepted, alpha) rows
+        self._buffered = 0
+        self._lock = threading.Lock()
+
+    def observe(self, model, matrix, z, accepted, alpha, timestamp=None):
+        """Add a scored batch to the current window"""
+        if model != self.model:
+            return
+        n_rows = len(z)
+        with self._lock:
+            # Read the clock under the lock so concurrent observers see
+            # non-decreasing windows; late rows count in the current window
+            now = self.clock() if timestamp is None else timestamp
+            index = max(int(now // self.window), self._newest)
+            if index != self._index:
+                self._roll(index)
+            self._newest = index
+            if self._current is None:
+                self._current = Histograms(alpha.shape[1])
+            if accepted is None or 4 * n_rows > self.buffer_size:
+                self._current.add(matrix, z, accepted, alpha)
+                return
+            if self._buffer is None or self._buffer[3].shape[1] != alpha.shape[1]:
+                self._flush()
+                size = self.buffer_size
+                self._buffer = (
+                    np.empty((size, len(CRITERIA_ORDER))),
+                    np.empty(size),
+                    np.empty(size, dtype=bool),
+                    np.empty((size, alpha.shape[1])),
+                )
+            elif self._buffered + n_rows > self.buffer_size:
+                self._flush()
+            rows = slice(self._buffered, self._buffered + n_rows)
+            for column, values in zip(self._buffer, (matrix, z, accepted, alpha)):
+                column[rows] = values
+            self._buffered += n_rows
+
+    def _flush(self):
+        if self._buffered:
+            n_rows = self._buffered
+            self._buffered = 0
+            self._current.add(*(column[:n_rows] for column in self._buffer))
+
+    def _roll(self, index):
+        self._flush()
+        if self._current is not None and self._current.records:
+            self._closed.append((self._index * self.window, self._current))
+            self._n_closed += 1
+            if self.baseline is None:
+                self.baseline = self._current
+        self._current = None
+        self._index = index
+
+    def _drift(self, window):
+        if window is None or window.records < self.min_records:
+            return None
+        return drift(self.baseline, window)
+
+    def close_window(self):
+        """Close the current window now, e.g. at the end of a replay"""
+        with self._lock:
+            self._roll(None)
+
+    def windows(self):
+        """[(window start, drift)] of the retained closed windows, oldest first"""
+        with self._lock:
+            return [(start, self._drift(window)) for start, window in self._closed]
+
+    def metrics(self):
+        """Counters and drift of the current and the last closed window"""
+        with self._lock:
+            self._flush()
+            last = self._closed[-1][1] if self._closed else None
+            return {
+                "model": self.model,
+                "window_seconds": self.window,
+                "window_start": (
+                    None if self._index is None else self._index * self.window
+                ),
+                "window_records": self._current.records if self._current else 0,
+                "closed_windows": self._n_closed,
+                "baseline_records": self.baseline.records if self.baseline else 0,
+                "current": self._drift(self._current),
+                "last": self._drift(last),
+            }
+
+    def prometheus(self, prefix="fuzzy_drift"):
+        """metrics() in the Prometheus text exposition format"""
+        metrics = self.metrics()
+        model = f'model="{self.model}"'
+        lines = []
+
+        def gauge(name, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            for labels, value in samples:
+                if value is not None:
+                    lines.append(
+                        f"{prefix}_{name}{{{','.join([model] + labels)}}} {value!r}"
+                    )
+
+        gauge(
+            "window_records",
+            "Applicants in the current window",
+            [([], metrics["window_records"])],
+        )
+        gauge(
+            "baseline_records",
+            "Applicants in the baseline",
+            [([], metrics["baseline_records"])],
+        )
+        reports = [
+            (name, metrics[name]) for name in ("current", "last") if metrics[name]
+        ]
+        for key, help_text in (
+            ("psi", "Population stability index against the baseline"),
+            ("ks", "Kolmogorov-Smirnov distance to the baseline"),
+        ):
+            gauge(
+                key,
+                help_text,
+                [
+                    ([f'window="{name}"', f'feature="{feature}"'], value)
+                    for name, report in reports
+                    for feature, value in report[key].items()
+                ],
+            )
+        accept_rates = [
+            ([f'window="{name}"'], report["accept_rate"]) for name, report in reports
+        ]
+        if reports:
+            accept_rates.append(
+                (['window="baseline"'], reports[0][1]["baseline_accept_rate"])
+            )
+        gauge("accept_rate", "Share of applicants accepted", accept_rates)
+        gauge(
+            "rule_rate_shift",
+            "Largest change in a rule's fire rate against the baseline",
+            [
+                ([f'window="{name}"'], report["rule_rate_shift"])
+                for name, report in reports
+            ],
+        )
+        gauge(
+            "status",
+            "0 stable, 1 warning, 2 alert",
+            [
+                ([f'window="{name}"'], STATUS_CODES[report["status"]])
+                for name, report in reports
+            ],
+        )
+        return "\n".join(lines) + "\n"
+
+
+def audit_batches(paths, n_rules, window, model="default", batch_size=4096):
+    """Yield (timestamp, matrix, z, accepted, alpha) of audit records of `model`
+
+    Consecutive records in the same window are batched; accepted is None for
+    a batch in which a record has no decision.
+    """
+
+    def batch(records):
+        alpha = np.zeros((len(records), n_rules))
+        decisions = []
+        for row, record in enumerate(records):
+            for rule_id, strength in record["fired"]:
+                alpha[row, rule_id] = strength
+            decisions.append(record.get("decision"))
+        return (
+            records[-1]["ts"],
+            np.array(
+                [[record["inputs"][c] for c in CRITERIA_ORDER] for record in records]
+            ),
+            np.array([record["z"] for record in records]),
+            None if None in decisions else np.array(decisions) == "DITERIMA",
+            alpha,
+        )
+
+    records, index = [], None
+    for path in paths:
+        for record in read_audit_log(path):
+            if record["model"] != model:
+                continue
+            record_index = int(record["ts"] // window)
+            if records and (record_index != index or len(records) >= batch_size):
+                yield batch(records)
+                records = []
+            records.append(record)
+            index = record_index
+    if records:
+        yield batch(records)
+
+
+def format_windows(windows):
+    lines = [
+        f"{'window start':<17}{'records':>10}{'accept':>8}{'max PSI':>9}  "
+        f"{'feature':<11}{'z KS':>6}{'rules':>7}  status"
+    ]
+    for start, report in windows:
+        stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(start))
+        if report is None:
+            lines.append(f"{stamp:<17}  (too few records or no baseline)")
+            continue
+        feature = max(report["psi"], key=report["psi"].get)
+        accept = report["accept_rate"]
+        lines.append(
+            f"{stamp:<17}{report['records']:>10,}"
+            + (f"{accept:>8.1%}" if accept is not None else f"{'-':>8}")
+            + f"{report['psi'][feature]:>9.3f}  {feature:<11}{report['ks']['z']:>6.3f}"
+            f"{len(report['shifted_rules']):>7}  {report['status']}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay audit logs through the drift monitor, window by window"
+    )
+    parser.add_argument("inputs", nargs="+", help="audit logs (.jsonl.gz) to check")
+    parser.add_argument(
+        "--baseline",
+        nargs="+",
+        help="baseline JSON (--save-baseline) or audit logs; default: first window",
+    )
+    parser.add_argument("--window", type=float, default=3600.0, help="seconds")
+    parser.add_argument("--model", default="default")
+    parser.add_argument("--min-records", type=int, default=500)
+    parser.add_argument(
+        "--config", help="config JSON of the model (default: FuzzyConfig)"
+    )
+    parser.add_argument("--save-baseline", help="write the baseline histograms here")
+    parser.add_argument("--json", help="also write the window reports as JSON here")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config) if args.config else FuzzyConfig
+    n_rules = len(config.ACCEPTANCE_RULES) + len(config.REJECTION_RULES)
+    baseline = None
+    if args.baseline and args.baseline[0].endswith(".json"):
+        baseline = load_baseline(args.baseline[0])
+    elif args.baseline:
+        baseline = Histograms(n_rules)
+        for _, *scored in audit_batches(
+            args.baseline, n_rules, float("inf"), args.model
+        ):
+            baseline.add(*scored)
+    monitor = DriftMonitor(args.model, args.window, None, baseline, args.min_records)
+    for timestamp, *scored in audit_batches(
+        args.inputs, n_rules, args.window, args.model
+    ):
+        monitor.observe(args.model, *scored, timestamp=timestamp)
+    monitor.close_window()
+    windows = monitor.windows()
+    print(format_windows(windows))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as handle:
+            json.dump(monitor.baseline.to_dict(), handle)
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(
+                [{"start": start, **(report or {})} for start, report in windows],
+                handle,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,909 @@
+# Vectorized scoring engine for the 5C fuzzy rule base
+import functools
+import itertools
+import json
+import os
+import threading
+
+import numpy as np
+
+from evaluator import FuzzyConfig
+
+CRITERIA_ORDER = ("Character", "Capital", "Capacity", "Collateral", "Condition")
+MAX_LEVELS = 3
+
+# AND operators, each applied as a pairwise ufunc kernel across the criteria
+TNORMS = {"min": np.minimum, "product": np.multiply}
+AGGREGATIONS = ("weighted_average", "weighted_sum")
+
+
+def as_criteria_matrix(inputs):
+    """Convert an inputs dict, a list of dicts or an array to an (N, 5) float matrix"""
+    if isinstance(inputs, dict):
+        inputs = [inputs]
+    if isinstance(inputs, (list, tuple)) and inputs and isinstance(inputs[0], dict):
+        return np.array(
+            [[row[criteria] for criteria in CRITERIA_ORDER] for row in inputs],
+            dtype=np.float64,
+        )
+    matrix = np.asarray(inputs, dtype=np.float64)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    if matrix.ndim != 2 or matrix.shape[1] != len(CRITERIA_ORDER):
+        raise ValueError(
+            f"Expected an (N, {len(CRITERIA_ORDER)}) criteria matrix, got {matrix.shape}"
+        )
+    return matrix
+
+
+def decide(z, threshold=FuzzyConfig.DECISION_THRESHOLD):
+    """Accept/reject decision on z rounded to 2 decimals, as display_results does"""
+    return np.round(z, 2) > threshold
+
+
+CONFIG_KEYS = (
+    "ACCEPTANCE_RULES",
+    "REJECTION_RULES",
+    "MEMBERSHIP_BREAKPOINTS",
+    "DECISION_THRESHOLD",
+    "TNORM",
+    "AGGREGATION",
+    "RULE_WEIGHTS",
+    "RULE_CONSEQUENTS",
+)
+
+
+def config_to_dict(config=FuzzyConfig):
+    """JSON-serializable engine settings of a FuzzyConfig(-like) class"""
+    data = {}
+    for key in CONFIG_KEYS:
+        value = getattr(config, key, getattr(FuzzyConfig, key))
+        if key.endswith("_RULES"):
+            value = [list(rule) for rule in value]
+        elif key == "MEMBERSHIP_BREAKPOINTS":
+            value = {c: [list(shape) for shape in value[c]] for c in CRITERIA_ORDER}
+        elif isinstance(value, (tuple, np.ndarray)):
+            value = list(np.asarray(value).tolist())
+        data[key] = value
+    return data
+
+
+def config_from_dict(data, name="LoadedConfig"):
+    """FuzzyConfig subclass overriding the engine settings found in data"""
+    unknown = set(data) - set(CONFIG_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown config keys: {sorted(unknown)}")
+    attrs = dict(data)
+    for key in ("ACCEPTANCE_RULES", "REJECTION_RULES"):
+        if key in attrs:
+            attrs[key] = [tuple(rule) for rule in attrs[key]]
+    if "MEMBERSHIP_BREAKPOINTS" in attrs:
+        attrs["MEMBERSHIP_BREAKPOINTS"] = {
+            c: tuple(tuple(shape) for shape in shapes)
+            for c, shapes in attrs["MEMBERSHIP_BREAKPOINTS"].items()
+        }
+    return type(name, (FuzzyConfig,), attrs)
+
+
+def load_config(path, name=None):
+    """Load a JSON config written by dump_config"""
+    with open(path) as handle:
+        data = json.load(handle)
+    return config_from_dict(data, name or os.path.splitext(os.path.basename(path))[0])
+
+
+def dump_config(config, path):
+    with open(path, "w") as handle:
+        json.dump(config_to_dict(config), handle, indent=2)
+
+
+def compact_traces(alpha):
+    """Fired rules of every row in CSR form: (row offsets, rule ids, alphas)"""
+    rows, rules = np.nonzero(alpha)
+    offsets = np.searchsorted(rows, np.arange(alpha.shape[0] + 1))
+    return offsets, rules.astype(np.uint16), alpha[rows, rules]
+
+
+def check_component_scores(components):
+    """Raise ValueError unless every entry of an (N, k) matrix is an integer 1-5"""
+    components = np.asarray(components)
+    if components.dtype.kind not in "iuf":
+        raise ValueError(f"Component scores must be numbers, got {components.dtype}")
+    invalid = (components < 1) | (components > 5)
+    if components.dtype.kind == "f":
+        invalid |= components != np.round(components)
+    rows = np.flatnonzero(invalid.any(axis=1))
+    if rows.size:
+        raise ValueError(
+            f"Component scores must be integers 1-5: {rows.size} invalid rows, "
+            f"first {rows[:10].tolist()}"
+        )
+    return components
+
+
+def check_criteria_values(matrix):
+    """Raise ValueError unless every criteria value is finite and within 0-100"""
+    matrix = as_criteria_matrix(matrix)
+    # NaN fails both comparisons
+    invalid = ~((matrix >= 0) & (matrix <= 100))
+    rows = np.flatnonzero(invalid.any(axis=1))
+    if rows.size:
+        raise ValueError(
+            f"Criteria values must be finite and within 0-100: {rows.size} invalid "
+            f"rows, first {rows[:10].tolist()}"
+        )
+    return matrix
+
+
+class ComponentAggregator:
+    """Aggregate the raw 1-5 component scores into the 5C criteria (0-100)
+
+    Components are the `components` entries of CRITERIA_DATA in declaration
+    order (14 for FuzzyConfig). Each criteria is the weighted mean of its
+    components scaled by (mean / 5) * 100, which with unit weights is exactly
+    the calculation create_input_form always did.
+    """
+
+    def __init__(self, criteria_data=FuzzyConfig.CRITERIA_DATA, weights=None):
+        self.components = [
+            (criteria, component)
+            for criteria in CRITERIA_ORDER
+            for component in criteria_data[criteria]["components"]
+        ]
+        if weights is None:
+            weights = np.ones(len(self.components))
+        elif isinstance(weights, dict):
+            weights = [weights.get(component, 1.0) for _, component in self.components]
+        self.weights = np.asarray(weights, dtype=np.float64)
+        if self.weights.shape != (len(self.components),) or (self.weights <= 0).any():
+            raise ValueError(
+                f"Expected {len(self.components)} positive component weights"
+            )
+        self.matrix = np.zeros((len(self.components), len(CRITERIA_ORDER)))
+        for idx, (criteria, _) in enumerate(self.components):
+            self.matrix[idx, CRITERIA_ORDER.index(criteria)] = self.weights[idx]
+        self.totals = self.matrix.sum(axis=0)
+        self.unit_weights = bool((self.weights == 1.0).all())
+
+    @classmethod
+    def from_config(cls, config=FuzzyConfig, weights=None):
+        return cls(config.CRITERIA_DATA, weights)
+
+    def validate(self, components):
+        """Check the whole (N, 14) component matrix is integer 1-5 in one pass"""
+        components = np.asarray(components)
+        if components.ndim != 2 or components.shape[1] != len(self.components):
+            raise ValueError(
+                f"Expected an (N, {len(self.components)}) component matrix, "
+                f"got {components.shape}"
+            )
+        return check_component_scores(components)
+
+    def aggregate(self, components):
+        """(N, 14) component scores -> (N, 5) criteria matrix"""
+        components = self.validate(components)
+        criteria = components.astype(np.float64) @ self.matrix
+        criteria /= self.totals
+        criteria /= 5
+        criteria *= 100
+        return criteria
+
+    def criteria_value(self, criteria, values):
+        """Aggregate the component scores of one criteria, for single applicants"""
+        weights = [
+            self.weights[idx]
+            for idx, (name, _) in enumerate(self.components)
+            if name == criteria
+        ]
+        if len(values) != len(weights):
+            raise ValueError(f"{criteria}: expected {len(weights)} component scores")
+        if any(value not in (1, 2, 3, 4, 5) for value in values):
+            raise ValueError(f"{criteria}: component scores must be integers 1-5")
+        mean = sum(w * v for w, v in zip(weights, values)) / sum(weights)
+        return (mean / 5) * 100
+
+
+def lattice_values(n_components):
+    """Criteria values reachable with n unit-weight components scored 1-5
+
+    Computed exactly like ComponentAggregator and create_input_form do, so
+    slider inputs compare equal to these floats.
+    """
+    return np.arange(n_components, 5 * n_components + 1) / n_components / 5 * 100
+
+
+class MembershipFunctions:
+    """Shoulder/triangle membership functions compiled from breakpoints
+
+    When `lattice_counts` maps every criteria to its number of components,
+    the membership degrees of the (at most 13) slider values of each criteria
+    are tabulated once with degree(); inputs on that lattice are then looked
+    up by index and only other values take the analytical path.
+    """
+
+    def __init__(self, breakpoints, lattice_counts=None):
+        self.breakpoints = {}
+        for criteria in CRITERIA_ORDER:
+            shapes = tuple(
+                tuple(float(point) for point in shape)
+                for shape in breakpoints[criteria]
+            )
+            if not 2 <= len(shapes) <= MAX_LEVELS:
+                raise ValueError(f"{criteria}: expected 2-{MAX_LEVELS} levels")
+            for position, shape in enumerate(shapes):
+                inner = 0 < position < len(shapes) - 1
+                strictly_increasing = all(a < b for a, b in zip(shape, shape[1:]))
+                if len(shape) != (3 if inner else 2) or not strictly_increasing:
+                    raise ValueError(
+                        f"{criteria} level {position + 1}: invalid breakpoints {shape}"
+                    )
+            self.breakpoints[criteria] = shapes
+        self.n_levels = tuple(len(self.breakpoints[c]) for c in CRITERIA_ORDER)
+        self.lattice_counts = dict(lattice_counts or {})
+        self.lattice = {}  # criteria -> lattice values
+        self.tables = {}  # criteria -> (values, levels) membership table
+        self._lookup = {}  # criteria -> {value: [degree per level]}
+        if self.lattice_counts:
+            for criteria in CRITERIA_ORDER:
+                values = lattice_values(self.lattice_counts[criteria])
+                shapes = self.breakpoints[criteria]
+                table = np.zeros((len(values), MAX_LEVELS))
+                for position, shape in enumerate(shapes):
+                    table[:, position] = self.degree(
+                        values, shape, position, len(shapes)
+                    )
+                self.lattice[criteria] = values
+                self.tables[criteria] = table
+                self._lookup[criteria] = dict(
+                    zip(values.tolist(), table[:, : len(shapes)].tolist())
+                )
+            # All criteria stacked, so one gather yields the whole tensor
+            sizes = [len(self.lattice[c]) for c in CRITERIA_ORDER]
+            self._stacked_values = np.concatenate(
+                [self.lattice[c] for c in CRITERIA_ORDER]
+            )
+            self._stacked_table = np.concatenate(
+                [self.tables[c] for c in CRITERIA_ORDER]
+            )
+            self._index_scale = np.array(
+                [self.lattice_counts[c] / 20 for c in CRITERIA_ORDER]
+            )
+            self._index_base = np.array(
+                [self.lattice_counts[c] for c in CRITERIA_ORDER], dtype=np.intp
+            )
+            self._index_offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+            self._index_max = np.array(sizes, dtype=np.intp) - 1
+
+    @classmethod
+    def from_config(cls, config=FuzzyConfig):
+        counts = {
+            criteria: len(config.CRITERIA_DATA[criteria]["components"])
+            for criteria in CRITERIA_ORDER
+        }
+        return cls(config.MEMBERSHIP_BREAKPOINTS, counts)
+
+    @staticmethod
+    def degree(values, shape, position, n_levels, out=None, scratch=None):
+        """Membership degree of values in one level
+
+        Computed as the clipped linear ramp(s) of the shape, which reproduces
+        the arithmetic of calculate_membership_strength exactly; out and
+        scratch let callers evaluate without allocating.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if out is None:
+            out = np.empty_like(values)
+        if position == 0:  # left shoulder
+            a, b = shape
+            np.subtract(b, values, out=out)
+            np.divide(out, b - a, out=out)
+        elif position == n_levels - 1:  # right shoulder
+            a, b = shape
+            np.subtract(values, a, out=out)
+            np.divide(out, b - a, out=out)
+        else:  # triangle
+            a, b, c = shape
+            if scratch is None:
+                scratch = np.empty_like(values)
+            np.subtract(values, a, out=out)
+            np.divide(out, b - a, out=out)
+            np.subtract(c, values, out=scratch)
+            np.divide(scratch, c - b, out=scratch)
+            np.minimum(out, scratch, out=out)
+        return np.clip(out, 0.0, 1.0, out=out)
+
+    def fuzzify(self, matrix):
+        """Membership tensor (N, 5, MAX_LEVELS) of a criteria matrix, zero padded"""
+        matrix = as_criteria_matrix(matrix)
+        if not self.lattice:
+            mu = np.zeros((matrix.shape[0], len(CRITERIA_ORDER), MAX_LEVELS))
+            off_lattice = np.ones(matrix.shape, dtype=bool)
+        else:
+            # Candidate lattice index per cell, confirmed by exact equality;
+            # NaN and inf cast to garbage indices that the clip makes valid
+            with np.errstate(invalid="ignore"):
+                index = np.rint(matrix * self._index_scale).astype(np.intp)
+            index -= self._index_base
+            np.clip(index, 0, self._index_max, out=index)
+            index += self._index_offsets
+            mu = np.take(self._stacked_table, index, axis=0)
+            off_lattice = np.take(self._stacked_values, index) != matrix
+            if not off_lattice.any():
+                return mu
+        for idx, criteria in enumerate(CRITERIA_ORDER):
+            rows = off_lattice[:, idx]
+            if not rows.any():
+                continue
+            if rows.all():
+                rows = slice(None)
+            column = matrix[rows, idx]
+            shapes = self.breakpoints[criteria]
+            for position, shape in enumerate(shapes):
+                mu[rows, idx, position] = self.degree(
+                    column, shape, position, len(shapes)
+                )
+        return mu
+
+    def fuzzify_one(self, inputs):
+        """Membership degrees of one applicant, one list of levels per criteria"""
+        degrees = []
+        for criteria in CRITERIA_ORDER:
+            value = float(inputs[criteria])
+            row = self._lookup[criteria].get(value) if self._lookup else None
+            if row is None:
+                shapes = self.breakpoints[criteria]
+                row = [
+                    float(self.degree(value, shape, position, len(shapes)))
+                    for position, shape in enumerate(shapes)
+                ]
+            degrees.append(row)
+        return degrees
+
+
+def rule_strengths(mu, levels, tnorm="min"):
+    """Firing strength (N, R) of rules given as 0-based level indices"""
+    kernel = TNORMS[tnorm]
+    alpha = mu[:, 0, levels[:, 0]]
+    for idx in range(1, levels.shape[1]):
+        kernel(alpha, mu[:, idx, levels[:, idx]], out=alpha)
+    return alpha
+
+
+def aggregate(numerator, denominator, aggregation="weighted_average"):
+    """Defuzzify from sum(alpha * w * z) and sum(alpha * w), z = 0 when no rule fires"""
+    if aggregation == "weighted_sum":
+        return numerator
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros_like(numerator),
+        where=denominator > 0,
+    )
+
+
+class CompiledRuleBase:
+    """Rule base compiled into level-index arrays for vectorized evaluation"""
+
+    def __init__(
+        self,
+        rules,
+        consequents,
+        weights=None,
+        threshold=FuzzyConfig.DECISION_THRESHOLD,
+        name="default",
+        tnorm="min",
+        aggregation="weighted_average",
+        breakpoints=None,
+    ):
+        if tnorm not in TNORMS:
+            raise ValueError(
+                f"{name}: unknown t-norm {tnorm!r}, expected {list(TNORMS)}"
+            )
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(
+                f"{name}: unknown aggregation {aggregation!r}, expected {list(AGGREGATIONS)}"
+            )
+        self.name = name
+        self.tnorm = tnorm
+        self.aggregation = aggregation
+        self.rules = np.asarray(rules, dtype=np.intp).reshape(-1, len(CRITERIA_ORDER))
+        self.levels = self.rules - 1
+        self.consequents = np.asarray(consequents, dtype=np.float64)
+        if weights is None:
+            weights = np.ones(len(self.rules))
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.threshold = float(threshold)
+        # Membership breakpoints the rules were written for, None if unknown
+        self.breakpoints = breakpoints
+        if not len(self.rules) == len(self.consequents) == len(self.weights):
+            raise ValueError(f"{name}: rules, consequents and weights differ in length")
+
+    @classmethod
+    def from_config(cls, config=FuzzyConfig, name="default"):
+        """Compile ACCEPTANCE_RULES (z=1) and REJECTION_RULES (z=0) of a config"""
+        rules = list(config.ACCEPTANCE_RULES) + list(config.REJECTION_RULES)
+        consequents = getattr(config, "RULE_CONSEQUENTS", None)
+        if consequents is None:
+            consequents = [1.0] * len(config.ACCEPTANCE_RULES) + [0.0] * len(
+                config.REJECTION_RULES
+            )
+        return cls(
+            rules,
+            consequents,
+            weights=getattr(config, "RULE_WEIGHTS", None),
+            threshold=getattr(config, "DECISION_THRESHOLD", 0.5),
+            name=name,
+            tnorm=getattr(config, "TNORM", "min"),
+            aggregation=getattr(config, "AGGREGATION", "weighted_average"),
+            breakpoints=MembershipFunctions(config.MEMBERSHIP_BREAKPOINTS).breakpoints,
+        )
+
+    def validate(self, membership):
+        """Check the rules fit the membership functions they are scored with
+
+        Every rule level must exist, and a rule base compiled from a config
+        must use that config's breakpoints.
+        """
+        if self.breakpoints is not None and self.breakpoints != membership.breakpoints:
+            raise ValueError(
+                f"{self.name}: compiled for other membership breakpoints than the "
+                "registry's; score it with its own MembershipFunctions"
+            )
+        limits = np.array(membership.n_levels)
+        bad = np.flatnonzero(((self.rules < 1) | (self.rules > limits)).any(axis=1))
+        if bad.size:
+            raise ValueError(
+                f"{self.name}: rules {bad.tolist()} use undefined membership levels"
+            )
+
+    def firing_strengths(self, mu):
+        return rule_strengths(mu, self.levels, self.tnorm)
+
+    def defuzzify(self, alpha):
+        numerator = alpha @ (self.weights * self.consequents)
+        denominator = alpha @ self.weights
+        return aggregate(numerator, denominator, self.aggregation)
+
+    def evaluate(self, matrix, membership=None):
+        """Score a criteria matrix on its own, returns (z, accepted, alpha)"""
+        membership = membership or MembershipFunctions.from_config()
+        alpha = self.firing_strengths(membership.fuzzify(matrix))
+        z = self.defuzzify(alpha)
+        return z, decide(z, self.threshold), alpha
+
+
+class ModelRegistry:
+    """Compiled rule bases sharing one set of membership functions
+
+    Rules are deduplicated across models, so a call fuzzifies each applicant
+    once and computes each distinct rule antecedent once for all models.
+    Observers (e.g. an audit sink) get observe(model, matrix, z, accepted,
+    alpha) after every score() batch and score_one() call and must not keep
+    references to the arrays.
+    """
+
+    def __init__(self, membership=None, observers=()):
+        self.membership = membership or MembershipFunctions.from_config()
+        self.models = {}
+        self.observers = list(observers)
+        self._plan = None
+
+    def register(self, rule_base, name=None):
+        name = name or rule_base.name
+        rule_base.validate(self.membership)
+        self.models[name] = rule_base
+        self._plan = None
+        return rule_base
+
+    def unregister(self, name):
+        del self.models[name]
+        self._plan = None
+
+    def _compile(self):
+        """Build the shared antecedent table and per-model aggregation matrices"""
+        if self._plan is not None:
+            return self._plan
+        if not self.models:
+            raise ValueError("No models registered")
+        names = list(self.models)
+        tnorm_codes = {tnorm: code for code, tnorm in enumerate(TNORMS)}
+        # An antecedent is shared only between models using the same t-norm
+        keys = np.concatenate(
+            [
+                np.column_stack(
+                    [
+                        np.full(
+                            len(self.models[n].rules), tnorm_codes[self.models[n].tnorm]
+                        ),
+                        self.models[n].levels,
+                    ]
+                )
+                for n in names
+            ]
+        )
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        numerator = np.zeros((len(unique), len(names)))
+        denominator = np.zeros((len(unique), len(names)))
+        # For the sparse single-applicant path:
+        # levels -> [(tnorm, model, rule, w*z, w)]
+        by_antecedent = {}
+        columns = []
+        offset = 0
+        for m, name in enumerate(names):
+            model = self.models[name]
+            rows = inverse[offset : offset + len(model.rules)]
+            offset += len(model.rules)
+            columns.append(rows)
+            np.add.at(numerator[:, m], rows, model.weights * model.consequents)
+            np.add.at(denominator[:, m], rows, model.weights)
+            for r, levels in enumerate(model.levels.tolist()):
+                by_antecedent.setdefault(tuple(levels), []).append(
+                    (
+                        model.tnorm,
+                        m,
+                        r,
+                        float(model.weights[r] * model.consequents[r]),
+                        float(model.weights[r]),
+                    )
+                )
+        self._plan = {
+            "names": names,
+            "groups": [
+                (tnorm, np.flatnonzero(unique[:, 0] == code))
+                for tnorm, code in tnorm_codes.items()
+                if (unique[:, 0] == code).any()
+            ],
+            "levels": unique[:, 1:],
+            "numerator": numerator,
+            "denominator": denominator,
+            "aggregations": [self.models[n].aggregation for n in names],
+            "thresholds": np.array([self.models[n].threshold for n in names]),
+            "columns": columns,
+            "by_antecedent": by_antecedent,
+        }
+        return self._plan
+
+    def score(self, matrix, with_alpha=False):
+        """Score a batch against every registered model
+
+        Returns {model name: {"z", "accepted"[, "alpha"]}} with one row per
+        applicant; "alpha" holds the firing strength of each rule of the model.
+        """
+        plan = self._compile()
+        matrix = as_criteria_matrix(matrix)
+        mu = self.membership.fuzzify(matrix)
+        if len(plan["groups"]) == 1:
+            alpha = rule_strengths(mu, plan["levels"], plan["groups"][0][0])
+        else:
+            alpha = np.empty((mu.shape[0], len(plan["levels"])))
+            for tnorm, rows in plan["groups"]:
+                alpha[:, rows] = rule_strengths(mu, plan["levels"][rows], tnorm)
+        numerator = alpha @ plan["numerator"]
+        denominator = alpha @ plan["denominator"]
+        results = {}
+        for m, name in enumerate(plan["names"]):
+            z = aggregate(numerator[:, m], denominator[:, m], plan["aggregations"][m])
+            results[name] = {"z": z, "accepted": decide(z, plan["thresholds"][m])}
+            if with_alpha or self.observers:
+                model_alpha = alpha[:, plan["columns"][m]]
+                for observer in self.observers:
+                    observer.observe(
+                        name, matrix, z, results[name]["accepted"], model_alpha
+                    )
+                if with_alpha:
+                    results[name]["alpha"] = model_alpha
+        return results
+
+    def score_one(self, inputs):
+        """Score one applicant touching only the rules it actually fires
+
+        Returns {model name: {"z", "accepted", "fired": [(rule index, alpha)]}}.
+        """
+        plan = self._compile()
+        mu = self.membership.fuzzify_one(inputs)
+        active = [
+            [level for level, strength in enumerate(row) if strength > 0] for row in mu
+        ]
+        n_models = len(plan["names"])
+        numerator = [0.0] * n_models
+        denominator = [0.0] * n_models
+        fired = [[] for _ in range(n_models)]
+        for antecedent in itertools.product(*active):
+            entries = plan["by_antecedent"].get(antecedent)
+            if not entries:
+                continue
+            strengths = [mu[idx][level] for idx, level in enumerate(antecedent)]
+            alphas = {"min": min(strengths)}
+            for tnorm, m, r, weighted_z, weight in entries:
+                if tnorm not in alphas:
+                    alphas[tnorm] = float(functools.reduce(TNORMS[tnorm], strengths))
+                alpha = alphas[tnorm]
+                numerator[m] += alpha * weighted_z
+                denominator[m] += alpha * weight
+                fired[m].append((r, alpha))
+        results = {}
+        for m, name in enumerate(plan["names"]):
+            if plan["aggregations"][m] == "weighted_sum":
+                z = numerator[m]
+            else:
+                z = numerator[m] / denominator[m] if denominator[m] > 0 else 0.0
+            fired[m].sort()
+            results[name] = {
+                "z": z,
+                "accepted": bool(decide(z, plan["thresholds"][m])),
+                "fired": fired[m],
+            }
+        if self.observers:
+            self._observe_one(plan, inputs, results)
+        return results
+
+    def _observe_one(self, plan, inputs, results):
+        """Hand a score_one() result to the observers as a one-row batch"""
+        matrix = as_criteria_matrix(inputs)
+        for m, name in enumerate(plan["names"]):
+            alpha = np.zeros((1, len(plan["columns"][m])))
+            for r, strength in results[name]["fired"]:
+                alpha[0, r] = strength
+            z = np.array([results[name]["z"]])
+            accepted = np.array([results[name]["accepted"]])
+            for observer in self.observers:
+                observer.observe(name, matrix, z, accepted, alpha)
+
+
+class ScratchBuffers:
+    """Preallocated working memory for one Scorer batch of up to `capacity` rows"""
+
+    __slots__ = (
+        "capacity",
+        "column",
+        "mu",
+        "ramp",
+        "gathered",
+        "alpha",
+        "numerator",
+        "denominator",
+        "fired",
+        "rounded",
+    )
+
+    def __init__(self, capacity, n_rules):
+        self.capacity = capacity
+        self.column = np.empty(capacity)
+        self.mu = np.zeros((len(CRITERIA_ORDER), capacity, MAX_LEVELS))
+        self.ramp = np.empty(capacity)
+        self.gathered = np.empty((capacity, n_rules))
+        self.alpha = np.empty((capacity, n_rules))
+        self.numerator = np.empty(capacity)
+        self.denominator = np.empty(capacity)
+        self.fired = np.empty(capacity, dtype=bool)
+        self.rounded = np.empty(capacity)
+
+
+class Scorer:
+    """Reusable, thread-safe scorer that writes into caller-provided arrays
+
+    All intermediate results live in ScratchBuffers, either passed in or
+    kept per thread, so scoring allocates nothing in steady state. Observers
+    are called per chunk like ModelRegistry observers.
+    """
+
+    __slots__ = (
+        "rule_base",
+        "membership",
+        "batch_size",
+        "threshold",
+        "_shapes",
+        "_levels",
+        "_weighted_consequents",
+        "_weights",
+        "_kernel",
+        "_weighted_sum",
+        "_local",
+        "observers",
+    )
+
+    def __init__(self, rule_base=None, membership=None, batch_size=1024, observers=()):
+        self.rule_base = rule_base or CompiledRuleBase.from_config()
+        self.membership = membership or MembershipFunctions.from_config()
+        self.rule_base.validate(self.membership)
+        self.batch_size = batch_size
+        self.threshold = self.rule_base.threshold
+        self._shapes = [
+            (idx, position, shape, len(self.membership.breakpoints[criteria]))
+            for idx, criteria in enumerate(CRITERIA_ORDER)
+            for position, shape in enumerate(self.membership.breakpoints[criteria])
+        ]
+        self._levels = [
+            np.ascontiguousarray(self.rule_base.levels[:, idx])
+            for idx in range(len(CRITERIA_ORDER))
+        ]
+        self._weighted_consequents = self.rule_base.weights * self.rule_base.consequents
+        self._weights = self.rule_base.weights.copy()
+        self._kernel = TNORMS[self.rule_base.tnorm]
+        self._weighted_sum = self.rule_base.aggregation == "weighted_sum"
+        self._local = threading.local()
+        self.observers = tuple(observers)
+
+    def new_scratch(self):
+        return ScratchBuffers(self.batch_size, len(self.rule_base.rules))
+
+    def scratch(self):
+        """Scratch buffers owned by the calling thread"""
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = self.new_scratch()
+        return buffers
+
+    def score_into(self, matrix, z_out, accepted_out=None, scratch=None):
+        """Score an (N, 5) float64 criteria matrix into z_out (and accepted_out)"""
+        buffers = scratch or self.scratch()
+        n_rows = matrix.shape[0]
+        for start in range(0, n_rows, buffers.capacity):
+            stop = min(start + buffers.capacity, n_rows)
+            self._score_chunk(
+                matrix[start:stop],
+                z_out[start:stop],
+                None if accepted_out is None else accepted_out[start:stop],
+                buffers,
+            )
+        return z_out
+
+    def _score_chunk(self, matrix, z_out, accepted_out, buffers):
+        n_rows = matrix.shape[0]
+        column = buffers.column[:n_rows]
+        ramp = buffers.ramp[:n_rows]
+        for idx, position, shape, n_levels in self._shapes:
+            np.copyto(column, matrix[:, idx])
+            self.membership.degree(
+                column,
+                shape,
+                position,
+                n_levels,
+                buffers.mu[idx, :n_rows, position],
+                ramp,
+            )
+
+        alpha = buffers.alpha[:n_rows]
+        gathered = buffers.gathered[:n_rows]
+        np.take(buffers.mu[0, :n_rows], self._levels[0], axis=1, out=alpha, mode="clip")
+        for idx in range(1, len(CRITERIA_ORDER)):
+            np.take(
+                buffers.mu[idx, :n_rows],
+                self._levels[idx],
+                axis=1,
+                out=gathered,
+                mode="clip",
+            )
+            self._kernel(alpha, gathered, out=alpha)
+
+        if self._weighted_sum:
+            np.matmul(alpha, self._weighted_consequents, out=z_out)
+        else:
+            numerator = buffers.numerator[:n_rows]
+            denominator = buffers.denominator[:n_rows]
+            fired = buffers.fired[:n_rows]
+            np.matmul(alpha, self._weighted_consequents, out=numerator)
+            np.matmul(alpha, self._weights, out=denominator)
+            np.greater(denominator, 0.0, out=fired)
+            z_out.fill(0.0)
+            np.divide(numerator, denominator, out=z_out, where=fired)
+        if accepted_out is not None:
+            rounded = buffers.rounded[:n_rows]
+            np.round(z_out, 2, out=rounded)
+            np.greater(rounded, self.threshold, out=accepted_out)
+        for observer in self.observers:
+            observer.observe(self.rule_base.name, matrix, z_out, accepted_out, alpha)
+
+
+# Packed applicants: component i (in ComponentAggregator order) is stored as
+# score - 1 in bits 3*i .. 3*i+2 of a uint64, 14 components use 42 bits
+COMPONENT_BITS = 3
+
+
+def pack_components(components):
+    """Pack an (N, k) matrix of 1-5 component scores into uint64 codes"""
+    components = np.asarray(components)
+    if components.ndim != 2 or components.shape[1] * COMPONENT_BITS > 64:
+        raise ValueError(
+            f"Expected an (N, k <= {64 // COMPONENT_BITS}) component matrix, "
+            f"got {components.shape}"
+        )
+    # An out-of-range score would spill into the next component's bits
+    check_component_scores(components)
+    shifts = np.arange(components.shape[1], dtype=np.uint64) * np.uint64(COMPONENT_BITS)
+    digits = components.astype(np.uint64) - np.uint64(1)
+    return np.bitwise_or.reduce(digits << shifts, axis=1)
+
+
+def unpack_components(codes, n_components=14):
+    """Inverse of pack_components, returns an (N, n_components) uint8 matrix"""
+    codes = np.asarray(codes, dtype=np.uint64)
+    shifts = np.arange(n_components, dtype=np.uint64) * np.uint64(COMPONENT_BITS)
+    digits = (codes[:, None] >> shifts) & np.uint64(2**COMPONENT_BITS - 1)
+    return (digits + 1).astype(np.uint8)
+
+
+class DecisionLattice:
+    """Precomputed z and decision for every reachable component-sum profile
+
+    With unit weights a criteria value depends only on the sum of its
+    component scores, so all applicants fall on a lattice of
+    13 * 13 * 9 * 13 * 13 = 257,049 cells for FuzzyConfig. Scoring packed
+    codes or raw component matrices is then a few small table gathers plus
+    one gather into the precomputed z table, with no float aggregation or
+    fuzzification at runtime.
+    """
+
+    def __init__(
+        self, rule_base=None, membership=None, aggregator=None, z=None, accepted=None
+    ):
+        self.rule_base = rule_base or CompiledRuleBase.from_config()
+        self.membership = membership or MembershipFunctions.from_config()
+        self.aggregator = aggregator or ComponentAggregator()
+        if not self.aggregator.unit_weights:
+            raise ValueError("The decision lattice needs unit component weights")
+        self.rule_base.validate(self.membership)
+        self.counts = (self.aggregator.matrix > 0).sum(axis=0)
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)[:-1]])
+        self.shape = tuple((4 * self.counts + 1).tolist())  # sums n .. 5n
+        self.strides = np.array(
+            [int(np.prod(self.shape[idx + 1 :])) for idx in range(len(self.shape))]
+        )
+        # Criteria value of every lattice point, computed like the aggregator
+        self.values = [lattice_values(n) for n in self.counts.tolist()]
+        if z is None:
+            grid = np.stack(
+                [axis.ravel() for axis in np.meshgrid(*self.values, indexing="ij")],
+                axis=1,
+            )
+            z, accepted, _ = self.rule_base.evaluate(grid, self.membership)
+        elif len(z) != np.prod(self.shape) or len(accepted) != len(z):
+            raise ValueError(
+                f"Precomputed tables do not match the lattice {self.shape}"
+            )
+        # Precomputed z / accepted (e.g. shared read-only) skip the evaluation
+        self.z, self.accepted = z, accepted
+        self.field_tables = [self._field_table(n) for n in self.counts.tolist()]
+
+    def _field_table(self, n_components):
+        """Map the packed bits of one criteria to its lattice offset
+
+        Fields holding a digit above 4 (a score above 5) map to a large
+        negative value so that invalid codes produce a negative cell index.
+        """
+        fields = np.arange(2 ** (COMPONENT_BITS * n_components))
+        digits = (fields[:, None] >> (COMPONENT_BITS * np.arange(n_components))) & (
+            2**COMPONENT_BITS - 1
+        )
+        return np.where((digits > 4).any(axis=1), -(2**40), digits.sum(axis=1))
+
+    def cells_from_codes(self, codes):
+        codes = np.asarray(codes, dtype=np.uint64)
+        cells = np.zeros(codes.shape, dtype=np.int64)
+        for idx, (offset, n) in enumerate(
+            zip(self.offsets.tolist(), self.counts.tolist())
+        ):
+            mask = np.uint64(2 ** (COMPONENT_BITS * n) - 1)
+            fields = (codes >> np.uint64(COMPONENT_BITS * offset)) & mask
+            cells += self.field_tables[idx][fields.astype(np.intp)] * self.strides[idx]
+        if (cells < 0).any() or (
+            codes >> np.uint64(COMPONENT_BITS * sum(self.counts))
+        ).any():
+            raise ValueError("Packed codes contain component scores outside 1-5")
+        return cells
+
+    def cells_from_components(self, components):
+        components = self.aggregator.validate(components)
+        sums = components.astype(np.int64) @ (self.aggregator.matrix > 0)
+        return (sums - self.counts) @ self.strides
+
+    def score_codes(self, codes):
+        """z and accepted for uint64 codes from pack_components"""
+        cells = self.cells_from_codes(codes)
+        return self.z[cells], self.accepted[cells]
+
+    def score_components(self, components):
+        """z and accepted for an (N, 14) uint8 component matrix"""
+        cells = self.cells_from_components(components)
+        return self.z[cells], self.accepted[cells]
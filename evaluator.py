@@ -0,0 +1,340 @@
+# Fuzzy rule base configuration and reference evaluator
+import functools
+import operator
+
+
+# Configuration for fuzzy rules
+class FuzzyConfig:
+    # Define acceptance rules
+    ACCEPTANCE_RULES = [
+        (3, 3, 3, 2, 3),
+        (3, 3, 3, 2, 2),
+        (3, 3, 2, 2, 3),
+        (3, 2, 3, 2, 3),
+        (3, 3, 2, 2, 2),
+        (3, 2, 3, 2, 2),
+        (3, 2, 2, 2, 3),
+        (2, 3, 3, 2, 3),
+        (2, 2, 2, 2, 2),
+        (2, 2, 2, 2, 3),
+        (2, 2, 3, 2, 2),
+        (2, 3, 2, 2, 2),
+        (3, 2, 2, 2, 2),
+        (2, 2, 3, 2, 3),
+        (2, 3, 2, 2, 3),
+        (3, 2, 2, 2, 3),
+        (2, 3, 3, 2, 2),
+        (3, 2, 3, 2, 2),
+        (3, 3, 2, 2, 2),
+    ]
+
+    # Define rejection rules
+    REJECTION_RULES = [
+        (1, 1, 1, 1, 1),
+        (1, 1, 1, 1, 2),
+        (1, 1, 2, 1, 1),
+        (1, 2, 1, 1, 1),
+        (2, 1, 1, 1, 1),
+        (1, 1, 2, 2, 1),
+        (1, 2, 1, 2, 1),
+        (2, 1, 1, 2, 1),
+        (2, 2, 1, 1, 1),
+        (2, 1, 2, 1, 1),
+        (1, 2, 2, 1, 1),
+        (2, 1, 1, 1, 2),
+        (1, 2, 1, 1, 2),
+        (1, 1, 2, 1, 2),
+        (2, 2, 1, 1, 2),
+        (2, 1, 2, 1, 2),
+        (1, 2, 2, 1, 2),
+        (1, 1, 1, 2, 1),
+        (1, 1, 2, 2, 2),
+        (2, 1, 1, 2, 2),
+        (1, 2, 1, 2, 2),
+        (2, 2, 1, 2, 1),
+        (2, 1, 2, 2, 1),
+        (1, 2, 2, 2, 1),
+        (2, 2, 1, 2, 2),
+        (2, 1, 2, 2, 2),
+        (1, 2, 2, 2, 2),
+        (1, 1, 1, 2, 2),
+        (1, 1, 1, 1, 3),
+    ]
+
+    # Criteria data structure
+    CRITERIA_DATA = {
+        "Character": {
+            "title": "Character",
+            "description": "Penilaian karakter dan kepribadian nasabah",
+            "components": {
+                "Itikad": "Penilaian itikad dan tanggung jawab (1: Sangat Buruk - 5: Sangat Baik)",
+                "Gaya Hidup": "Penilaian pola hidup (1: Sangat Boros - 5: Sangat Hemat)",
+                "Komitmen": "Penilaian komitmen pembayaran (1: Tidak Ada - 5: Sangat Tinggi)",
+            },
+        },
+        "Capital": {
+            "title": "Capital",
+            "description": "Penilaian modal dan aset nasabah",
+            "components": {
+                "Penghasilan Tetap": "Penghasilan bulanan (1: <2jt, 2: 2-3.5jt, 3: 3.5-5jt, 4: 5-7.5jt, 5: >7.5jt)",
+                "Penghasilan Sampingan": "Penghasilan tambahan (1: Tidak ada, 2: <1jt, 3: 1-2jt, 4: 2-3jt, 5: >3jt)",
+                "Tabungan": "Jumlah tabungan (1: <3jt, 2: 3-5jt, 3: 5-20jt, 4: 20-50jt, 5: >50jt)",
+            },
+        },
+        "Capacity": {
+            "title": "Capacity",
+            "description": "Penilaian kemampuan membayar",
+            "components": {
+                "Rasio Angsuran": "Rasio angsuran/pendapatan (1: >70%, 2: 51-70%, 3: 31-50%, 4: 20-30%, 5: <20%)",
+                "Dana Cadangan": "Dana cadangan (1: Tidak ada, 2: 1-2x, 3: 2-4x, 4: 4-6x, 5: >6x angsuran)",
+            },
+        },
+        "Collateral": {
+            "title": "Collateral",
+            "description": "Penilaian jaminan yang diberikan",
+            "components": {
+                "Skor Kredit": "Riwayat kredit (1: Macet - 5: Sangat lancar)",
+                "Jaminan": "Nilai jaminan (1: Tidak ada - 5: Fisik premium)",
+                "Dokumen": "Kelengkapan dokumen (1: Tidak ada - 5: Sangat lengkap)",
+            },
+        },
+        "Condition": {
+            "title": "Condition",
+            "description": "Penilaian kondisi ekonomi",
+            "components": {
+                "Stabilitas Usaha": "Stabilitas usaha (1: Tidak stabil - 5: Sangat stabil)",
+                "Prospek Industri": "Prospek industri (1: Menurun - 5: Berkembang pesat)",
+                "Faktor Eksternal": "Pengaruh eksternal (1: Sangat negatif - 5: Sangat positif)",
+            },
+        },
+    }
+
+    # Membership breakpoints per criteria, one entry per level: the first level
+    # is a left shoulder (a, b), the last a right shoulder (a, b) and any level
+    # in between a triangle (a, b, c). Mirrors calculate_membership_strength.
+    MEMBERSHIP_BREAKPOINTS = {
+        "Character": ((25, 40), (35, 55, 75), (70, 85)),
+        "Capital": ((25, 40), (35, 55, 75), (70, 85)),
+        "Capacity": ((25, 40), (35, 55, 75), (70, 85)),
+        "Collateral": ((45, 55), (45, 55)),
+        "Condition": ((25, 40), (35, 55, 75), (70, 85)),
+    }
+
+    # Linguistic label of each membership level per criteria
+    LEVEL_LABELS = {
+        "Character": ("Buruk", "Sedang", "Baik"),
+        "Capital": ("Rendah", "Sedang", "Tinggi"),
+        "Capacity": ("TidakMampu", "CukupMampu", "Mampu"),
+        "Collateral": ("TidakAman", "Aman"),
+        "Condition": ("TidakStabil", "CukupStabil", "Stabil"),
+    }
+
+    # Defuzzified z above this value means "DITERIMA"
+    DECISION_THRESHOLD = 0.5
+
+    # Engine operators: AND t-norm ("min" or "product") and defuzzifier
+    # ("weighted_average" or "weighted_sum")
+    TNORM = "min"
+    AGGREGATION = "weighted_average"
+
+    # Optional per-rule weights and Sugeno consequents, ordered as
+    # ACCEPTANCE_RULES + REJECTION_RULES. None means weight 1 and z=1 for
+    # acceptance / z=0 for rejection rules.
+    RULE_WEIGHTS = None
+    RULE_CONSEQUENTS = None
+
+
+# Breakpoints implemented by FuzzyEvaluator.calculate_membership_strength
+_MEMBERSHIP_BREAKPOINTS = dict(FuzzyConfig.MEMBERSHIP_BREAKPOINTS)
+
+
+class FuzzyEvaluator:
+    @staticmethod
+    def calculate_membership_strength(value, level, criteria):
+        """Calculate membership strength based on specific fuzzy rules for each criteria"""
+        if criteria == "Character":
+            if level == 1:  # Buruk
+                if value <= 25:
+                    return 1.0
+                elif 25 <= value <= 40:
+                    return (40 - value) / 15
+                elif value >= 40:
+                    return 0.0
+            elif level == 2:  # Sedang
+                if value <= 35 or value >= 75:
+                    return 0.0
+                elif 35 <= value <= 55:
+                    return (value - 35) / 20
+                elif 55 <= value <= 75:
+                    return (75 - value) / 20
+            else:  # level 3: Baik
+                if value <= 70:
+                    return 0.0
+                elif 70 <= value <= 85:
+                    return (value - 70) / 15
+                elif value >= 85:
+                    return 1.0
+
+        elif criteria == "Capital":
+            if level == 1:  # Rendah
+                if value <= 25:
+                    return 1.0
+                elif 25 <= value <= 40:
+                    return (40 - value) / 15
+                elif value >= 40:
+                    return 0.0
+            elif level == 2:  # Sedang
+                if value <= 35 or value >= 75:
+                    return 0.0
+                elif 35 <= value <= 55:
+                    return (value - 35) / 20
+                elif 55 <= value <= 75:
+                    return (75 - value) / 20
+            else:  # level 3: Tinggi
+                if value <= 70:
+                    return 0.0
+                elif 70 <= value <= 85:
+                    return (value - 70) / 15
+                elif value >= 85:
+                    return 1.0
+
+        elif criteria == "Capacity":
+            if level == 1:  # TidakMampu
+                if value <= 25:
+                    return 1.0
+                elif 25 <= value <= 40:
+                    return (40 - value) / 15
+                elif value >= 40:
+                    return 0.0
+            elif level == 2:  # CukupMampu
+                if value <= 35 or value >= 75:
+                    return 0.0
+                elif 35 <= value <= 55:
+                    return (value - 35) / 20
+                elif 55 <= value <= 75:
+                    return (75 - value) / 20
+            else:  # level 3: Mampu
+                if value <= 70:
+                    return 0.0
+                elif 70 <= value <= 85:
+                    return (value - 70) / 15
+                elif value >= 85:
+                    return 1.0
+
+        elif criteria == "Collateral":
+            if level == 1:  # TidakAman
+                if value <= 45:
+                    return 1.0
+                elif 45 <= value <= 55:
+                    return (55 - value) / 10
+                elif value >= 55:
+                    return 0.0
+            else:  # level 2: Aman
+                if value <= 45:
+                    return 0.0
+                elif 45 <= value <= 55:
+                    return (value - 45) / 10
+                elif value >= 55:
+                    return 1.0
+
+        else:  # Condition
+            if level == 1:  # TidakStabil
+                if value <= 25:
+                    return 1.0
+                elif 25 <= value <= 40:
+                    return (40 - value) / 15
+                elif value >= 40:
+                    return 0.0
+            elif level == 2:  # CukupStabil
+                if value <= 35 or value >= 75:
+                    return 0.0
+                elif 35 <= value <= 55:
+                    return (value - 35) / 20
+                elif 55 <= value <= 75:
+                    return (75 - value) / 20
+            else:  # level 3: Stabil
+                if value <= 70:
+                    return 0.0
+                elif 70 <= value <= 85:
+                    return (value - 70) / 15
+                elif value >= 85:
+                    return 1.0
+
+    @staticmethod
+    def evaluate_credit(inputs, config=FuzzyConfig):
+        """Evaluate credit worthiness based on fuzzy inputs"""
+        if config.MEMBERSHIP_BREAKPOINTS != _MEMBERSHIP_BREAKPOINTS:
+            # calculate_membership_strength hard-codes the default breakpoints
+            raise ValueError(
+                "FuzzyEvaluator only supports the default MEMBERSHIP_BREAKPOINTS; "
+                "score other breakpoints with engine.ModelRegistry"
+            )
+        if config.TNORM not in ("min", "product"):
+            raise ValueError(f"Unknown t-norm {config.TNORM!r}")
+        criteria_order = ["Character", "Capital", "Capacity", "Collateral", "Condition"]
+        n_rules = len(config.ACCEPTANCE_RULES) + len(config.REJECTION_RULES)
+        weights = config.RULE_WEIGHTS or [1.0] * n_rules
+        consequents = config.RULE_CONSEQUENTS or (
+            [1.0] * len(config.ACCEPTANCE_RULES) + [0.0] * len(config.REJECTION_RULES)
+        )
+
+        # Initialize results containers; ids index ACCEPTANCE_RULES + REJECTION_RULES
+        results = {
+            kind: {
+                "predicates": [],
+                "rules": [],
+                "ids": [],
+                "weights": [],
+                "consequents": [],
+            }
+            for kind in ("accept", "reject")
+        }
+
+        # Evaluate acceptance rules, then rejection rules
+        rules = [("accept", rule) for rule in config.ACCEPTANCE_RULES] + [
+            ("reject", rule) for rule in config.REJECTION_RULES
+        ]
+        for idx, (kind, rule) in enumerate(rules):
+            if FuzzyEvaluator._evaluate_rule(
+                rule, criteria_order, inputs, results[kind], config.TNORM
+            ):
+                results[kind]["ids"].append(idx)
+                results[kind]["weights"].append(float(weights[idx]))
+                results[kind]["consequents"].append(float(consequents[idx]))
+
+        return results
+
+    @staticmethod
+    def _evaluate_rule(rule, criteria_order, inputs, result_container, tnorm="min"):
+        """Helper method to evaluate a single rule, returns whether it fired"""
+        strengths = []
+        for level, criteria in zip(rule, criteria_order):
+            strength = FuzzyEvaluator.calculate_membership_strength(
+                inputs[criteria], level, criteria
+            )
+            if strength <= 0:
+                return False
+            strengths.append(strength)
+
+        if tnorm == "product":
+            alpha = functools.reduce(operator.mul, strengths)
+        else:
+            alpha = min(strengths)
+        result_container["predicates"].append(alpha)
+        result_container["rules"].append((rule, strengths))
+        return True
+
+    @staticmethod
+    def defuzzify(results, config=FuzzyConfig):
+        """z of evaluate_credit results with the configured defuzzifier"""
+        numerator = denominator = 0.0
+        for kind in ("accept", "reject"):
+            container = results[kind]
+            for alpha, weight, consequent in zip(
+                container["predicates"], container["weights"], container["consequents"]
+            ):
+                numerator += alpha * weight * consequent
+                denominator += alpha * weight
+        if config.AGGREGATION == "weighted_sum":
+            return numerator
+        return numerator / denominator if denominator > 0 else 0.0
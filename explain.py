@@ -0,0 +1,174 @@
+# Lazy Indonesian explanations of fuzzy decisions from compact traces
+import argparse
+import functools
+import itertools
+
+from audit import read_audit_log
+from engine import (
+    CRITERIA_ORDER,
+    CompiledRuleBase,
+    MembershipFunctions,
+    ModelRegistry,
+    decide,
+)
+from evaluator import FuzzyConfig
+
+
+class Explainer:
+    """Human-readable explanation of a decision, built only when requested
+
+    Scoring only keeps the compact trace: the fired rule ids (indexing
+    ACCEPTANCE_RULES + REJECTION_RULES) with their alphas, as returned by
+    ModelRegistry.score_one or stored in audit records. explain() turns such
+    a trace into conditions, per-rule sentences and a summary in Indonesian.
+    Explanations are cached on (trace, inputs, z), so treat them as read-only.
+    """
+
+    def __init__(self, config=FuzzyConfig, cache_size=1024):
+        self.rule_base = CompiledRuleBase.from_config(config)
+        self.membership = MembershipFunctions.from_config(config)
+        self.labels = config.LEVEL_LABELS
+        self.n_accept = len(config.ACCEPTANCE_RULES)
+        self._registry = None
+        self._conditions = functools.lru_cache(maxsize=None)(self._rule_conditions)
+        self._explain = functools.lru_cache(maxsize=cache_size)(self._build)
+
+    def _rule_conditions(self, rule_id):
+        """(criteria, level index, label) of each antecedent of one rule"""
+        return tuple(
+            (criteria, level - 1, self.labels[criteria][level - 1])
+            for criteria, level in zip(
+                CRITERIA_ORDER, self.rule_base.rules[rule_id].tolist()
+            )
+        )
+
+    def consequent_text(self, rule_id):
+        consequent = float(self.rule_base.consequents[rule_id])
+        if consequent == 1.0:
+            return "Diterima"
+        if consequent == 0.0:
+            return "Ditolak"
+        return f"z = {consequent:.2f}"
+
+    def explain(self, fired, inputs=None, z=None):
+        """Explanation of one decision from its fired [(rule id, alpha)] trace
+
+        With `inputs` (criteria -> value) each condition also carries its
+        membership degree. z defaults to the defuzzified value of the trace.
+        Returns {"decision", "accepted", "z", "summary", "rules"}.
+        """
+        fired = tuple((int(rule_id), float(alpha)) for rule_id, alpha in fired)
+        if inputs is not None:
+            inputs = tuple(float(inputs[criteria]) for criteria in CRITERIA_ORDER)
+        return self._explain(fired, inputs, None if z is None else float(z))
+
+    def explain_inputs(self, inputs):
+        """Score one applicant and explain the decision"""
+        if self._registry is None:
+            self._registry = ModelRegistry(self.membership)
+            self._registry.register(self.rule_base)
+        result = self._registry.score_one(inputs)[self.rule_base.name]
+        return self.explain(result["fired"], inputs, result["z"])
+
+    def explain_record(self, record):
+        """Explain an audit record (see AuditSink)"""
+        return self.explain(record["fired"], record.get("inputs"), record.get("z"))
+
+    def _build(self, fired, inputs, z):
+        mu = None
+        if inputs is not None:
+            mu = self.membership.fuzzify_one(dict(zip(CRITERIA_ORDER, inputs)))
+        rules = []
+        numerator = denominator = 0.0
+        for rule_id, alpha in fired:
+            weight = float(self.rule_base.weights[rule_id])
+            numerator += alpha * weight * float(self.rule_base.consequents[rule_id])
+            denominator += alpha * weight
+            conditions = [
+                {
+                    "criteria": criteria,
+                    "label": label,
+                    "mu": None if mu is None else mu[idx][level],
+                }
+                for idx, (criteria, level, label) in enumerate(
+                    self._conditions(rule_id)
+                )
+            ]
+            premise = " DAN ".join(
+                f"{condition['criteria']} {condition['label']}"
+                + ("" if mu is None else f" (μ = {condition['mu']:.2f})")
+                for condition in conditions
+            )
+            rules.append(
+                {
+                    "rule_id": rule_id,
+                    "kind": "accept" if rule_id < self.n_accept else "reject",
+                    "alpha": alpha,
+                    "conditions": conditions,
+                    "then": self.consequent_text(rule_id),
+                    "text": f"JIKA {premise} MAKA {self.consequent_text(rule_id)} "
+                    f"(α = {alpha:.2f})",
+                }
+            )
+        if z is None:
+            if self.rule_base.aggregation == "weighted_sum":
+                z = numerator
+            else:
+                z = numerator / denominator if denominator > 0 else 0.0
+        accepted = bool(decide(z, self.rule_base.threshold))
+        decision = "DITERIMA" if accepted else "DITOLAK"
+        return {
+            "decision": decision,
+            "accepted": accepted,
+            "z": z,
+            "summary": self._summary(rules, z, accepted, decision),
+            "rules": rules,
+        }
+
+    def _summary(self, rules, z, accepted, decision):
+        if not rules:
+            return (
+                "Tidak ada rule yang terpicu, sehingga z = 0.00 dan pengajuan "
+                f"kredit {decision}."
+            )
+        threshold = self.rule_base.threshold
+        n_accept = sum(rule["kind"] == "accept" for rule in rules)
+        strongest = max(rules, key=lambda rule: rule["alpha"])
+        return (
+            f"Pengajuan kredit {decision} karena z = {z:.2f} "
+            f"{'>' if accepted else '≤'} {threshold:.2f}. "
+            f"Terpicu {n_accept} rule penerimaan dan {len(rules) - n_accept} rule "
+            f"penolakan; rule terkuat: {strongest['text']}."
+        )
+
+
+def format_explanation(explanation):
+    """Plain-text rendering of an explanation, e.g. for a case review screen"""
+    lines = [explanation["summary"], ""]
+    for kind, title in (
+        ("accept", "Rules penerimaan yang terpicu:"),
+        ("reject", "Rules penolakan yang terpicu:"),
+    ):
+        rules = [rule for rule in explanation["rules"] if rule["kind"] == kind]
+        if rules:
+            lines.append(title)
+            lines += [f"  - {rule['text']}" for rule in rules]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Print Indonesian explanations of audited decisions"
+    )
+    parser.add_argument("audit_log", help="audit file (.jsonl.gz)")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    explainer = Explainer()
+    for record in itertools.islice(read_audit_log(args.audit_log), args.limit):
+        print(format_explanation(explainer.explain_record(record)))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# Latency statistics shared by the benchmark and load test scripts
+import numpy as np
+
+
+def latency_percentiles(samples):
+    """p50/p95/p99 of latency samples in seconds, reported in microseconds"""
+    samples = np.asarray(samples) * 1e6
+    return {p: float(np.percentile(samples, p)) for p in (50, 95, 99)}
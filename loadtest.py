@@ -0,0 +1,473 @@
+# Local load test of the Streamlit app and the scoring entry points
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from engine import (
+    CRITERIA_ORDER,
+    ComponentAggregator,
+    CompiledRuleBase,
+    ModelRegistry,
+)
+from evaluator import FuzzyEvaluator
+from explain import Explainer
+from latency import latency_percentiles
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data.py")
+
+# Target name -> factory(rng) returning one session's request function
+TARGETS = {}
+
+
+def target(name, server=False):
+    """Register a target; server targets drive one `streamlit run` server"""
+
+    def register(factory):
+        factory.server = server
+        TARGETS[name] = factory
+        return factory
+
+    return register
+
+
+AGGREGATOR = ComponentAggregator()
+
+
+def random_inputs(rng):
+    """5C inputs of a random applicant, aggregated like create_input_form"""
+    components = rng.integers(1, 6, size=(1, len(AGGREGATOR.components)))
+    return dict(zip(CRITERIA_ORDER, AGGREGATOR.aggregate(components)[0].tolist()))
+
+
+class StreamlitServer:
+    """`streamlit run data.py` in a child process on a free local port"""
+
+    def __init__(self, path=APP_PATH, timeout=60):
+        self.path = path
+        self.timeout = timeout
+        self.process = None
+        self.url = None
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def __enter__(self):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "streamlit",
+                "run",
+                self.path,
+                "--server.headless=true",
+                "--server.address=127.0.0.1",
+                f"--server.port={port}",
+                "--server.fileWatcherType=none",
+                "--browser.gatherUsageStats=false",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(
+                    f"streamlit exited with {self.process.returncode}: "
+                    f"{self.process.stderr.read().decode(errors='replace')[-2000:]}"
+                )
+            try:
+                with urllib.request.urlopen(
+                    f"{self.url}/_stcore/health", timeout=1
+                ) as r:
+                    if r.read().strip() == b"ok":
+                        return self
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                self.__exit__()
+                raise RuntimeError(f"streamlit not healthy after {self.timeout} s")
+            time.sleep(0.2)
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process.stderr.close()
+
+
+class AppClient:
+    """One browser tab: a websocket session with a running Streamlit server
+
+    Speaks the frontend protocol on /_stcore/stream: a BackMsg rerun_script
+    carrying the widget states, answered by ForwardMsg deltas up to
+    script_finished. The first run discovers the slider and button ids.
+    """
+
+    def __init__(self, url, timeout=60):
+        from websockets.sync.client import connect
+
+        self.timeout = timeout
+        # Entered by hand: the session outlives this call and close() ends it
+        self._socket = connect(
+            url.replace("http", "ws", 1) + "/_stcore/stream",
+            subprotocols=["streamlit"],
+            max_size=None,
+            open_timeout=timeout,
+        ).__enter__()
+        elements = self.rerun([])
+        self.sliders = [
+            e.slider.id for e in elements if e.WhichOneof("type") == "slider"
+        ]
+        self.button = next(
+            e.button.id
+            for e in elements
+            if e.WhichOneof("type") == "button"
+            and e.button.id.endswith("-evaluate_button")
+        )
+
+    def rerun(self, widget_states):
+        """Rerun the script with these WidgetStates; returns the new elements"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.widget_states.widgets.extend(widget_states)
+        self._socket.send(message.SerializeToString())
+        elements = []
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self._socket.recv(self.timeout))
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                elements.append(forward.delta.new_element)
+            elif kind == "script_finished":
+                if forward.script_finished != ForwardMsg.FINISHED_SUCCESSFULLY:
+                    raise RuntimeError(
+                        ForwardMsg.ScriptFinishedStatus.Name(forward.script_finished)
+                    )
+                break
+        for element in elements:
+            if element.WhichOneof("type") == "exception":
+                raise RuntimeError(element.exception.message)
+        return elements
+
+    def evaluate(self, scores):
+        """Set the 14 sliders to `scores` and press the evaluate button"""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        states = []
+        for widget_id, score in zip(self.sliders, scores):
+            state = WidgetState(id=widget_id)
+            state.double_array_value.data.append(score)
+            states.append(state)
+        states.append(WidgetState(id=self.button, trigger_value=True))
+        elements = self.rerun(states)
+        if not any(
+            "Keputusan Final" in element.markdown.body
+            for element in elements
+            if element.WhichOneof("type") == "markdown"
+        ):
+            raise RuntimeError("display_results did not render")
+
+    def close(self):
+        self._socket.close()
+
+
+@target("app", server=True)
+def app_session(rng):
+    """One browser session of the running server: set the sliders, evaluate"""
+    client = AppClient(_shared["server"].url)
+
+    def request():
+        client.evaluate(
+            [int(score) for score in rng.integers(1, 6, len(client.sliders))]
+        )
+
+    request.close = client.close
+    return request
+
+
+@target("evaluator")
+def evaluator_session(rng):
+    """FuzzyEvaluator.evaluate_credit, as the app calls it"""
+
+    def request():
+        FuzzyEvaluator.evaluate_credit(random_inputs(rng))
+
+    return request
+
+
+# Engine objects shared by all sessions, as a service process would hold them
+_shared = {}
+
+
+def _shared_registry():
+    if "registry" not in _shared:
+        registry = ModelRegistry()
+        registry.register(CompiledRuleBase.from_config())
+        _shared["registry"] = registry
+    return _shared["registry"]
+
+
+@target("score_one")
+def score_one_session(rng):
+    """ModelRegistry.score_one for one applicant"""
+    registry = _shared_registry()
+
+    def request():
+        registry.score_one(random_inputs(rng))
+
+    return request
+
+
+@target("explain")
+def explain_session(rng):
+    """Scoring plus the Indonesian explanation of one applicant"""
+    explainer = _shared.setdefault("explainer", Explainer())
+
+    def request():
+        explainer.explain_inputs(random_inputs(rng))
+
+    return request
+
+
+@target("batch")
+def batch_session(rng, batch_size=1000):
+    """ModelRegistry.score on a batch of applicants"""
+    registry = _shared_registry()
+
+    def request():
+        components = rng.integers(1, 6, size=(batch_size, len(AGGREGATOR.components)))
+        registry.score(AGGREGATOR.aggregate(components))
+
+    return request
+
+
+class ResourceSampler:
+    """CPU time and resident memory of one process while a load level runs
+
+    Samples this process by default, or the process `pid` (the Streamlit
+    server) from /proc.
+    """
+
+    def __init__(self, pid=None, interval=0.05):
+        self.pid = pid or "self"
+        self.interval = interval
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def rss(self):
+        with open(f"/proc/{self.pid}/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    def cpu(self):
+        """User + system CPU seconds of all threads of the process"""
+        with open(f"/proc/{self.pid}/stat") as handle:
+            fields = handle.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, self.rss())
+
+    def __enter__(self):
+        self.peak_rss = self.rss()
+        self._cpu = self.cpu()
+        self._wall = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.cpu_seconds = self.cpu() - self._cpu
+        self.wall_seconds = time.perf_counter() - self._wall
+        self.peak_rss = max(self.peak_rss, self.rss())
+
+
+def _drive(request, requests, think):
+    """Send `requests` requests; returns (latencies, errors)"""
+    latencies, errors = [], []
+    for _ in range(requests):
+        begin = time.perf_counter()
+        try:
+            request()
+        except Exception as e:
+            errors.append(repr(e))
+            continue
+        latencies.append(time.perf_counter() - begin)
+        if think:
+            time.sleep(think)
+    return latencies, errors
+
+
+def _run_threaded(name, rngs, requests, think, pid=None):
+    """Sessions as threads of this process; CPU and RSS are sampled from `pid`"""
+    clients = [TARGETS[name](rng) for rng in rngs]  # warm-up, not measured
+    outcomes = [None] * len(clients)
+    start = threading.Barrier(len(clients) + 1)
+
+    def client(idx):
+        start.wait()
+        outcomes[idx] = _drive(clients[idx], requests, think)
+
+    threads = [
+        threading.Thread(target=client, args=(idx,)) for idx in range(len(clients))
+    ]
+    for thread in threads:
+        thread.start()
+    with ResourceSampler(pid) as sampler:
+        start.wait()
+        for thread in threads:
+            thread.join()
+    for client in clients:
+        getattr(client, "close", lambda: None)()
+    return (
+        [outcome[0] for outcome in outcomes],
+        [error for outcome in outcomes for error in outcome[1]],
+        sampler.cpu_seconds,
+        sampler.peak_rss,
+        sampler.wall_seconds,
+    )
+
+
+def run_level(name, sessions, requests, think=0.0, seed=0):
+    """Closed loop: `sessions` concurrent sessions each sending `requests`
+
+    Server targets need a running StreamlitServer in _shared["server"]; CPU
+    and RSS are then those of the server process, else of this process.
+    """
+    rngs = [np.random.default_rng([seed, session]) for session in range(sessions)]
+    server = _shared.get("server") if TARGETS[name].server else None
+    latencies, errors, cpu_seconds, peak_rss, wall = _run_threaded(
+        name, rngs, requests, think, server.pid if server else None
+    )
+    samples = [latency for session in latencies for latency in session]
+    return {
+        "sessions": sessions,
+        "requests": len(samples),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput": len(samples) / wall,
+        "latency_ms": {
+            f"p{p}": value / 1000
+            for p, value in latency_percentiles(samples or [0.0]).items()
+        },
+        "cpu_percent": 100 * cpu_seconds / wall,
+        "peak_rss_mib": peak_rss / 2**20,
+    }
+
+
+def load_test(name, levels, requests, think=0.0, seed=0):
+    """Run every concurrency level and locate the throughput ceiling
+
+    The ceiling is the best throughput seen; saturation is the first level
+    after which adding sessions gains less than 10% throughput.
+    """
+    if TARGETS[name].server:
+        # One server for all levels, as analysts would share it
+        with StreamlitServer() as server:
+            _shared["server"] = server
+            try:
+                results = [
+                    run_level(name, sessions, requests, think, seed)
+                    for sessions in levels
+                ]
+            finally:
+                del _shared["server"]
+    else:
+        results = [
+            run_level(name, sessions, requests, think, seed) for sessions in levels
+        ]
+    best = max(results, key=lambda level: level["throughput"])
+    saturated = results[-1]["sessions"]
+    for previous, level in zip(results, results[1:]):
+        if level["throughput"] < 1.1 * previous["throughput"]:
+            saturated = previous["sessions"]
+            break
+    return {
+        "target": name,
+        "think_seconds": think,
+        "cpu_count": os.cpu_count(),
+        "measured_process": "streamlit server" if TARGETS[name].server else "loadtest",
+        "levels": results,
+        "ceiling": {"throughput": best["throughput"], "sessions": best["sessions"]},
+        "saturated_at_sessions": saturated,
+    }
+
+
+def format_report(report):
+    lines = [
+        f"Target: {report['target']}  (think {report['think_seconds']} s, "
+        f"{report['cpu_count']} CPUs, CPU/RSS of the {report['measured_process']} process)",
+        f"{'sessions':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'CPU %':>8}{'RSS MiB':>9}{'errors':>8}",
+    ]
+    for level in report["levels"]:
+        latency = level["latency_ms"]
+        lines.append(
+            f"{level['sessions']:>8}{level['throughput']:>10.1f}"
+            f"{latency['p50']:>10.2f}{latency['p95']:>10.2f}{latency['p99']:>10.2f}"
+            f"{level['cpu_percent']:>8.0f}{level['peak_rss_mib']:>9.0f}"
+            f"{level['errors']:>8}"
+        )
+    ceiling = report["ceiling"]
+    lines.append(
+        f"Throughput ceiling {ceiling['throughput']:.1f} req/s at "
+        f"{ceiling['sessions']} sessions; saturated at "
+        f"{report['saturated_at_sessions']} sessions"
+    )
+    for level in report["levels"]:
+        if level["first_error"]:
+            lines.append(
+                f"First error at {level['sessions']} sessions: {level['first_error']}"
+            )
+            break
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Simulate concurrent sessions against the app or a scoring entry point"
+    )
+    parser.add_argument("target", choices=sorted(TARGETS))
+    parser.add_argument(
+        "--sessions", default="1,2,4,8", help="comma-separated concurrency levels"
+    )
+    parser.add_argument("--requests", type=int, default=20, help="per session")
+    parser.add_argument(
+        "--think", type=float, default=0.0, help="seconds between requests"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.sessions.split(",")]
+    report = load_test(args.target, levels, args.requests, args.think, args.seed)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(report, handle, indent=2)
+    return 1 if any(level["errors"] for level in report["levels"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
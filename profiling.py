@@ -0,0 +1,327 @@
+# Stage timing and sampling profiler for the scoring pipeline
+import argparse
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+import engine
+from engine import ComponentAggregator, MembershipFunctions, ModelRegistry, Scorer
+from evaluator import FuzzyEvaluator
+
+# Pipeline stages, timed per call; time is attributed to the innermost active
+# stage. Only batch-level or once-per-applicant functions are wrapped.
+INSTRUMENTED = [
+    (ComponentAggregator, "aggregate", "aggregation"),
+    (MembershipFunctions, "fuzzify", "fuzzification"),
+    (FuzzyEvaluator, "evaluate_credit", "rule_iteration"),
+    (engine, "rule_strengths", "rule_evaluation"),
+    (ModelRegistry, "score", "result_construction"),
+    (ModelRegistry, "score_one", "result_construction"),
+    (Scorer, "_score_chunk", "scorer"),
+]
+
+# Stages inside a timed stage that run too often to wrap (calculate_membership_strength
+# runs ~80 times per applicant); their share of the enclosing stage's time is
+# estimated from the samples whose stack passes through them
+SAMPLED = [
+    (FuzzyEvaluator, "calculate_membership_strength", "fuzzification"),
+    (FuzzyEvaluator, "_evaluate_rule", "rule_evaluation"),
+]
+
+ENV_VAR = "FUZZY_PROFILE"
+
+
+def register(owner, name, stage):
+    """Add a function (module or class attribute) to the instrumented stages"""
+    INSTRUMENTED.append((owner, name, stage))
+
+
+_profiler = None
+
+
+class Profiler:
+    """Per-stage exclusive timings plus a sampling profiler of all threads
+
+    While active, the pipeline functions in INSTRUMENTED are wrapped with
+    stage timers; nothing is wrapped when profiling is off, so the hot path
+    pays no overhead then. A sampler thread records the Python stack of
+    every other thread each `interval` seconds, rooted at its current stage;
+    the SAMPLED stages are split out of the timed ones from those stacks.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stage_seconds = {}
+        self.stage_calls = {}
+        self.samples = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._current = {}  # thread id -> innermost stage
+        self._originals = []
+        self._stop = threading.Event()
+        self._sampler = None
+        self.started = self.stopped = None
+
+    # Stage accounting
+
+    def enter(self, stage):
+        now = time.perf_counter()
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        if stack:
+            self._add(stack[-1][0], now - stack[-1][1], 0)
+        stack.append([stage, now])
+        self._current[threading.get_ident()] = stage
+
+    def exit(self):
+        now = time.perf_counter()
+        stack = self._local.stack
+        stage, resumed = stack.pop()
+        self._add(stage, now - resumed, 1)
+        if stack:
+            stack[-1][1] = now
+            self._current[threading.get_ident()] = stack[-1][0]
+        else:
+            self._current.pop(threading.get_ident(), None)
+
+    def _add(self, stage, seconds, calls):
+        with self._lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+            self.stage_calls[stage] = self.stage_calls.get(stage, 0) + calls
+
+    def _wrap(self, func, stage):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self.enter(stage)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.exit()
+
+        return wrapper
+
+    # Sampling
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    if code is _WRAPPER_CODE:
+                        frame = frame.f_back
+                        continue
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                        f":{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(f"stage:{self._current.get(thread_id, 'other')}")
+                key = ";".join(reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+
+    # Lifecycle
+
+    def start(self):
+        for owner, name, stage in INSTRUMENTED:
+            original = owner.__dict__[name]
+            self._originals.append((owner, name, original))
+            if isinstance(original, staticmethod):
+                wrapped = staticmethod(self._wrap(original.__func__, stage))
+            else:
+                wrapped = self._wrap(original, stage)
+            setattr(owner, name, wrapped)
+        self.started = time.perf_counter()
+        self._sampler = threading.Thread(
+            target=self._sample_loop, name="profiler-sampler", daemon=True
+        )
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+        for owner, name, original in reversed(self._originals):
+            setattr(owner, name, original)
+        self._originals = []
+        self.stopped = time.perf_counter()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # Reports
+
+    def stage_breakdown(self):
+        """{stage: (calls or None, seconds)}, SAMPLED stages estimated"""
+        frames = {}
+        for owner, name, stage in SAMPLED:
+            code = getattr(owner, name).__code__
+            frames[
+                f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                f":{code.co_firstlineno})"
+            ] = stage
+        counts = {}  # timed stage -> {stage of the innermost SAMPLED frame: samples}
+        for stack, count in self.samples.items():
+            timed, *stack = stack.split(";")
+            stage = timed = timed[len("stage:") :]
+            for frame in stack:
+                stage = frames.get(frame, stage)
+            shares = counts.setdefault(timed, {})
+            shares[stage] = shares.get(stage, 0) + count
+        breakdown = {
+            stage: (self.stage_calls[stage], seconds)
+            for stage, seconds in self.stage_seconds.items()
+        }
+        for timed, shares in counts.items():
+            if timed not in breakdown:
+                continue
+            calls, seconds = breakdown[timed]
+            total = sum(shares.values())
+            for stage, count in shares.items():
+                if stage == timed:
+                    continue
+                moved = seconds * count / total
+                breakdown[timed] = (calls, breakdown[timed][1] - moved)
+                stage_calls, stage_seconds = breakdown.get(stage, (None, 0.0))
+                breakdown[stage] = (stage_calls, stage_seconds + moved)
+        return breakdown
+
+    def stage_table(self):
+        """Per-stage exclusive time breakdown as a text table"""
+        breakdown = self.stage_breakdown()
+        total = sum(seconds for _, seconds in breakdown.values()) or 1.0
+        lines = [f"{'stage':<22}{'calls':>12}{'seconds':>12}{'share':>9}"]
+        for stage, (calls, seconds) in sorted(
+            breakdown.items(), key=lambda item: -item[1][1]
+        ):
+            calls = "sampled" if calls is None else f"{calls:,}"
+            lines.append(
+                f"{stage:<22}{calls:>12}{seconds:>12.4f}{seconds / total:>9.1%}"
+            )
+        lines.append(f"{'total':<22}{'':>12}{total:>12.4f}")
+        return "\n".join(lines)
+
+    def write_collapsed(self, path):
+        """Collapsed stacks ("frame;frame;frame count"), for flamegraph.pl"""
+        with open(path, "w") as handle:
+            for stack, count in sorted(self.samples.items()):
+                handle.write(f"{stack} {count}\n")
+
+    def write_speedscope(self, path, name="fuzzy-credit"):
+        """Sampled profile in the speedscope file format"""
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            ids = []
+            for frame in stack.split(";"):
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame})
+                ids.append(index[frame])
+            samples.append(ids)
+            weights.append(count * self.interval)
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "profiling.py",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+        with open(path, "w") as handle:
+            json.dump(document, handle)
+
+    def write(self, prefix):
+        """Write <prefix>.folded, <prefix>.speedscope.json and <prefix>.stages.txt"""
+        self.write_collapsed(f"{prefix}.folded")
+        self.write_speedscope(f"{prefix}.speedscope.json")
+        with open(f"{prefix}.stages.txt", "w") as handle:
+            handle.write(self.stage_table() + "\n")
+
+
+# Stage wrappers are left out of sampled stacks
+_WRAPPER_CODE = Profiler(0)._wrap(len, "").__code__
+
+
+def enable(interval=0.001):
+    """Start the global profiler"""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(interval).start()
+    return _profiler
+
+
+def disable(prefix=None):
+    """Stop the global profiler, optionally writing its reports"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.stop()
+        if prefix:
+            profiler.write(prefix)
+    return profiler
+
+
+def batch_run(rows, path, chunk_size=10_000, seed=0):
+    """Score random applicants end to end through one pipeline"""
+    rng = np.random.default_rng(seed)
+    aggregator = ComponentAggregator()
+    registry = ModelRegistry()
+    registry.register(engine.CompiledRuleBase.from_config())
+    for start in range(0, rows, chunk_size):
+        components = rng.integers(1, 6, size=(min(chunk_size, rows - start), 14))
+        criteria = aggregator.aggregate(components)
+        if path == "engine":
+            registry.score(criteria)
+        else:
+            for row in criteria.tolist():
+                FuzzyEvaluator.evaluate_credit(dict(zip(engine.CRITERIA_ORDER, row)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Profile a batch run of the scoring pipeline"
+    )
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--path", choices=("evaluator", "engine"), default="evaluator")
+    parser.add_argument("--interval", type=float, default=0.001)
+    parser.add_argument(
+        "--out",
+        default=os.environ.get(ENV_VAR) or "profile",
+        help=f"output file prefix (default: ${ENV_VAR} or profile)",
+    )
+    args = parser.parse_args(argv)
+
+    with Profiler(args.interval) as profiler:
+        batch_run(args.rows, args.path)
+    profiler.write(args.out)
+    print(profiler.stage_table())
+    print(
+        f"\nWrote {args.out}.folded, {args.out}.speedscope.json, {args.out}.stages.txt"
+    )
+
+
+if __name__ == "__main__":
+    main()
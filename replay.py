@@ -0,0 +1,319 @@
+# Replay historical applicants against an old and a new rule base
+import argparse
+import collections
+import csv
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+import profiling
+from engine import (
+    CRITERIA_ORDER,
+    CompiledRuleBase,
+    MembershipFunctions,
+    ModelRegistry,
+    config_from_dict,
+    config_to_dict,
+    load_config,
+)
+from evaluator import FuzzyConfig
+
+# Histogram of z_new - z_old
+Z_SHIFT_EDGES = np.linspace(-1.0, 1.0, 41)
+
+_registries = None
+
+
+def _open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt")
+    return open(path)
+
+
+def decode_records(lines, model=None):
+    """JSON records of `model` (all when None) and the model names seen"""
+    records = [json.loads(line) for line in lines]
+    models = {record["model"] for record in records if "model" in record}
+    if model is not None:
+        records = [record for record in records if record.get("model", model) == model]
+    return records, models
+
+
+def check_models(models, model=None):
+    """Refuse to mix the records of several models unless one is chosen
+
+    Audit logs of a registry hold one record per applicant and model, and
+    AuditSink rotates files per model chunk, so no file or record order
+    tells which model is meant.
+    """
+    if model is None and len(models) > 1:
+        raise ValueError(
+            f"audit records of several models {sorted(models)}, choose one with --model"
+        )
+
+
+def iter_blocks(paths, block_size, model=None):
+    """Yield (kind, header, lines, model) blocks of raw input text, file by file
+
+    .csv(.gz) files need a header naming the five criteria; everything else
+    is read as JSON lines with an "inputs" object (the audit log format), of
+    which only the records of `model` are kept when it is given.
+    """
+    for path in paths:
+        kind = "csv" if ".csv" in os.path.basename(path) else "jsonl"
+        with _open_text(path) as handle:
+            header = None
+            if kind == "csv":
+                header = next(csv.reader([handle.readline()]))
+                missing = set(CRITERIA_ORDER) - set(header)
+                if missing:
+                    raise ValueError(f"{path}: missing columns {sorted(missing)}")
+            lines = []
+            for line in handle:
+                if line.strip():
+                    lines.append(line)
+                if len(lines) >= block_size:
+                    yield kind, header, lines, model
+                    lines = []
+            if lines:
+                yield kind, header, lines, model
+
+
+def parse_block(kind, header, lines, model=None):
+    """(N, 5) criteria matrix of one raw block and the model names it holds"""
+    if kind == "csv":
+        columns = [header.index(criteria) for criteria in CRITERIA_ORDER]
+        matrix = np.loadtxt(
+            io.StringIO("".join(lines)), delimiter=",", ndmin=2, usecols=columns
+        )
+        return matrix, set()
+    records, models = decode_records(lines, model)
+    matrix = np.array(
+        [[record["inputs"][c] for c in CRITERIA_ORDER] for record in records],
+        dtype=np.float64,
+    ).reshape(-1, len(CRITERIA_ORDER))
+    return matrix, models
+
+
+profiling.register(sys.modules[__name__], "parse_block", "parsing")
+
+
+def build_registries(old_config, new_config):
+    """One registry when both configs share membership functions, else two"""
+    old_membership = MembershipFunctions.from_config(old_config)
+    new_membership = MembershipFunctions.from_config(new_config)
+    old_model = CompiledRuleBase.from_config(old_config, name="old")
+    new_model = CompiledRuleBase.from_config(new_config, name="new")
+    if old_membership.breakpoints == new_membership.breakpoints:
+        registry = ModelRegistry(old_membership)
+        registry.register(old_model)
+        registry.register(new_model)
+        return [registry]
+    registries = [ModelRegistry(old_membership), ModelRegistry(new_membership)]
+    registries[0].register(old_model)
+    registries[1].register(new_model)
+    return registries
+
+
+def empty_summary(n_old_rules, n_new_rules):
+    return {
+        "records": 0,
+        "models": set(),
+        # transitions[old accepted][new accepted]
+        "transitions": np.zeros((2, 2), dtype=np.int64),
+        "z_shift": np.zeros(len(Z_SHIFT_EDGES) - 1, dtype=np.int64),
+        "old_fired": np.zeros(n_old_rules, dtype=np.int64),
+        "new_fired": np.zeros(n_new_rules, dtype=np.int64),
+    }
+
+
+def score_block(registries, block):
+    """Fused old/new scoring of one block into a partial summary"""
+    matrix, models = parse_block(*block)
+    check_models(models, block[3])
+    results = {}
+    for registry in registries:
+        results.update(registry.score(matrix, with_alpha=True))
+    old, new = results["old"], results["new"]
+    summary = empty_summary(old["alpha"].shape[1], new["alpha"].shape[1])
+    summary["records"] = len(matrix)
+    summary["models"] = models
+    np.add.at(
+        summary["transitions"],
+        (old["accepted"].astype(np.intp), new["accepted"].astype(np.intp)),
+        1,
+    )
+    shift = np.clip(new["z"] - old["z"], Z_SHIFT_EDGES[0], Z_SHIFT_EDGES[-1])
+    summary["z_shift"] += np.histogram(shift, Z_SHIFT_EDGES)[0]
+    summary["old_fired"] += np.count_nonzero(old["alpha"] > 0, axis=0)
+    summary["new_fired"] += np.count_nonzero(new["alpha"] > 0, axis=0)
+    return summary
+
+
+def merge_summary(total, part):
+    total["records"] += part["records"]
+    total["models"] |= part["models"]
+    for key in ("transitions", "z_shift", "old_fired", "new_fired"):
+        total[key] += part[key]
+    return total
+
+
+def _init_worker(old_data, new_data):
+    global _registries
+    _registries = build_registries(
+        config_from_dict(old_data, "OldConfig"), config_from_dict(new_data, "NewConfig")
+    )
+
+
+def _score_block_worker(block):
+    return score_block(_registries, block)
+
+
+def replay(
+    paths,
+    old_config=FuzzyConfig,
+    new_config=FuzzyConfig,
+    block_size=50_000,
+    workers=None,
+    model=None,
+):
+    """Stream every input file through both rule bases and return the summary
+
+    Audit logs hold one record per applicant and model; only the records of
+    `model` are replayed, which must be given when they hold several.
+    At most 2 * workers blocks are in flight, so memory stays constant no
+    matter how many records are replayed.
+    """
+    workers = workers or os.cpu_count() or 1
+    n_old = len(old_config.ACCEPTANCE_RULES) + len(old_config.REJECTION_RULES)
+    n_new = len(new_config.ACCEPTANCE_RULES) + len(new_config.REJECTION_RULES)
+    total = empty_summary(n_old, n_new)
+    blocks = iter_blocks(paths, block_size, model)
+    if workers == 1:
+        registries = build_registries(old_config, new_config)
+        for block in blocks:
+            merge_summary(total, score_block(registries, block))
+            check_models(total["models"], model)
+    else:
+        initargs = (config_to_dict(old_config), config_to_dict(new_config))
+        with multiprocessing.Pool(workers, _init_worker, initargs) as pool:
+            pending = collections.deque()
+            for block in blocks:
+                pending.append(pool.apply_async(_score_block_worker, (block,)))
+                if len(pending) >= 2 * workers:
+                    merge_summary(total, pending.popleft().get())
+                    check_models(total["models"], model)
+            while pending:
+                merge_summary(total, pending.popleft().get())
+                check_models(total["models"], model)
+    return diff_report(total, old_config, new_config)
+
+
+def diff_report(summary, old_config, new_config):
+    """Machine-readable diff summary with firing deltas keyed by rule antecedent"""
+    firing = {}
+    for side, config in (("old", old_config), ("new", new_config)):
+        rules = list(config.ACCEPTANCE_RULES) + list(config.REJECTION_RULES)
+        n_accept = len(config.ACCEPTANCE_RULES)
+        for idx, rule in enumerate(rules):
+            key = "".join(map(str, rule)) + ("/accept" if idx < n_accept else "/reject")
+            entry = firing.setdefault(key, {"old": 0, "new": 0})
+            # Duplicated rules fire together, count the antecedent once
+            entry[side] = int(summary[f"{side}_fired"][idx])
+    for entry in firing.values():
+        entry["delta"] = entry["new"] - entry["old"]
+    transitions = summary["transitions"]
+    return {
+        "records": int(summary["records"]),
+        "flips": {
+            "accept_to_reject": int(transitions[1, 0]),
+            "reject_to_accept": int(transitions[0, 1]),
+            "unchanged_accept": int(transitions[1, 1]),
+            "unchanged_reject": int(transitions[0, 0]),
+        },
+        "z_shift_histogram": {
+            "edges": Z_SHIFT_EDGES.tolist(),
+            "counts": summary["z_shift"].tolist(),
+        },
+        "rule_firing": dict(
+            sorted(firing.items(), key=lambda item: -abs(item[1]["delta"]))
+        ),
+    }
+
+
+def format_report(report):
+    flips = report["flips"]
+    lines = [
+        f"Records replayed      : {report['records']:,}",
+        f"DITERIMA -> DITOLAK   : {flips['accept_to_reject']:,}",
+        f"DITOLAK  -> DITERIMA  : {flips['reject_to_accept']:,}",
+        "",
+        "z shift (new - old):",
+    ]
+    edges = report["z_shift_histogram"]["edges"]
+    counts = report["z_shift_histogram"]["counts"]
+    for low, high, count in zip(edges, edges[1:], counts):
+        if count:
+            lines.append(f"  [{low:+.2f}, {high:+.2f})  {count:,}")
+    lines += ["", "Rule firing (old -> new, delta):"]
+    for key, entry in report["rule_firing"].items():
+        if entry["delta"]:
+            lines.append(
+                f"  {key:<16} {entry['old']:>12,} -> {entry['new']:>12,}  {entry['delta']:+,}"
+            )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Re-score archived applicants under an old and a new rule base"
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="audit logs (.jsonl[.gz]) or .csv[.gz] files"
+    )
+    parser.add_argument("--old", help="old config JSON (default: FuzzyConfig)")
+    parser.add_argument("--new", required=True, help="new config JSON")
+    parser.add_argument(
+        "--model",
+        help="model whose audit records are replayed, needed when the logs hold several",
+    )
+    parser.add_argument("--block-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--json", help="also write the report as JSON to this path")
+    parser.add_argument(
+        "--profile",
+        metavar="PREFIX",
+        help=f"profile the run in-process (also enabled by ${profiling.ENV_VAR})",
+    )
+    args = parser.parse_args(argv)
+
+    old_config = load_config(args.old) if args.old else FuzzyConfig
+    new_config = load_config(args.new)
+    profile = args.profile or os.environ.get(profiling.ENV_VAR)
+    if profile:
+        # The sampler only sees this process, so score without workers
+        args.workers = 1
+        profiling.enable()
+    report = replay(
+        args.inputs,
+        old_config,
+        new_config,
+        args.block_size,
+        args.workers,
+        args.model,
+    )
+    if profile:
+        print(profiling.disable(profile).stage_table(), file=sys.stderr)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
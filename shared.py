@@ -0,0 +1,202 @@
+# Compiled models in a memory-mapped file shared read-only by worker processes
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from approx import ApproximateScorer
+from engine import (
+    CRITERIA_ORDER,
+    ComponentAggregator,
+    CompiledRuleBase,
+    DecisionLattice,
+    MembershipFunctions,
+    ModelRegistry,
+    config_from_dict,
+    config_to_dict,
+)
+from evaluator import FuzzyConfig
+
+MAGIC = b"FZMODEL1"
+ALIGNMENT = 64
+ENV_VAR = "FUZZY_SHARED_MODEL"
+
+
+def default_path(config=FuzzyConfig, approximate_step=None, tolerance=0.01):
+    """Segment path in /dev/shm (tmpfs) when available, named by fingerprint"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    name = f"fuzzy-credit-{fingerprint(config, approximate_step, tolerance)[:16]}.model"
+    return os.path.join(directory, name)
+
+
+def fingerprint(config=FuzzyConfig, approximate_step=None, tolerance=0.01):
+    """Hash of everything the compiled tables depend on"""
+    data = {
+        "config": config_to_dict(config),
+        "components": [
+            len(config.CRITERIA_DATA[criteria]["components"])
+            for criteria in CRITERIA_ORDER
+        ],
+        "approximate": (
+            None
+            if approximate_step is None
+            else [float(approximate_step), float(tolerance)]
+        ),
+    }
+    payload = json.dumps(data, sort_keys=True).encode()
+    return hashlib.sha256(MAGIC + payload).hexdigest()
+
+
+def publish(path=None, config=FuzzyConfig, approximate_step=None, tolerance=0.01):
+    """Compile a config and write its tables to a memory-mappable file
+
+    The file holds MAGIC, the header length, a JSON header (config, table
+    layout, fingerprint) and the 64-byte aligned arrays. It is written to a
+    temporary name and renamed, so readers never see a partial model.
+    """
+    path = path or default_path(config, approximate_step, tolerance)
+    membership = MembershipFunctions.from_config(config)
+    rule_base = CompiledRuleBase.from_config(config)
+    arrays = {}
+    aggregator = ComponentAggregator(config.CRITERIA_DATA)
+    if aggregator.unit_weights:
+        lattice = DecisionLattice(rule_base, membership, aggregator)
+        arrays["lattice_z"] = lattice.z
+        arrays["lattice_accepted"] = lattice.accepted
+    if approximate_step is not None:
+        approximate = ApproximateScorer(config, approximate_step, tolerance)
+        arrays["approx_z"] = approximate.z_table
+        arrays["approx_bound"] = approximate.bound
+
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[name] = {
+            "offset": offset,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+        }
+        offset += array.nbytes
+    header = json.dumps(
+        {
+            "fingerprint": fingerprint(config, approximate_step, tolerance),
+            "config": config_to_dict(config),
+            "name": config.__name__,
+            "approximate": (
+                None
+                if approximate_step is None
+                else {"step": float(approximate_step), "tolerance": float(tolerance)}
+            ),
+            "arrays": layout,
+        }
+    ).encode()
+    start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(dir=directory, prefix=".fuzzy-model-")
+    try:
+        with os.fdopen(handle, "wb") as output:
+            output.write(MAGIC + len(header).to_bytes(8, "little") + header)
+            for name, array in arrays.items():
+                output.seek(start + layout[name]["offset"])
+                output.write(np.ascontiguousarray(array).tobytes())
+            output.truncate(start + offset)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temporary)
+        raise
+    return path
+
+
+class SharedModel:
+    """Compiled model attached read-only from a file written by publish()
+
+    Large tables (decision lattice, approximate-z grid) are views into one
+    shared mapping, so every worker on a host reuses the same physical pages
+    and starts without recomputing them. Small per-process objects (rule
+    index arrays, membership tables) are rebuilt from the stored config.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as handle:
+            magic = handle.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a compiled fuzzy model")
+            length = int.from_bytes(handle.read(8), "little")
+            self.header = json.loads(handle.read(length))
+        start = -(-(len(MAGIC) + 8 + length) // ALIGNMENT) * ALIGNMENT
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        self.arrays = {
+            name: np.ndarray(
+                tuple(spec["shape"]),
+                dtype=np.dtype(spec["dtype"]),
+                buffer=self._map,
+                offset=start + spec["offset"],
+            )
+            for name, spec in self.header["arrays"].items()
+        }
+        self.fingerprint = self.header["fingerprint"]
+        self.config = config_from_dict(self.header["config"], self.header["name"])
+        self.membership = MembershipFunctions.from_config(self.config)
+        self.rule_base = CompiledRuleBase.from_config(self.config)
+        self.lattice = None
+        if "lattice_z" in self.arrays:
+            self.lattice = DecisionLattice(
+                self.rule_base,
+                self.membership,
+                ComponentAggregator(self.config.CRITERIA_DATA),
+                z=self.arrays["lattice_z"],
+                accepted=self.arrays["lattice_accepted"],
+            )
+        self.approximate = None
+        if self.header["approximate"] is not None:
+            self.approximate = ApproximateScorer(
+                self.config,
+                z_table=self.arrays["approx_z"],
+                bound=self.arrays["approx_bound"],
+                **self.header["approximate"],
+            )
+
+    def registry(self, observers=()):
+        """ModelRegistry scoring with the shared model's rule base"""
+        registry = ModelRegistry(self.membership, observers)
+        registry.register(self.rule_base)
+        return registry
+
+    def nbytes(self):
+        return self._map.nbytes
+
+
+def attach(path=None, config=FuzzyConfig, approximate_step=None, tolerance=0.01):
+    """Attach to the compiled model, publishing it first if it is missing
+
+    The first process on a host compiles the model under an exclusive file
+    lock; the others wait for it and then map the same file. A file whose
+    fingerprint does not match the config is recompiled.
+    """
+    path = path or os.environ.get(ENV_VAR)
+    path = path or default_path(config, approximate_step, tolerance)
+    expected = fingerprint(config, approximate_step, tolerance)
+    if os.path.exists(path):
+        model = SharedModel(path)
+        if model.fingerprint == expected:
+            return model
+    with open(path + ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            # Another process may have published it while we waited
+            if os.path.exists(path):
+                model = SharedModel(path)
+                if model.fingerprint == expected:
+                    return model
+            publish(path, config, approximate_step, tolerance)
+            return SharedModel(path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
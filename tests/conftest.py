@@ -0,0 +1,21 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import ComponentAggregator  # noqa: E402
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def slider_matrix(rng):
+    """Criteria matrix of random applicants, as the 14 sliders produce them"""
+    components = rng.integers(1, 6, size=(3000, 14))
+    return ComponentAggregator().aggregate(components)
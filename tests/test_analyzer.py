@@ -0,0 +1,109 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from analyzer import CoverageAnalyzer
+from engine import CRITERIA_ORDER, lattice_values
+from evaluator import FuzzyConfig
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return CoverageAnalyzer()
+
+
+@pytest.fixture(scope="module")
+def report(analyzer):
+    return analyzer.report()
+
+
+def zero_regions(analyzer, report):
+    """Reported zero-firing regions as tuples of AxisCells"""
+    # Interval text -> AxisCell, per criteria
+    cells = [{str(cell): cell for cell in axis} for axis in analyzer.axes]
+    return [
+        tuple(cells[idx][region[c]["interval"]] for idx, c in enumerate(CRITERIA_ORDER))
+        for region in report["zero_firing"]["regions"]
+    ]
+
+
+def sample_cell(cell, rng, count):
+    if cell.low == cell.high:
+        return np.full(count, cell.low)
+    values = rng.uniform(cell.low, cell.high, count)
+    if cell.low_closed:
+        values[0] = cell.low
+    if cell.high_closed:
+        values[-1] = cell.high
+    return values
+
+
+def fires(analyzer, matrix):
+    _, _, alpha = analyzer.rule_base.evaluate(matrix, analyzer.membership)
+    return (alpha > 0).any(axis=1)
+
+
+def test_zero_firing_regions_are_exact(analyzer, report, rng):
+    regions = zero_regions(analyzer, report)
+    assert len(regions) == report["zero_firing"]["cells"] > 0
+
+    inside = np.concatenate(
+        [
+            np.stack([sample_cell(cell, rng, 4) for cell in region], axis=1)
+            for region in regions
+        ]
+    )
+    assert not fires(analyzer, inside).any()
+
+    breakpoints = [0.0, 25.0, 35.0, 40.0, 45.0, 55.0, 70.0, 75.0, 85.0, 100.0]
+    matrix = np.concatenate(
+        [rng.uniform(0, 100, (20000, 5)), rng.choice(breakpoints, (5000, 5))]
+    )
+    zero = set(regions)
+    in_region = np.array(
+        [
+            tuple(
+                next(cell for cell in axis if value in cell)
+                for axis, value in zip(analyzer.axes, row)
+            )
+            in zero
+            for row in matrix.tolist()
+        ]
+    )
+    assert in_region.any() and not in_region.all()
+    np.testing.assert_array_equal(fires(analyzer, matrix), ~in_region)
+
+
+def test_zero_firing_lattice_points_match_the_engine(analyzer, report):
+    values = [
+        lattice_values(len(FuzzyConfig.CRITERIA_DATA[c]["components"]))
+        for c in CRITERIA_ORDER
+    ]
+    silent = 0
+    for head in itertools.product(*values[:2]):
+        tail = np.stack(np.meshgrid(*values[2:], indexing="ij"), -1).reshape(-1, 3)
+        matrix = np.concatenate([np.tile(head, (len(tail), 1)), tail], axis=1)
+        silent += int((~fires(analyzer, matrix)).sum())
+    assert report["zero_firing"]["lattice_points"] == silent > 0
+
+
+def test_static_checks(analyzer):
+    uncovered, duplicates, conflicts = analyzer.static_checks()
+    n_accept = len(FuzzyConfig.ACCEPTANCE_RULES)
+    assert len(duplicates) == 3
+    for duplicate in duplicates:
+        assert all(rule_id < n_accept for rule_id in duplicate["rule_ids"])
+        assert len(set(duplicate["rule_ids"])) == 2
+    assert conflicts == []
+
+    rules = {
+        tuple(rule)
+        for rule in list(FuzzyConfig.ACCEPTANCE_RULES)
+        + list(FuzzyConfig.REJECTION_RULES)
+    }
+    combinations = set(
+        itertools.product(*(range(1, n + 1) for n in analyzer.membership.n_levels))
+    )
+    assert {tuple(entry["rule"]) for entry in uncovered} == combinations - rules
+    assert len(uncovered) == len(combinations) - len(rules)
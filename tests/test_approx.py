@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from approx import ApproximateScorer
+from engine import config_from_dict, config_to_dict
+from evaluator import FuzzyConfig
+
+CONFIGS = {
+    "default": FuzzyConfig,
+    "product": config_from_dict(dict(config_to_dict(), TNORM="product"), "Product"),
+    "weighted_sum": config_from_dict(
+        dict(config_to_dict(), AGGREGATION="weighted_sum"), "WeightedSum"
+    ),
+}
+
+
+@pytest.fixture(scope="module", params=sorted(CONFIGS))
+def config(request):
+    return CONFIGS[request.param]
+
+
+@pytest.fixture(scope="module")
+def scorer(config):
+    return ApproximateScorer(config, step=10.0)
+
+
+def sample(rng, slider_matrix):
+    """Continuous, breakpoint, slider and out-of-domain inputs"""
+    breakpoints = [0.0, 25.0, 35.0, 40.0, 45.0, 55.0, 70.0, 75.0, 85.0, 100.0]
+    return np.concatenate(
+        [
+            rng.uniform(0, 100, size=(5000, 5)),
+            rng.choice(breakpoints, (2000, 5)),
+            slider_matrix,
+            rng.uniform(-10, 110, size=(500, 5)),
+        ]
+    )
+
+
+def test_approximation_stays_within_its_bound(scorer, rng, slider_matrix):
+    matrix = sample(rng, slider_matrix)
+    expected_z, expected, _ = scorer.rule_base.evaluate(matrix, scorer.membership)
+    z, accepted, exact = scorer.score(matrix)
+    _, bound, inside = scorer.interpolate(matrix)
+
+    np.testing.assert_array_equal(accepted, expected)
+    np.testing.assert_array_equal(z[exact], expected_z[exact])
+    assert exact[~inside].all()
+    error = np.abs(z - expected_z)[~exact]
+    assert (error <= bound[~exact] + 1e-12).all()
+    assert (error <= scorer.max_error + 1e-12).all()
+    assert scorer.max_error <= scorer.tolerance
+    assert scorer.stats()["escalated"] == exact.sum()
+
+
+def test_rows_near_the_threshold_are_exact(config, scorer, rng, slider_matrix):
+    # Without the tolerance only the threshold and the domain escalate
+    loose = ApproximateScorer(
+        config,
+        step=10.0,
+        tolerance=1.0,
+        z_table=scorer.z_table,
+        bound=scorer.bound,
+    )
+    matrix = sample(rng, slider_matrix)
+    expected_z, expected, _ = loose.rule_base.evaluate(matrix, loose.membership)
+    interpolated, bound, inside = loose.interpolate(matrix)
+    z, accepted, exact = loose.score(matrix)
+
+    threshold = loose.rule_base.threshold
+    flipped = (np.round(interpolated, 2) > threshold) != expected
+    assert (flipped & inside).any()
+    assert exact[flipped].all()
+    np.testing.assert_array_equal(accepted, expected)
+    undecided = (np.round(interpolated - bound, 2) > threshold) != (
+        np.round(interpolated + bound, 2) > threshold
+    )
+    assert exact[undecided].all()
+    assert not exact[inside & ~undecided].any()
+    # Cells over the tolerance are interpolated too, still within their bound
+    error = np.abs(z - expected_z)[~exact]
+    assert (error <= bound[~exact] + 1e-12).all()
@@ -0,0 +1,122 @@
+import glob
+import math
+import threading
+import time
+
+import numpy as np
+
+from audit import AuditSink, read_audit_log
+from engine import CRITERIA_ORDER, CompiledRuleBase, ModelRegistry
+
+
+def read_all(directory):
+    records = []
+    for path in sorted(glob.glob(f"{directory}/*.jsonl.gz")):
+        records.extend(read_audit_log(path))
+    return records
+
+
+def test_non_finite_values_round_trip(tmp_path):
+    matrix = np.array(
+        [[np.nan, np.inf, -np.inf, 50.0, 12.5], [1.0, 2.0, 3.0, 4.0, 5.0]]
+    )
+    z = np.array([np.nan, 0.25])
+    alpha = np.zeros((2, 48))
+    alpha[0, 3] = np.inf
+    alpha[1, 40] = 0.5
+    sink = AuditSink(tmp_path)
+    sink.observe("champion", matrix, z, z > 0.5, alpha)
+    sink.close()
+    assert sink.metrics()["write_errors"] == 0
+
+    first, second = read_all(tmp_path)
+    assert math.isnan(first["inputs"]["Character"])
+    assert first["inputs"]["Capital"] == math.inf
+    assert first["inputs"]["Capacity"] == -math.inf
+    assert math.isnan(first["z"])
+    assert first["fired"] == [[3, math.inf]]
+    assert first["decision"] == "DITOLAK"
+    assert second["inputs"] == dict(zip(CRITERIA_ORDER, matrix[1].tolist()))
+    assert second["model"] == "champion"
+    assert second["fired"] == [[40, 0.5]]
+
+
+def test_score_one_writes_audit_record(tmp_path):
+    sink = AuditSink(tmp_path)
+    registry = ModelRegistry(observers=[sink])
+    registry.register(CompiledRuleBase.from_config())
+    inputs = {
+        "Character": 80,
+        "Capital": 60,
+        "Capacity": 72,
+        "Collateral": 50,
+        "Condition": 90,
+    }
+    result = registry.score_one(inputs)["default"]
+    sink.close()
+
+    (record,) = read_all(tmp_path)
+    assert record["model"] == "default"
+    assert record["inputs"] == inputs
+    assert record["z"] == result["z"]
+    assert record["decision"] == ("DITERIMA" if result["accepted"] else "DITOLAK")
+    assert record["fired"] == [list(pair) for pair in result["fired"]]
+
+
+def test_flush_writes_queued_batches(tmp_path, slider_matrix):
+    registry = ModelRegistry()
+    registry.register(CompiledRuleBase.from_config())
+    sink = AuditSink(tmp_path, interval=3600, max_queue=4)
+    for start in range(0, 1000, 100):
+        batch = slider_matrix[start : start + 100]
+        result = registry.score(batch, with_alpha=True)["default"]
+        sink.observe("default", batch, result["z"], result["accepted"], result["alpha"])
+    sink.flush()
+    metrics = sink.metrics()
+    assert metrics["written_records"] == metrics["submitted_records"] == 1000
+    assert metrics["queue_depth"] == 0
+    sink.close()
+
+    records = read_all(tmp_path)
+    assert [r["inputs"]["Character"] for r in records] == slider_matrix[
+        :1000, 0
+    ].tolist()
+
+
+def test_close_never_loses_a_queued_batch(tmp_path, slider_matrix):
+    registry = ModelRegistry()
+    registry.register(CompiledRuleBase.from_config())
+    batch = slider_matrix[:8]
+    result = registry.score(batch, with_alpha=True)["default"]
+    for attempt in range(5):
+        sink = AuditSink(tmp_path / str(attempt), interval=0.001)
+        queued = [0] * 4
+
+        def observe(worker):
+            try:
+                while True:
+                    sink.observe(
+                        "default",
+                        batch,
+                        result["z"],
+                        result["accepted"],
+                        result["alpha"],
+                    )
+                    queued[worker] += len(batch)
+            except RuntimeError:
+                pass
+
+        threads = [threading.Thread(target=observe, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.02)
+        sink.close()
+        for thread in threads:
+            thread.join()
+
+        # flush() after close must not wait for a batch the writer never saw
+        flusher = threading.Thread(target=sink.flush, daemon=True)
+        flusher.start()
+        flusher.join(5)
+        assert not flusher.is_alive()
+        assert len(read_all(tmp_path / str(attempt))) == sum(queued) > 0
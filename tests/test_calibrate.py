@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+import pytest
+
+from calibrate import Calibration, auc, collapse, load_history, neighbours
+from engine import CRITERIA_ORDER, CompiledRuleBase, MembershipFunctions, decide
+
+
+@pytest.mark.parametrize("records", [2000, 100_000])
+def test_collapsed_metrics_match_record_level(rng, slider_matrix, records):
+    # groups() scores the cells of small histories, class combinations of large
+    values = [np.unique(column) for column in slider_matrix.T]
+    matrix = np.stack([rng.choice(column, records) for column in values], axis=1)
+    rule_base = CompiledRuleBase.from_config()
+    z, _, _ = rule_base.evaluate(matrix)
+    labels = (rng.random(len(matrix)) < 1.2 - z).astype(np.int64)
+    cells, counts = collapse(matrix, np.stack([1 - labels, labels], axis=1))
+    assert len(cells) < len(matrix) and counts.sum() == len(matrix)
+
+    calibration = Calibration(cells, counts, metric="loss")
+    candidates = [calibration.breakpoints]
+    candidates += neighbours(calibration.breakpoints, rng, 5)
+    for breakpoints in candidates:
+        z, _, _ = rule_base.evaluate(matrix, MembershipFunctions(breakpoints))
+        metrics = calibration.evaluate(breakpoints)
+        accepted = decide(z, metrics["cutoff"])
+        loss = (5.0 * labels[accepted].sum() + (1 - labels)[~accepted].sum()) / len(z)
+        assert metrics["expected_loss"] == pytest.approx(loss)
+        assert metrics["acceptance_rate"] == pytest.approx(accepted.mean())
+        assert metrics["auc"] == pytest.approx(auc(z, 1 - labels, labels))
+        assert metrics["score"] == -metrics["expected_loss"]
+
+
+def test_history_counts_each_applicant_of_one_model(tmp_path, rng, slider_matrix):
+    matrix = slider_matrix[:500]
+    labels = rng.integers(0, 2, len(matrix))
+    path = tmp_path / "labeled.jsonl"
+    with open(path, "w") as handle:
+        for row, label in zip(matrix, labels):
+            for model in ("champion", "challenger"):
+                inputs = dict(zip(CRITERIA_ORDER, row.tolist()))
+                record = {"model": model, "inputs": inputs, "default": int(label)}
+                handle.write(json.dumps(record) + "\n")
+
+    with pytest.raises(ValueError, match="several models"):
+        load_history([str(path)])
+    (cells, counts), _ = load_history([str(path)], block_size=64, model="champion")
+    assert counts.sum() == len(matrix)
+    assert counts[:, 1].sum() == labels.sum()
+    expected, _ = collapse(matrix, np.stack([1 - labels, labels], axis=1))
+    np.testing.assert_array_equal(cells, expected)
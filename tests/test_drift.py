@@ -0,0 +1,62 @@
+import threading
+
+import numpy as np
+
+from drift import DriftMonitor
+from engine import CompiledRuleBase, ModelRegistry
+
+
+def scored(matrix):
+    registry = ModelRegistry()
+    registry.register(CompiledRuleBase.from_config())
+    result = registry.score(matrix, with_alpha=True)["default"]
+    return matrix, result["z"], result["accepted"], result["alpha"]
+
+
+def test_late_rows_stay_in_the_current_window(slider_matrix):
+    monitor = DriftMonitor(window=3600, min_records=1)
+    batch = scored(slider_matrix[:10])
+    monitor.observe("default", *batch, timestamp=3700)
+    monitor.observe("default", *batch, timestamp=3500)  # late: window 0
+    metrics = monitor.metrics()
+    assert metrics["window_start"] == 3600
+    assert metrics["window_records"] == 20
+    assert metrics["closed_windows"] == 0
+
+    monitor.observe("default", *batch, timestamp=7300)
+    monitor.observe("default", *batch, timestamp=100)
+    assert [start for start, _ in monitor.windows()] == [3600]
+    assert monitor.metrics()["window_records"] == 20
+
+    # Closing does not reopen older windows either
+    monitor.close_window()
+    monitor.observe("default", *batch, timestamp=10)
+    assert monitor.metrics()["window_start"] == 7200
+
+
+def test_concurrent_observers_never_roll_back(slider_matrix):
+    ticks = iter(range(0, 10**6, 7))
+    lock = threading.Lock()
+
+    def clock():
+        with lock:
+            return float(next(ticks))
+
+    monitor = DriftMonitor(window=50, history=10**4, min_records=1, clock=clock)
+    rows = [scored(slider_matrix[i : i + 1]) for i in range(8)]
+
+    def worker():
+        for _ in range(500):
+            for row in rows:
+                monitor.observe("default", *row)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    monitor.close_window()
+    starts = [start for start, _ in monitor.windows()]
+    assert starts == sorted(set(starts))
+    total = sum(window.records for _, window in monitor._closed)
+    assert total == 4 * 500 * len(rows)
@@ -0,0 +1,245 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from engine import (
+    CRITERIA_ORDER,
+    COMPONENT_BITS,
+    ComponentAggregator,
+    CompiledRuleBase,
+    DecisionLattice,
+    MembershipFunctions,
+    ModelRegistry,
+    Scorer,
+    check_criteria_values,
+    config_from_dict,
+    config_to_dict,
+    decide,
+    pack_components,
+    unpack_components,
+)
+from evaluator import FuzzyConfig, FuzzyEvaluator
+
+
+def reference_z(inputs, config=FuzzyConfig):
+    """z as display_results computes it from FuzzyEvaluator.evaluate_credit"""
+    results = FuzzyEvaluator.evaluate_credit(inputs, config)
+    return FuzzyEvaluator.defuzzify(results, config)
+
+
+def operator_config(**overrides):
+    data = config_to_dict()
+    data.update(overrides)
+    return config_from_dict(data, "OperatorConfig")
+
+
+N_RULES = len(FuzzyConfig.ACCEPTANCE_RULES) + len(FuzzyConfig.REJECTION_RULES)
+OPERATOR_CONFIGS = {
+    "product": operator_config(TNORM="product"),
+    "weighted_sum": operator_config(AGGREGATION="weighted_sum"),
+    "weights": operator_config(
+        TNORM="product",
+        RULE_WEIGHTS=[0.5 + (i % 4) / 2 for i in range(N_RULES)],
+        RULE_CONSEQUENTS=[1.0 - (i % 5) / 10 for i in range(N_RULES)],
+        DECISION_THRESHOLD=0.45,
+    ),
+}
+
+
+def registry(config=FuzzyConfig):
+    registry = ModelRegistry(MembershipFunctions.from_config(config))
+    registry.register(CompiledRuleBase.from_config(config))
+    return registry
+
+
+@pytest.mark.parametrize("source", ["slider", "uniform"])
+def test_engine_matches_evaluator(source, slider_matrix, rng):
+    if source == "slider":
+        matrix = slider_matrix
+    else:
+        # Off-lattice values and exact breakpoints take the analytical path
+        matrix = np.concatenate(
+            [
+                rng.uniform(0, 100, size=(2000, 5)),
+                rng.choice([25.0, 35.0, 40.0, 45.0, 55.0, 70.0, 75.0, 85.0], (500, 5)),
+            ]
+        )
+    expected = np.array(
+        [reference_z(dict(zip(CRITERIA_ORDER, row))) for row in matrix.tolist()]
+    )
+    result = registry().score(matrix)["default"]
+    np.testing.assert_allclose(result["z"], expected, rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(result["accepted"], np.round(expected, 2) > 0.5)
+
+
+@pytest.mark.parametrize("name", sorted(OPERATOR_CONFIGS))
+def test_engine_matches_evaluator_operators(name, slider_matrix):
+    config = OPERATOR_CONFIGS[name]
+    matrix = slider_matrix[:1000]
+    expected = np.array(
+        [reference_z(dict(zip(CRITERIA_ORDER, row)), config) for row in matrix.tolist()]
+    )
+    result = registry(config).score(matrix)["default"]
+    np.testing.assert_allclose(result["z"], expected, rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(
+        result["accepted"], np.round(expected, 2) > config.DECISION_THRESHOLD
+    )
+
+
+def test_evaluator_rejects_other_breakpoints():
+    data = config_to_dict()
+    data["MEMBERSHIP_BREAKPOINTS"]["Capital"] = [[20, 40], [35, 55, 75], [70, 85]]
+    with pytest.raises(ValueError, match="MEMBERSHIP_BREAKPOINTS"):
+        FuzzyEvaluator.evaluate_credit(
+            dict.fromkeys(CRITERIA_ORDER, 50.0), config_from_dict(data)
+        )
+
+
+def test_score_one_matches_score(slider_matrix):
+    models = registry()
+    batch = models.score(slider_matrix[:500])["default"]
+    for row, z, accepted in zip(slider_matrix[:500], batch["z"], batch["accepted"]):
+        one = models.score_one(dict(zip(CRITERIA_ORDER, row)))["default"]
+        assert one["z"] == pytest.approx(z, abs=1e-12)
+        assert one["accepted"] == accepted
+
+
+def test_register_rejects_other_breakpoints():
+    data = config_to_dict()
+    data["MEMBERSHIP_BREAKPOINTS"]["Capital"] = [[20, 40], [35, 55, 75], [70, 85]]
+    other = config_from_dict(data, "OtherConfig")
+    models = registry()
+    with pytest.raises(ValueError, match="breakpoints"):
+        models.register(CompiledRuleBase.from_config(other, name="other"))
+    # With its own membership functions the same rule base is fine
+    registry(other)
+
+
+def test_decide_uses_rounded_z():
+    assert not decide(np.array([0.504]))[0]
+    assert decide(np.array([0.506]))[0]
+
+
+@pytest.mark.parametrize("bad", [-3.0, 100.5, 150.0, np.nan, np.inf])
+def test_check_criteria_values_rejects_out_of_domain(bad, slider_matrix):
+    matrix = slider_matrix[:50].copy()
+    check_criteria_values(matrix)
+    matrix[[7, 30], 2] = bad
+    with pytest.raises(
+        ValueError, match="within 0-100: 2 invalid rows, first \\[7, 30\\]"
+    ):
+        check_criteria_values(matrix)
+
+
+def test_pack_components_round_trip(rng):
+    components = rng.integers(1, 6, size=(1000, 14))
+    codes = pack_components(components)
+    np.testing.assert_array_equal(unpack_components(codes), components)
+
+
+@pytest.mark.parametrize("bad", [0, 6, 9, 2.5, np.nan])
+def test_pack_components_rejects_out_of_range(bad, rng):
+    components = rng.integers(1, 6, size=(50, 14)).astype(np.float64)
+    components[7, 3] = bad
+    with pytest.raises(ValueError, match="integers 1-5: 1 invalid rows, first \\[7\\]"):
+        pack_components(components)
+
+
+def test_pack_components_rejects_too_many_columns():
+    with pytest.raises(ValueError, match="component matrix"):
+        pack_components(np.ones((2, 22), dtype=int))
+
+
+def test_decision_lattice_matches_engine(rng):
+    components = np.concatenate(
+        [
+            rng.integers(1, 6, size=(5000, 14)),
+            np.full((1, 14), 1),
+            np.full((1, 14), 5),
+        ]
+    ).astype(np.uint8)
+    z, accepted, _ = CompiledRuleBase.from_config().evaluate(
+        ComponentAggregator().aggregate(components)
+    )
+    lattice = DecisionLattice()
+    for result in (
+        lattice.score_codes(pack_components(components)),
+        lattice.score_components(components),
+    ):
+        np.testing.assert_array_equal(result[0], z)
+        np.testing.assert_array_equal(result[1], accepted)
+
+
+@pytest.mark.parametrize(
+    "corrupt",
+    [
+        np.uint64(7) << np.uint64(COMPONENT_BITS * 5),  # component 5 scored 8
+        np.uint64(5) << np.uint64(COMPONENT_BITS * 13),  # component 13 scored 6
+        np.uint64(1) << np.uint64(COMPONENT_BITS * 14),  # bits past component 14
+        np.uint64(1) << np.uint64(63),
+    ],
+)
+def test_decision_lattice_rejects_invalid_codes(corrupt, rng):
+    lattice = DecisionLattice()
+    codes = pack_components(rng.integers(1, 6, size=(20, 14)))
+    codes[4] |= corrupt
+    with pytest.raises(ValueError, match="outside 1-5"):
+        lattice.score_codes(codes)
+    components = unpack_components(codes[:4])
+    components[2, 6] = 6
+    with pytest.raises(ValueError, match="integers 1-5"):
+        lattice.score_components(components)
+
+
+class ChunkRecorder:
+    def __init__(self):
+        self.sizes = []
+
+    def observe(self, model, matrix, z, accepted, alpha):
+        self.sizes.append(len(matrix))
+
+
+@pytest.mark.parametrize("name", ["default"] + sorted(OPERATOR_CONFIGS))
+@pytest.mark.parametrize("batch_size", [1, 64, 1000, 4096])
+def test_scorer_matches_registry(name, batch_size, slider_matrix, rng):
+    config = OPERATOR_CONFIGS.get(name, FuzzyConfig)
+    matrix = np.concatenate([slider_matrix[:700], rng.uniform(0, 100, (300, 5))])
+    expected = registry(config).score(matrix)["default"]
+    recorder = ChunkRecorder()
+    scorer = Scorer(
+        CompiledRuleBase.from_config(config),
+        MembershipFunctions.from_config(config),
+        batch_size=batch_size,
+        observers=[recorder],
+    )
+    z = np.full(len(matrix), np.nan)
+    accepted = np.zeros(len(matrix), dtype=bool)
+    assert scorer.score_into(matrix, z, accepted) is z
+    np.testing.assert_allclose(z, expected["z"], rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(accepted, expected["accepted"])
+    assert sum(recorder.sizes) == len(matrix)
+    assert max(recorder.sizes) == min(batch_size, len(matrix))
+
+    # Without accepted_out only z is written
+    z[:] = np.nan
+    scorer.score_into(matrix, z)
+    np.testing.assert_allclose(z, expected["z"], rtol=0, atol=1e-12)
+
+
+def test_scorer_reuses_its_scratch(slider_matrix):
+    scorer = Scorer(batch_size=256)
+    matrix = slider_matrix[:1000]
+    z = np.empty(len(matrix))
+    accepted = np.empty(len(matrix), dtype=bool)
+    scorer.score_into(matrix, z, accepted)
+    buffers = scorer.scratch()
+    tracemalloc.start()
+    try:
+        scorer.score_into(matrix, z, accepted)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert scorer.scratch() is buffers
+    # Views and scalars only, far below one (256, rules) alpha buffer
+    assert peak < buffers.alpha.nbytes // 8
@@ -0,0 +1,28 @@
+import pytest
+
+from engine import CRITERIA_ORDER
+from evaluator import FuzzyConfig, FuzzyEvaluator
+from explain import Explainer
+
+
+def test_explains_the_evaluator_trace(slider_matrix):
+    explainer = Explainer(FuzzyConfig)
+    for row in slider_matrix[:300].tolist():
+        inputs = dict(zip(CRITERIA_ORDER, row))
+        results = FuzzyEvaluator.evaluate_credit(inputs)
+        fired = [
+            (rule_id, alpha)
+            for kind in ("accept", "reject")
+            for rule_id, alpha in zip(results[kind]["ids"], results[kind]["predicates"])
+        ]
+        explanation = explainer.explain(fired, inputs)
+        assert explanation["z"] == pytest.approx(FuzzyEvaluator.defuzzify(results))
+        for kind in ("accept", "reject"):
+            rules = [r for r in explanation["rules"] if r["kind"] == kind]
+            assert [r["alpha"] for r in rules] == results[kind]["predicates"]
+            for rule, (levels, strengths) in zip(rules, results[kind]["rules"]):
+                assert [c["label"] for c in rule["conditions"]] == [
+                    FuzzyConfig.LEVEL_LABELS[c][level - 1]
+                    for c, level in zip(CRITERIA_ORDER, levels)
+                ]
+                assert [c["mu"] for c in rule["conditions"]] == pytest.approx(strengths)
@@ -0,0 +1,14 @@
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("websockets")
+
+from loadtest import load_test  # noqa: E402
+
+
+def test_app_sessions_drive_one_streamlit_server():
+    report = load_test("app", levels=[2], requests=2)
+    assert report["measured_process"] == "streamlit server"
+    (level,) = report["levels"]
+    assert level["errors"] == 0
+    assert level["peak_rss_mib"] > 0
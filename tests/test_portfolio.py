@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("streamlit")
+
+from data import PortfolioUI  # noqa: E402
+from engine import CRITERIA_ORDER  # noqa: E402
+
+
+def criteria_csv(rows):
+    lines = [",".join(CRITERIA_ORDER)] + [",".join(map(str, row)) for row in rows]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def test_score_file_scores_criteria_columns(slider_matrix):
+    data = criteria_csv(slider_matrix[:20].tolist())
+    scored, _, _ = PortfolioUI._score_file("valid", data)
+    assert len(scored) == 20
+    assert set(scored["Keputusan"]) <= {"DITERIMA", "DITOLAK"}
+
+
+@pytest.mark.parametrize("bad", ["nan", "150", "-3", "inf"])
+def test_score_file_rejects_invalid_criteria(bad):
+    rows = np.full((4, 5), 60.0).astype(str)
+    rows[2, 1] = bad
+    with pytest.raises(ValueError, match="within 0-100: 1 invalid rows, first \\[2\\]"):
+        PortfolioUI._score_file(f"invalid-{bad}", criteria_csv(rows.tolist()))
@@ -0,0 +1,20 @@
+import pytest
+
+import profiling
+from evaluator import FuzzyEvaluator
+
+
+def test_evaluator_inner_stages_are_sampled_not_wrapped():
+    original = FuzzyEvaluator.__dict__["calculate_membership_strength"]
+    with profiling.Profiler(interval=0.0005) as profiler:
+        # Per-call functions stay unwrapped while profiling
+        assert FuzzyEvaluator.__dict__["calculate_membership_strength"] is original
+        profiling.batch_run(3000, "evaluator")
+    assert FuzzyEvaluator.__dict__["calculate_membership_strength"] is original
+
+    breakdown = profiler.stage_breakdown()
+    assert breakdown["rule_iteration"][0] == 3000
+    assert breakdown["rule_evaluation"][0] is None
+    assert breakdown["rule_evaluation"][1] > 0
+    timed = sum(profiler.stage_seconds.values())
+    assert sum(seconds for _, seconds in breakdown.values()) == pytest.approx(timed)
@@ -0,0 +1,57 @@
+import glob
+
+import pytest
+
+from audit import AuditSink
+from engine import CompiledRuleBase, ModelRegistry, config_from_dict, config_to_dict
+from replay import replay
+
+
+def test_replay_keeps_one_model_of_the_audit_log(tmp_path, slider_matrix):
+    challenger = config_from_dict(
+        dict(config_to_dict(), TNORM="product"), "ChallengerConfig"
+    )
+    sink = AuditSink(tmp_path)
+    registry = ModelRegistry(observers=[sink])
+    registry.register(CompiledRuleBase.from_config(name="champion"))
+    registry.register(CompiledRuleBase.from_config(challenger, name="challenger"))
+    matrix = slider_matrix[:700]
+    expected = registry.score(matrix)
+    sink.close()
+    paths = glob.glob(f"{tmp_path}/*.jsonl.gz")
+
+    # Replaying a config against itself flips nothing
+    for model in ("champion", "challenger"):
+        report = replay(paths, block_size=256, workers=1, model=model)
+        assert report["records"] == len(matrix)
+        assert report["flips"]["accept_to_reject"] == 0
+        assert report["flips"]["reject_to_accept"] == 0
+
+    # Old = champion, new = challenger reproduces the live decisions
+    report = replay(paths, new_config=challenger, workers=1, model="champion")
+    old, new = expected["champion"]["accepted"], expected["challenger"]["accepted"]
+    assert report["flips"]["accept_to_reject"] == int((old & ~new).sum())
+    assert report["flips"]["reject_to_accept"] == int((~old & new).sum())
+    assert report["records"] == len(matrix)
+
+    assert replay(paths, workers=1, model="missing")["records"] == 0
+
+
+def test_replay_needs_a_model_for_mixed_audit_logs(tmp_path, slider_matrix):
+    # Small files rotate per model chunk, so files start with either model
+    sink = AuditSink(tmp_path, max_bytes=30_000)
+    registry = ModelRegistry(observers=[sink])
+    registry.register(CompiledRuleBase.from_config(name="champion"))
+    registry.register(CompiledRuleBase.from_config(name="challenger"))
+    for start in range(0, 740, 37):
+        registry.score(slider_matrix[start : start + 37])
+    sink.close()
+    paths = sorted(glob.glob(f"{tmp_path}/*.jsonl.gz"))
+    assert len(paths) > 2
+
+    for subset in (paths, paths[1:], paths[::-1]):
+        with pytest.raises(ValueError, match="several models"):
+            replay(subset, workers=1)
+        with pytest.raises(ValueError, match="several models"):
+            replay(subset, block_size=10, workers=2)
+    assert replay(paths, workers=1, model="challenger")["records"] == 740
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+
+import shared
+from approx import ApproximateScorer
+from engine import (
+    ComponentAggregator,
+    CompiledRuleBase,
+    DecisionLattice,
+    MembershipFunctions,
+    config_from_dict,
+    config_to_dict,
+)
+from evaluator import FuzzyConfig
+
+
+def fresh_tables(config):
+    lattice = DecisionLattice(
+        CompiledRuleBase.from_config(config),
+        MembershipFunctions.from_config(config),
+        ComponentAggregator(config.CRITERIA_DATA),
+    )
+    return lattice, ApproximateScorer(config, step=10.0)
+
+
+def assert_shared(model, array):
+    assert not array.flags.writeable
+    assert np.shares_memory(array, model._map)
+
+
+def test_attach_maps_the_published_tables(tmp_path):
+    path = str(tmp_path / "model")
+    shared.publish(path, approximate_step=10.0)
+    published = os.stat(path)
+    model = shared.attach(path, approximate_step=10.0)
+    assert os.stat(path).st_ino == published.st_ino
+
+    lattice, approximate = fresh_tables(FuzzyConfig)
+    for array, expected in (
+        (model.lattice.z, lattice.z),
+        (model.lattice.accepted, lattice.accepted),
+        (model.approximate.z_table, approximate.z_table),
+        (model.approximate.bound, approximate.bound),
+    ):
+        assert_shared(model, array)
+        np.testing.assert_array_equal(array, expected)
+    assert model.approximate.max_error == approximate.max_error
+
+
+def test_attach_republishes_on_fingerprint_mismatch(tmp_path):
+    path = str(tmp_path / "model")
+    shared.publish(path, approximate_step=10.0)
+    stale = shared.attach(path, approximate_step=10.0).fingerprint
+
+    product = config_from_dict(dict(config_to_dict(), TNORM="product"), "Product")
+    model = shared.attach(path, product, approximate_step=10.0)
+    assert model.fingerprint == shared.fingerprint(product, 10.0) != stale
+    assert model.config.TNORM == "product"
+    lattice, approximate = fresh_tables(product)
+    np.testing.assert_array_equal(model.lattice.z, lattice.z)
+    np.testing.assert_array_equal(model.approximate.z_table, approximate.z_table)
+    assert_shared(model, model.approximate.z_table)
+
+    # Dropping the approximate tables is a different model as well
+    model = shared.attach(path, product)
+    assert model.approximate is None
+    assert model.fingerprint == shared.fingerprint(product)